@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline.blocks import build_blocks  # noqa: E402
+from pipeline.spatial import SpatialIndex  # noqa: E402
+
+
+def dense_page(n_blocks: int, seed: int = 0) -> dict:
+    # A dense form: ~n cells laid out in a grid, shuffled so reading order is scrambled.
+    rng = random.Random(seed)
+    cols = 8
+    rows = -(-n_blocks // cols)
+    blocks = []
+    for i in range(n_blocks):
+        r, c = divmod(i, cols)
+        x0 = c * 75.0 + rng.uniform(0, 5)
+        y0 = r * (842.0 / rows)
+        blocks.append({"text": f"cell {i}", "page": 1, "bbox": [x0, y0, x0 + 60.0, y0 + 842.0 / rows * 0.8]})
+    rng.shuffle(blocks)
+    return {"blocks": blocks}
+
+
+def linear_nearest_right(blocks, b, max_dist):
+    best = None
+    x0, y0, x1, y1 = b.bbox
+    for nb in blocks:
+        if nb.id == b.id:
+            continue
+        nx0, ny0, nx1, ny1 = nb.bbox
+        if not (ny0 < y1 and ny1 > y0):
+            continue
+        gap = nx0 - x1
+        if -1.0 <= gap <= max_dist and (best is None or (max(gap, 0.0), nb.index) < best[:2]):
+            best = (max(gap, 0.0), nb.index, nb)
+    return best[2] if best else None
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark layout neighbour queries on a dense page")
+    p.add_argument("--blocks", type=int, default=2000)
+    args = p.parse_args(argv)
+
+    blocks = build_blocks(dense_page(args.blocks))
+    max_dist = 0.2 * 842.0
+
+    t0 = time.perf_counter()
+    idx = SpatialIndex(blocks)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fast = [idx.nearest(b, "right", max_dist) for b in blocks]
+    grid_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    slow = [linear_nearest_right(blocks, b, max_dist) for b in blocks]
+    linear_s = time.perf_counter() - t0
+
+    assert [x.id if x else None for x in fast] == [x.id if x else None for x in slow]
+    print(f"{args.blocks} blocks: grid build {build_s * 1000:.1f} ms, "
+          f"{args.blocks} queries grid {grid_s * 1000:.1f} ms vs linear {linear_s * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import fnmatch
+import hashlib
+import json
+from dataclasses import dataclass, fields, replace
 from pathlib import Path
 
 
@@ -12,9 +15,32 @@ class PipelineConfig:
     # Extraction quality
     min_useful_chars: int = 200
 
+    # Page-range sharding: PDFs with at least this many pages (0 disables) are converted
+    # as `convert_shards` page ranges on a process pool and merged back in page order.
+    convert_shard_min_pages: int = 0
+    convert_shards: int = 4
+
     # Candidate generation
     spacy_model: str = "pt_core_news_lg"
     max_candidates_per_type: int = 30
+    consolidate_candidates: bool = True  # merge accent/case variants and truncated forms of a name
+    use_field_index: bool = True  # answer labelled fields from Docling tables/key-value items first
+
+    # NER prefilter: blocks that cannot yield a valid person name never reach spaCy.
+    ner_prefilter: bool = True
+    ner_max_block_chars: int = 0  # 0 disables the length cap
+    ner_top_region_only: bool = False  # restrict NER to page 1, y_norm <= ner_top_region_y_norm
+    ner_top_region_y_norm: float = 0.5
+    ner_keyword_window: int = -1  # >= 0 restricts NER to blocks within N of an employee keyword
+
+    # Layout neighbours from Block.bbox (label left of / above its value).
+    # Max gap as a fraction of the page extent; 0 disables and keeps reading-order neighbours only.
+    spatial_neighbor_distance: float = 0.2
+
+    # Bundle splitting: one PDF holding forms for several employees yields one result per form.
+    segment_bundles: bool = False
+    segment_header_y_norm: float = 0.15  # top region compared between pages
+    segment_header_similarity: float = 0.8  # token Jaccard for a repeated header
 
     # Scoring
     top_k_for_llm: int = 5
@@ -31,10 +57,288 @@ class PipelineConfig:
     llama_top_p: float = 1.0
     llama_top_k: int = 0
     llama_chat_format: str | None = None
+    # Model cascade (--model small large): a smaller model's answer is escalated when a
+    # field is INDEFINIDO, differs from the heuristic top-1, or has confidence below this.
+    cascade_min_confidence: float = 0.6
+    # Runtime (speed only): context auto-sizing, threads, batch and memory mapping.
+    llama_auto_n_ctx: bool = True  # size n_ctx from the tokenized prompt, capped at llama_n_ctx
+    llama_n_threads: int | None = None  # None = llama.cpp default
+    llama_n_batch: int = 512
+    llama_use_mmap: bool = True
+    llama_use_mlock: bool = False
+    # Learned ranker (--ranker): fields answered without the LLM at or above this probability.
+    ranker_accept_probability: float = 0.9
+
+    # Budgets (0 disables). A document over budget returns INDEFINIDO with budget_exceeded:<stage>.
+    budget_convert_seconds: float = 0.0  # > 0 runs Docling in a killable child process
+    budget_max_pages: int = 0
+    budget_max_blocks: int = 0
+    budget_llm_seconds: float = 0.0  # generation deadline; prompt evaluation is not interrupted
+    # Conversion worker recycling (0 disables): replace the Docling child process after this
+    # many documents or once its RSS crosses this size; the replacement is warmed first.
+    worker_max_documents: int = 0
+    worker_max_rss_mb: float = 0.0
+    # Main process recycling (0 disables): spaCy and llama.cpp live in the main process, so
+    # --batch, --watch and --queue stop taking work past these limits, finish what is
+    # running and exit with RECYCLE_EXIT_CODE for the supervisor to restart them.
+    process_max_documents: int = 0
+    process_max_rss_mb: float = 0.0
+
+    # Load shedding (0 disables a trigger): under pressure, documents whose heuristic margin
+    # is clear enough skip the LLM and are marked debug.shed for reprocessing.
+    shed_queue_depth: int = 0  # backlog (--watch) at which shedding starts
+    shed_p95_seconds: float = 0.0  # p95 document latency at which shedding starts
+    shed_resume_fraction: float = 0.5  # back to the LLM once pressure is below this share of the threshold
+    shed_window: int = 50  # documents in the latency window
+    shed_min_margin: float = 1.0  # top-1/top-2 score margin required in every field
 
     # Confidence
     min_confidence_when_defined: float = 0.2
 
+    # Gazetteer (confirmed employers, learned from high-confidence results)
+    gazetteer_min_confidence: float = 0.9
+    gazetteer_cnpj_window: int = 2
+
+    # Layout templates (--templates): a form layout is learned from results with both
+    # confidences at or above this, and answers directly after this many confirmations.
+    template_min_confidence: float = 0.9
+    template_min_confirmations: int = 2
+
+    # Batch duplicate detection (SimHash bits; 0 keeps exact and identical-text reuse only)
+    dedup_near_max_distance: int = 3
+
+
+# Config fields that each checkpointed stage output depends on (see pipeline/checkpoint.py).
+# Every PipelineConfig field must appear here or in UNSTAGED_FIELDS.
+STAGE_CONFIG_FIELDS: dict[str, tuple[str, ...]] = {
+    "extract": ("min_useful_chars", "convert_shard_min_pages", "convert_shards"),
+    "blocks": (),
+    "segments": ("segment_bundles", "segment_header_y_norm", "segment_header_similarity"),
+    "candidates": (
+        "spacy_model",
+        "max_candidates_per_type",
+        "consolidate_candidates",
+        "use_field_index",
+        "ner_prefilter",
+        "ner_max_block_chars",
+        "ner_top_region_only",
+        "ner_top_region_y_norm",
+        "ner_keyword_window",
+        "spatial_neighbor_distance",
+    ),
+    "ranked": (
+        "weight_keyword_same_block",
+        "weight_keyword_nearby",
+        "weight_top_of_doc_for_company",
+        "weight_frequency",
+        "weight_shape",
+        "spatial_neighbor_distance",
+    ),
+    "decision": (
+        "seed",
+        "top_k_for_llm",
+        "llama_n_ctx",
+        "llama_max_tokens",
+        "llama_temperature",
+        "llama_top_p",
+        "llama_top_k",
+        "llama_chat_format",
+        "ranker_accept_probability",
+        "cascade_min_confidence",
+    ),
+}
+
+# Fields that do not change any cached stage output.
+UNSTAGED_FIELDS: frozenset[str] = frozenset(
+    {
+        "allow_network",
+        "min_confidence_when_defined",
+        "gazetteer_min_confidence",
+        "gazetteer_cnpj_window",
+        "template_min_confidence",
+        "template_min_confirmations",
+        "dedup_near_max_distance",
+        "budget_convert_seconds",
+        "budget_max_pages",
+        "budget_max_blocks",
+        "budget_llm_seconds",
+        "worker_max_documents",
+        "worker_max_rss_mb",
+        "process_max_documents",
+        "process_max_rss_mb",
+        "shed_queue_depth",
+        "shed_p95_seconds",
+        "shed_resume_fraction",
+        "shed_window",
+        "shed_min_margin",
+        "llama_auto_n_ctx",
+        "llama_n_threads",
+        "llama_n_batch",
+        "llama_use_mmap",
+        "llama_use_mlock",
+    }
+)
+
+
+# Config layers for warm processes. Model fields are bound once per process: they select or
+# configure loaded models (spaCy, GGUF settings that key the Llama cache) or process-wide
+# machinery (conversion, which may run in a worker process, shedding, caches). Request fields are read per document,
+# so they can be overridden per request or tenant without reloading anything.
+MODEL_FIELDS: frozenset[str] = frozenset(
+    {
+        "seed",
+        "allow_network",
+        "min_useful_chars",
+        "convert_shard_min_pages",
+        "convert_shards",
+        "spacy_model",
+        "llama_n_ctx",
+        "llama_chat_format",
+        "llama_auto_n_ctx",
+        "llama_n_threads",
+        "llama_n_batch",
+        "llama_use_mmap",
+        "llama_use_mlock",
+        "budget_convert_seconds",
+        "worker_max_documents",
+        "worker_max_rss_mb",
+        "process_max_documents",
+        "process_max_rss_mb",
+        "shed_queue_depth",
+        "shed_p95_seconds",
+        "shed_resume_fraction",
+        "shed_window",
+        "template_min_confirmations",
+        "dedup_near_max_distance",
+    }
+)
+
+REQUEST_FIELDS: frozenset[str] = frozenset(
+    {
+        "max_candidates_per_type",
+        "consolidate_candidates",
+        "use_field_index",
+        "ner_prefilter",
+        "ner_max_block_chars",
+        "ner_top_region_only",
+        "ner_top_region_y_norm",
+        "ner_keyword_window",
+        "spatial_neighbor_distance",
+        "segment_bundles",
+        "segment_header_y_norm",
+        "segment_header_similarity",
+        "top_k_for_llm",
+        "weight_keyword_same_block",
+        "weight_keyword_nearby",
+        "weight_top_of_doc_for_company",
+        "weight_frequency",
+        "weight_shape",
+        "llama_max_tokens",
+        "llama_temperature",
+        "llama_top_p",
+        "llama_top_k",
+        "cascade_min_confidence",
+        "ranker_accept_probability",
+        "budget_max_pages",
+        "budget_max_blocks",
+        "budget_llm_seconds",
+        "shed_min_margin",
+        "min_confidence_when_defined",
+        "gazetteer_min_confidence",
+        "gazetteer_cnpj_window",
+        "template_min_confidence",
+    }
+)
+
+CONFIG_LAYERS: dict[str, frozenset[str]] = {"model": MODEL_FIELDS, "request": REQUEST_FIELDS}
+
+
+def _type_error(name: str, value: object) -> str | None:
+    # Request fields have plain bool/int/float/str defaults; JSON ints are valid floats.
+    default = getattr(PipelineConfig(), name)
+    if isinstance(default, bool):
+        ok = isinstance(value, bool)
+    elif isinstance(default, int):
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    elif isinstance(default, float):
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        ok = isinstance(value, type(default))
+    return None if ok else f"{name} must be {type(default).__name__}, got {value!r}"
+
+
+def with_overrides(cfg: PipelineConfig, overrides: dict) -> PipelineConfig:
+    """
+    `cfg` with request-level `overrides` applied. Model fields, unknown names and values
+    of the wrong type raise ValueError: a model field would need a reload the warm
+    process does not do.
+    """
+    rejected = sorted(set(overrides) - REQUEST_FIELDS)
+    if rejected:
+        raise ValueError(f"not overridable per request: {', '.join(rejected)}")
+    errors = [e for name, value in sorted(overrides.items()) if (e := _type_error(name, value)) is not None]
+    if errors:
+        raise ValueError("; ".join(errors))
+    values = {name: float(v) if isinstance(getattr(cfg, name), float) else v for name, v in overrides.items()}
+    return replace(cfg, **values) if values else cfg
+
+
+def layer_hash(cfg: PipelineConfig, layer: str) -> str:
+    values = {name: getattr(cfg, name) for name in sorted(CONFIG_LAYERS[layer])}
+    material = json.dumps(values, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+
+
+def load_override_rules(path: Path, cfg: PipelineConfig) -> list[tuple[str, dict]]:
+    """
+    Per-request overrides from a JSON object mapping document-name globs to field values,
+    e.g. {"tenant-a/*": {"weight_shape": 1.0}}; rules are validated against `cfg` here.
+    """
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(payload, dict) or not all(isinstance(v, dict) for v in payload.values()):
+        raise ValueError(f"{path}: expected an object of glob -> {{field: value}}")
+    rules = [(str(pattern), dict(values)) for pattern, values in payload.items()]
+    for _, values in rules:
+        with_overrides(cfg, values)
+    return rules
+
+
+def widest_request(cfg: PipelineConfig, rules: list[tuple[str, dict]]) -> PipelineConfig:
+    """
+    `cfg` with the largest top_k_for_llm and llama_max_tokens of any rule. Both size the
+    LLM context (typical_n_ctx), so preloading with this config keeps the resident
+    context large enough for every override and no request reloads the GGUF.
+    """
+    widest = {
+        name: max([getattr(cfg, name), *(values[name] for _, values in rules if name in values)])
+        for name in ("top_k_for_llm", "llama_max_tokens")
+    }
+    return replace(cfg, **widest)
+
+
+def overrides_for(rules: list[tuple[str, dict]], name: str) -> dict:
+    """Overrides of the first rule whose glob matches the document name ({} when none does)."""
+    for pattern, values in rules:
+        if fnmatch.fnmatch(name, pattern):
+            return values
+    return {}
+
+
+def stage_config_hash(cfg: PipelineConfig, stage: str) -> str:
+    values = {name: getattr(cfg, name) for name in STAGE_CONFIG_FIELDS[stage]}
+    material = json.dumps(values, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+
+
+def config_hash(cfg: PipelineConfig, *extra: str) -> str:
+    values = {name: getattr(cfg, name) for name in config_field_names()}
+    material = json.dumps([values, list(extra)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+
+
+def config_field_names() -> list[str]:
+    return [f.name for f in fields(PipelineConfig)]
+
 
 def resolve_model_path(model_path: str | None) -> Path | None:
     if model_path is None:
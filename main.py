@@ -1,59 +1,300 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import json
+import os
+import signal
 import sys
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from config import PipelineConfig, resolve_model_path
-from pipeline.blocks import build_blocks
+from config import (
+    PipelineConfig,
+    config_hash,
+    layer_hash,
+    load_override_rules,
+    overrides_for,
+    resolve_model_path,
+    widest_request,
+    with_overrides,
+)
+from pipeline.batch import iter_batch_inputs, iter_pdf_paths, run_batch
+from pipeline.blocks import Block, build_blocks
+from pipeline.budget import BudgetExceeded, ConversionWorker, check_extracted, check_page_count
 from pipeline.candidates import generate_candidates
+from pipeline.cascade import decide_with_cascade
+from pipeline.checkpoint import ArtifactStore, checkpointed, decision_inputs, model_fingerprint, stage_key
 from pipeline.confidence import compute_confidence
-from pipeline.decision_llm import decide_with_llm
+from pipeline.decision_llm import _fallback_decision, decide_with_llm
+from pipeline.dedup import DuplicateIndex
 from pipeline.extract_json import extract_docling_json
+from pipeline.gazetteer import Gazetteer, cnpjs_near
+from pipeline.journal import ResultJournal
+from pipeline.llm_tune import apply_profile, default_profile_path, load_profile
+from pipeline.memory import RECYCLE_EXIT_CODE, AllocationDiff, ProcessRecycler, rss_bytes
+from pipeline.metrics import Metrics, MetricsWriter
+from pipeline.preload import ModelPreloader
+from pipeline.ranker import Ranker, decide_with_ranker, load_ranker
 from pipeline.scoring import score_and_rank
+from pipeline.segments import Segment, merge_repeated_forms, split_segments
+from pipeline.shedding import LoadShedder, shed_decision
+from pipeline.sources import PdfMember, is_archive
+from pipeline.templates import TemplateCache, TemplateHit
+from pipeline.two_phase import RefinementQueue
+from pipeline.utils import bytes_sha256, file_sha256, write_json_atomic
+from pipeline.watch import FolderWatcher, WatchStatus
+from pipeline.workqueue import WorkQueue
 
 
-def write_json(path: Path, payload: dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+def fail_safe_result(debug: dict) -> dict:
+    return {
+        "funcionario": "INDEFINIDO",
+        "empresa": "INDEFINIDO",
+        "confidence": {"funcionario": 0.0, "empresa": 0.0},
+        "debug": debug,
+    }
 
 
-def run(pdf_path: Path, out_path: Path, model_path: Path | None, cfg: PipelineConfig, debug: bool) -> dict:
-    try:
-        extracted = extract_docling_json(str(pdf_path), cfg=cfg)
-    except Exception as exc:  # noqa: BLE001 - fail safe
-        return {
-            "funcionario": "INDEFINIDO",
-            "empresa": "INDEFINIDO",
-            "confidence": {"funcionario": 0.0, "empresa": 0.0},
-            "debug": {"error": f"extract_failed:{type(exc).__name__}"},
-        }
+def _learn_employer(gazetteer: Gazetteer, blocks: list[Block], ranked: dict, chosen: str, cfg: PipelineConfig) -> None:
+    cnpjs: list[str] = []
+    for item in ranked.get("empresa") or []:
+        if item.get("text") == chosen:
+            cnpjs = cnpjs_near(blocks, str(item.get("block_id", "")), window=cfg.gazetteer_cnpj_window)
+            break
+    gazetteer.add(chosen, cnpjs)
 
-    if extracted.get("extraction_quality") != "ok":
-        return {
-            "funcionario": "INDEFINIDO",
-            "empresa": "INDEFINIDO",
-            "confidence": {"funcionario": 0.0, "empresa": 0.0},
-            "debug": {"extraction_quality": extracted.get("extraction_quality", "unknown")},
-        }
 
-    blocks = build_blocks(extracted)
-    candidates = generate_candidates(blocks, cfg=cfg)
-    ranked = score_and_rank(blocks, candidates, cfg=cfg)
+def _learn_template(templates: TemplateCache, blocks: list[Block], ranked: dict, decision: dict) -> None:
+    answers: dict[str, tuple[str, str]] = {}
+    for kind in ("funcionario", "empresa"):
+        chosen = decision.get(kind)
+        for item in ranked.get(kind) or []:
+            if item.get("text") == chosen:
+                answers[kind] = (str(chosen), str(item.get("block_id", "")))
+                break
+    templates.learn(blocks, answers)
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """
+    Per-process resources shared by every document: loaded models and their preloader,
+    learned state, the artifact cache, telemetry, the conversion worker and the
+    --overrides rules. None (or empty) disables each of them.
+    """
+
+    cascade_models: tuple[Path, ...] = ()  # smallest first; decide before model_path
+    ranker: Ranker | None = None
+    ranker_path: Path | None = None
+    preloader: ModelPreloader | None = None
+    gazetteer: Gazetteer | None = None
+    templates: TemplateCache | None = None
+    store: ArtifactStore | None = None
+    metrics: Metrics | None = None
+    worker: ConversionWorker | None = None
+    shedder: LoadShedder | None = None
+    refiner: RefinementQueue | None = None
+    override_rules: list[tuple[str, dict]] = field(default_factory=list)
+
 
-    decision = decide_with_llm(
-        blocks=blocks,
-        ranked=ranked,
-        model_path=model_path,
-        cfg=cfg,
+class _Document:
+    """State of one run() call shared by its stages: effective config, extraction, stage timer."""
+
+    def __init__(
+        self, pdf_path: Path, model_path: Path | None, cfg: PipelineConfig, debug: bool, ctx: RunContext
+    ) -> None:
+        self.pdf_path = pdf_path
+        self.model_path = model_path
+        self.overrides = overrides_for(ctx.override_rules, str(pdf_path))
+        self.cfg = with_overrides(cfg, self.overrides)
+        self.debug = debug
+        self.ctx = ctx
+        self.extracted: dict = {}
+        self.blocks: list[Block] = []
+        self.k_blocks = ""
+        self.segments: list[Segment] = []
+        self.t = time.perf_counter()
+        # Candidates and ranking per block list, shared by the two phases of a two-phase run.
+        self.scored: dict[int, tuple[dict, dict]] = {}
+
+    def key(self, stage: str, *inputs: str) -> str:
+        return stage_key(stage, self.cfg, *inputs) if self.ctx.store is not None else ""
+
+    def lap(self, stage: str) -> None:
+        if self.ctx.metrics is not None:
+            self.t = self.ctx.metrics.lap(stage, self.t)
+
+
+def _convert(doc: _Document, data: bytes | None) -> dict:
+    if doc.ctx.worker is not None:
+        return doc.ctx.worker.convert(data if data is not None else str(doc.pdf_path), name=doc.pdf_path.name)
+    if data is not None:
+        return extract_docling_json(data, cfg=doc.cfg, name=doc.pdf_path.name)
+    return extract_docling_json(str(doc.pdf_path), cfg=doc.cfg)
+
+
+def _from_template(doc: _Document, blocks: list[Block], template: TemplateHit) -> dict:
+    by_id = {b.id: b for b in blocks}
+    ranked = {
+        kind: [
+            {
+                "text": getattr(template, kind),
+                "block_id": template.block_ids[kind],
+                "page": by_id[template.block_ids[kind]].page,
+                "score": 1.0,
+                "reasons": ["template"],
+            }
+        ]
+        for kind in ("funcionario", "empresa")
+    }
+    decision = {
+        "funcionario": template.funcionario,
+        "empresa": template.empresa,
+        "llm_used": False,
+        "template": template.fingerprint,
+    }
+    conf = compute_confidence(ranked=ranked, decision=decision, blocks=blocks, cfg=doc.cfg)
+    doc.lap("decision")
+    if doc.ctx.metrics is not None:
+        doc.ctx.metrics.record_decision(decision)
+    debug_payload: dict = {"extraction_quality": doc.extracted.get("extraction_quality", "unknown")}
+    if doc.debug:
+        debug_payload |= {"blocks_count": len(blocks), "template": template.fingerprint, "llm_used": False}
+    return {
+        "funcionario": decision["funcionario"],
+        "empresa": decision["empresa"],
+        "confidence": conf,
+        "debug": debug_payload,
+    }
+
+
+def _candidates_and_ranking(doc: _Document, blocks: list[Block], k_blocks: str) -> tuple[dict, dict]:
+    if id(blocks) in doc.scored:
+        return doc.scored[id(blocks)]
+
+    def find_candidates() -> dict:
+        if doc.ctx.preloader is not None:
+            doc.ctx.preloader.wait_spacy()
+        return generate_candidates(blocks, cfg=doc.cfg, fields=doc.extracted.get("fields"))
+
+    k_candidates = doc.key("candidates", k_blocks)
+    candidates = checkpointed(
+        doc.ctx.store,
+        "candidates",
+        k_candidates,
+        find_candidates,
+        # Not when NER failed: a later run with spaCy available should redo it.
+        keep=lambda c: (c.get("_meta") or {}).get("spacy") != "unavailable",
+    )
+    doc.lap("candidates")
+    ranked = checkpointed(
+        doc.ctx.store,
+        "ranked",
+        doc.key("ranked", k_candidates),
+        lambda: score_and_rank(blocks, candidates, cfg=doc.cfg),
     )
+    doc.lap("scoring")
+    doc.scored[id(blocks)] = (candidates, ranked)
+    return candidates, ranked
+
+
+def _llm_or_shed(
+    ctx: RunContext, blocks: list[Block], ranked: dict, model_path: Path | None, cfg: PipelineConfig
+) -> dict:
+    # Under load, clear-cut documents take the heuristic answer instead of waiting for the LLM.
+    if ctx.shedder is not None and model_path is not None and ctx.shedder.overloaded():
+        shed = shed_decision(ranked, cfg)
+        if shed is not None:
+            return shed
+    if ctx.cascade_models and model_path is not None:
+        return decide_with_cascade(blocks, ranked, [*ctx.cascade_models, model_path], cfg)
+    return decide_with_llm(blocks=blocks, ranked=ranked, model_path=model_path, cfg=cfg)
+
+
+def _decide(doc: _Document, blocks: list[Block], ranked: dict) -> dict:
+    ctx = doc.ctx
+    if ctx.ranker is not None:
+        return decide_with_ranker(
+            blocks, ranked, doc.model_path, doc.cfg, ctx.ranker, decide=functools.partial(_llm_or_shed, ctx)
+        )
+    return _llm_or_shed(ctx, blocks=blocks, ranked=ranked, model_path=doc.model_path, cfg=doc.cfg)
+
+
+def _checkpointed_decision(doc: _Document, blocks: list[Block], ranked: dict) -> dict:
+    ctx, model_path = doc.ctx, doc.model_path
+    return checkpointed(
+        ctx.store,
+        "decision",
+        doc.key(
+            "decision",
+            decision_inputs(ranked, doc.cfg),
+            model_fingerprint(model_path),
+            *(model_fingerprint(m) for m in ctx.cascade_models),
+            *([model_fingerprint(ctx.ranker_path)] if ctx.ranker is not None else []),
+        ),
+        lambda: _decide(doc, blocks, ranked),
+        # A fallback caused by a missing runtime (or load shedding) must not be replayed once the
+        # LLM is available; a ranker answer for both fields never needed it.
+        keep=lambda d: bool(d.get("llm_used")) or model_path is None or len(d.get("probability") or {}) == 2,
+    )
+
+
+def _solve(doc: _Document, blocks: list[Block], k_blocks: str, provisional: bool = False) -> dict:
+    ctx, cfg = doc.ctx, doc.cfg
+    # A confirmed layout template reads both answers from their regions directly.
+    template = ctx.templates.extract(blocks) if ctx.templates is not None else None
+    if template is not None:
+        return _from_template(doc, blocks, template)
+
+    candidates, ranked = _candidates_and_ranking(doc, blocks, k_blocks)
+
+    # A confirmed employer short-circuits the empresa ranking: it becomes the only option.
+    hit = ctx.gazetteer.resolve(blocks, candidates.get("empresas")) if ctx.gazetteer is not None else None
+    if hit is not None:
+        ranked["empresa"] = [
+            {"text": hit.name, "block_id": hit.block_id, "page": hit.page, "score": 1.0, "reasons": ["gazetteer"]}
+        ]
+
+    if provisional:
+        # Phase one of a two-phase run: the heuristic answer now, the LLM in the background.
+        d = _fallback_decision(ranked)
+        decision = {"funcionario": d.funcionario, "empresa": d.empresa, "llm_used": False}
+    else:
+        decision = _checkpointed_decision(doc, blocks, ranked)
+    if hit is not None:
+        decision["empresa"] = hit.name
+        (decision.get("probability") or {}).pop("empresa", None)
+    doc.lap("decision")
     conf = compute_confidence(ranked=ranked, decision=decision, blocks=blocks, cfg=cfg)
+    if not provisional:
+        doc.lap("confidence")
+        if ctx.metrics is not None:
+            ctx.metrics.record_candidates(
+                len(candidates.get("funcionarios") or []),
+                len(candidates.get("empresas") or []),
+                str((candidates.get("_meta") or {}).get("spacy")),
+            )
+            ctx.metrics.record_decision(decision)
+
+    if (
+        ctx.gazetteer is not None
+        and not provisional
+        and decision["empresa"] != "INDEFINIDO"
+        and conf["empresa"] >= cfg.gazetteer_min_confidence
+    ):
+        _learn_employer(ctx.gazetteer, blocks, ranked, decision["empresa"], cfg)
+    if ctx.templates is not None and not provisional and min(conf.values()) >= cfg.template_min_confidence:
+        _learn_template(ctx.templates, blocks, ranked, decision)
 
     debug_payload: dict = {
-        "extraction_quality": extracted.get("extraction_quality", "unknown"),
+        "extraction_quality": doc.extracted.get("extraction_quality", "unknown"),
     }
-    if debug:
+    if decision.get("shed"):
+        # Always reported: shed documents are meant to be reprocessed when load drops.
+        debug_payload["shed"] = decision["shed"]
+    if doc.debug:
         debug_payload |= {
             "blocks_count": len(blocks),
             "candidates_count": {
@@ -67,6 +308,12 @@ def run(pdf_path: Path, out_path: Path, model_path: Path | None, cfg: PipelineCo
             },
             "llm_used": bool(decision.get("llm_used", False)),
         }
+        if decision.get("ranker_used"):
+            debug_payload["ranker"] = decision.get("probability") or {}
+        if decision.get("cascade"):
+            debug_payload["cascade"] = decision["cascade"]
+        if hit is not None:
+            debug_payload["gazetteer"] = {"empresa": hit.name, "via": hit.via}
 
     return {
         "funcionario": decision["funcionario"],
@@ -76,11 +323,193 @@ def run(pdf_path: Path, out_path: Path, model_path: Path | None, cfg: PipelineCo
     }
 
 
+def _assemble(doc: _Document, provisional: bool) -> dict:
+    if doc.cfg.segment_bundles:
+        # One conversion, one decision per form in the bundle.
+        forms: list[dict] = []
+        for seg in doc.segments:
+            k_segment = doc.key("segments", doc.k_blocks, f"{seg.start_page}-{seg.end_page}")
+            forms.append({"pages": [seg.start_page, seg.end_page]} | _solve(doc, seg.blocks, k_segment, provisional))
+        result = {
+            "forms": merge_repeated_forms(forms),
+            "debug": {
+                "extraction_quality": doc.extracted.get("extraction_quality", "unknown"),
+                "segments": len(doc.segments),
+            },
+        }
+    else:
+        result = _solve(doc, doc.blocks, doc.k_blocks, provisional)
+    if doc.overrides:
+        # Which request layer produced the result, e.g. to compare A/B variants.
+        result["debug"] = result["debug"] | {"request_config": layer_hash(doc.cfg, "request")}
+    return result | {"provisional": True} if provisional else result
+
+
+def _refine(doc: _Document) -> dict:
+    try:
+        return _assemble(doc, provisional=False)
+    except BudgetExceeded as exc:
+        return fail_safe_result({"error": f"budget_exceeded:{exc.stage}"})
+
+
+def run(
+    pdf_path: Path,
+    out_path: Path,
+    model_path: Path | None,
+    cfg: PipelineConfig,
+    debug: bool,
+    ctx: RunContext | None = None,
+    data: bytes | None = None,
+) -> dict:
+    """
+    Process one PDF; with `data` the PDF is read from memory and `pdf_path` only names it.
+    `ctx` carries the process-wide resources (see RunContext):
+      - cascade_models (smallest first) decide before `model_path`, which only sees the
+        documents they escalate
+      - with a preloader, models load in the background and the stages join them when needed
+      - with a refiner, the heuristic result is returned at once, marked "provisional", and
+        the full decision runs on the refiner, which publishes the refined result (see two_phase)
+      - the first override rule matching `pdf_path` sets request-level config fields for this
+        document only (see with_overrides); the loaded models stay as they are
+    """
+    ctx = ctx or RunContext()
+    doc = _Document(pdf_path, model_path, cfg, debug, ctx)
+    cfg, metrics = doc.cfg, ctx.metrics
+    t_start = doc.t
+    try:
+        check_page_count(data if data is not None else str(pdf_path), cfg)
+        if ctx.store is None:
+            k_extract = ""
+        else:
+            k_extract = doc.key("extract", bytes_sha256(data) if data is not None else file_sha256(pdf_path))
+        doc.extracted = checkpointed(
+            ctx.store,
+            "extract",
+            k_extract,
+            lambda: _convert(doc, data),
+            keep=lambda e: bool(e.get("blocks")),
+        )
+        check_extracted(doc.extracted, cfg)
+    except BudgetExceeded as exc:
+        if metrics is not None:
+            metrics.record_document("error")
+        return fail_safe_result({"error": f"budget_exceeded:{exc.stage}"})
+    except Exception as exc:  # noqa: BLE001 - fail safe
+        if metrics is not None:
+            metrics.record_document("error")
+        return fail_safe_result({"error": f"extract_failed:{type(exc).__name__}"})
+    doc.lap("extract")
+
+    if doc.extracted.get("extraction_quality") != "ok":
+        if metrics is not None:
+            metrics.record_document(doc.extracted.get("extraction_quality", "error"))
+        return fail_safe_result({"extraction_quality": doc.extracted.get("extraction_quality", "unknown")})
+    if ctx.preloader is not None:
+        ctx.preloader.start_llm()
+
+    doc.k_blocks = doc.key("blocks", k_extract)
+    doc.blocks = checkpointed(ctx.store, "blocks", doc.k_blocks, lambda: build_blocks(doc.extracted))
+    doc.lap("blocks")
+    if cfg.segment_bundles:
+        doc.segments = split_segments(doc.blocks, cfg)
+
+    try:
+        result = _assemble(doc, provisional=ctx.refiner is not None)
+    except BudgetExceeded as exc:
+        if metrics is not None:
+            metrics.record_document("error")
+        return fail_safe_result({"error": f"budget_exceeded:{exc.stage}"})
+
+    if metrics is not None:
+        metrics.lap("total", t_start)
+        metrics.record_document("ok")
+    if ctx.shedder is not None:
+        ctx.shedder.observe(time.perf_counter() - t_start)
+    if ctx.refiner is not None:
+        return ctx.refiner.submit(str(pdf_path), result, functools.partial(_refine, doc))
+    return result
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Offline PDF pipeline (empresa, funcionario)")
-    p.add_argument("--pdf", required=True, help="Path to input PDF")
-    p.add_argument("--out", required=True, help="Path to output JSON")
-    p.add_argument("--model", required=False, help="Path to GGUF model for llama.cpp")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--pdf", help="Path to input PDF ('-' reads the PDF from stdin)")
+    src.add_argument(
+        "--batch",
+        help="Directory of PDFs, a zip/tar archive, or a text file with one PDF or archive path per line. --out is "
+        "then an append-only JSONL journal; re-running with the same journal skips documents already completed.",
+    )
+    src.add_argument(
+        "--watch",
+        nargs="+",
+        metavar="DIR",
+        help="Keep running and process PDFs as they land in these directories (recursive), with the models kept "
+        "loaded. Each result is written next to its PDF as <name>.json, or below --out when given.",
+    )
+    src.add_argument(
+        "--queue",
+        metavar="DIR",
+        help="Shared work-queue directory (e.g. on NFS): claim PDFs from it until it is drained, alongside other "
+        "nodes running the same command. Results go below --out (a shared output directory).",
+    )
+    p.add_argument(
+        "--out",
+        required=False,
+        help="Path to output JSON (JSONL journal with --batch; output directory with --watch or --queue). "
+        "Required unless --watch.",
+    )
+    p.add_argument(
+        "--enqueue",
+        metavar="SOURCE",
+        help="With --queue, first add the PDFs of a directory or list file (as for --batch, archives excluded) to the "
+        "queue; PDFs already queued or done are skipped. Run it from one node.",
+    )
+    p.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=300.0,
+        help="With --queue, seconds without a heartbeat after which a claimed PDF is taken back from its node "
+        "(default: 300).",
+    )
+    p.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="With --queue, claims of a PDF whose node died or hung before it is moved to failed/ (default: 3).",
+    )
+    p.add_argument(
+        "--queue-poll",
+        type=float,
+        default=5.0,
+        help="With --queue, seconds between claims while other nodes finish (default: 5).",
+    )
+    p.add_argument("--watch-workers", type=int, default=2, help="With --watch, documents processed at once (default: 2).")
+    p.add_argument("--watch-poll", type=float, default=2.0, help="With --watch, seconds between scans (default: 2).")
+    p.add_argument(
+        "--watch-settle",
+        type=float,
+        default=5.0,
+        help="With --watch, seconds a PDF's size and mtime must stay unchanged before it is queued (default: 5).",
+    )
+    p.add_argument(
+        "--prefetch",
+        type=int,
+        default=2,
+        help="With --batch, archive members read ahead in the background while a document converts (default: 2).",
+    )
+    p.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="With --batch, process exact and near-duplicate PDFs again instead of reusing the earlier result.",
+    )
+    p.add_argument(
+        "--model",
+        nargs="+",
+        required=False,
+        help="Path to GGUF model for llama.cpp. Several paths (smallest first) form a cascade: each larger model "
+        "only decides documents the previous one escalates (INDEFINIDO, disagreement with the heuristic top-1 "
+        "or low confidence).",
+    )
     p.add_argument(
         "--chat-format",
         required=False,
@@ -91,19 +520,406 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Disable network access (no model downloads). If required models are missing, output will be INDEFINIDO.",
     )
+    p.add_argument(
+        "--llm-profile",
+        required=False,
+        help="llama.cpp runtime profile from `python -m pipeline.llm_tune` (default: <model>.profile.json if present).",
+    )
     p.add_argument("--debug", action="store_true", help="Include debug details in the output JSON.")
+    p.add_argument(
+        "--gazetteer",
+        required=False,
+        help="Path to the persistent employer gazetteer JSON. Read before the run and updated with confirmed employers.",
+    )
+    p.add_argument("--gazetteer-import", required=False, help="Merge another gazetteer JSON into --gazetteer first.")
+    p.add_argument("--gazetteer-export", required=False, help="Write a copy of the gazetteer to this path after the run.")
+    p.add_argument(
+        "--two-phase",
+        action="store_true",
+        help="With --pdf: write the heuristic result (marked \"provisional\") to --out at once, then replace it "
+        "with the LLM-refined result when that finishes.",
+    )
+    p.add_argument(
+        "--overrides",
+        required=False,
+        help="JSON object mapping document-name globs to request-level config fields, e.g. "
+        "{\"tenant-a/*\": {\"weight_shape\": 1.0}}. The first matching glob applies to a document; the loaded "
+        "models are not reloaded, so model fields (spacy_model, llama_n_ctx, llama_chat_format, ...) are rejected.",
+    )
+    p.add_argument(
+        "--templates",
+        required=False,
+        help="Path to the persistent layout-template JSON. Recurring form layouts learned from confident results "
+        "are answered from their regions, skipping candidates, scoring and the LLM.",
+    )
+    p.add_argument(
+        "--cache-dir",
+        required=False,
+        help="Directory for per-stage artifacts. Re-runs only recompute stages whose inputs or config changed.",
+    )
+    p.add_argument(
+        "--split-bundles",
+        action="store_true",
+        help="Treat the PDF as a bundle of forms: the output holds one result per form under \"forms\", "
+        "each with its page range.",
+    )
+    p.add_argument(
+        "--ranker",
+        required=False,
+        help="Learned ranker JSON from `python -m pipeline.ranker`. Fields it is confident about skip the LLM.",
+    )
+    p.add_argument(
+        "--max-convert-seconds",
+        type=float,
+        default=0.0,
+        help="Kill a Docling conversion running longer than this (it then runs in a child process). 0 = no limit.",
+    )
+    p.add_argument(
+        "--shard-min-pages",
+        type=int,
+        default=0,
+        help="Convert PDFs with at least this many pages as page ranges in parallel processes. 0 = never.",
+    )
+    p.add_argument("--shards", type=int, default=4, help="Number of page ranges for --shard-min-pages (default: 4).")
+    p.add_argument(
+        "--worker-max-docs",
+        type=int,
+        default=0,
+        help="Run Docling in a child process replaced after this many documents (warmed first). 0 = no limit.",
+    )
+    p.add_argument(
+        "--worker-max-rss-mb",
+        type=float,
+        default=0.0,
+        help="Replace the Docling child process once its RSS exceeds this many MB (warmed first). 0 = no limit.",
+    )
+    p.add_argument(
+        "--process-max-docs",
+        type=int,
+        default=0,
+        help=f"With --batch/--watch/--queue, stop taking documents after this many, finish the running ones "
+        f"and exit with status {RECYCLE_EXIT_CODE} so a supervisor restarts the process. 0 = no limit.",
+    )
+    p.add_argument(
+        "--process-max-rss-mb",
+        type=float,
+        default=0.0,
+        help="Like --process-max-docs, once the main process (spaCy, LLM) exceeds this many MB of RSS. 0 = no limit.",
+    )
+    p.add_argument(
+        "--tracemalloc",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Every N documents, print the source lines whose Python allocations grew most (slow). 0 = off.",
+    )
+    p.add_argument("--max-pages", type=int, default=0, help="Skip PDFs with more pages than this. 0 = no limit.")
+    p.add_argument(
+        "--max-blocks", type=int, default=0, help="Skip documents converting to more text blocks than this. 0 = no limit."
+    )
+    p.add_argument(
+        "--max-llm-seconds",
+        type=float,
+        default=0.0,
+        help="Stop LLM generation after this many seconds (the document becomes INDEFINIDO). 0 = no limit.",
+    )
+    p.add_argument(
+        "--shed-queue-depth",
+        type=int,
+        default=0,
+        help="With --watch, answer clear-cut documents heuristically (no LLM) while the backlog is at least this. "
+        "0 = off.",
+    )
+    p.add_argument(
+        "--shed-p95-seconds",
+        type=float,
+        default=0.0,
+        help="Answer clear-cut documents heuristically while the p95 document latency is at least this. 0 = off.",
+    )
+    p.add_argument(
+        "--metrics-out",
+        required=False,
+        help="Write stage latency histograms and decision/cache counters to this file during and after the run.",
+    )
+    p.add_argument(
+        "--metrics-format",
+        choices=["prometheus", "json"],
+        required=False,
+        help="Format for --metrics-out (default: json for *.json, otherwise Prometheus text format).",
+    )
+    p.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between --metrics-out rewrites while a batch is running (default: 30).",
+    )
     return p
 
 
 def main(argv: list[str]) -> int:
-    args = build_parser().parse_args(argv)
-    cfg = PipelineConfig(allow_network=not bool(args.offline), llama_chat_format=args.chat_format)
-    pdf_path = Path(args.pdf)
-    out_path = Path(args.out)
-    model_path = resolve_model_path(args.model)
-
-    payload = run(pdf_path=pdf_path, out_path=out_path, model_path=model_path, cfg=cfg, debug=bool(args.debug))
-    write_json(out_path, payload)
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.out is None and not args.watch:
+        parser.error("--out is required unless --watch is used")
+    if args.enqueue and not args.queue:
+        parser.error("--enqueue only applies to --queue")
+    if args.two_phase and not args.pdf:
+        parser.error("--two-phase only applies to --pdf")
+    if args.queue and (args.gazetteer or args.templates):
+        # Every node would overwrite the others' learned entries when saving the shared file.
+        parser.error(
+            "--gazetteer/--templates cannot be shared by --queue nodes; "
+            "use --gazetteer-import <shared> with a per-node --gazetteer-export"
+        )
+    cfg = PipelineConfig(
+        allow_network=not bool(args.offline),
+        llama_chat_format=args.chat_format,
+        segment_bundles=bool(args.split_bundles),
+        convert_shard_min_pages=args.shard_min_pages,
+        convert_shards=args.shards,
+        budget_convert_seconds=args.max_convert_seconds,
+        budget_max_pages=args.max_pages,
+        budget_max_blocks=args.max_blocks,
+        budget_llm_seconds=args.max_llm_seconds,
+        worker_max_documents=args.worker_max_docs,
+        worker_max_rss_mb=args.worker_max_rss_mb,
+        process_max_documents=args.process_max_docs,
+        process_max_rss_mb=args.process_max_rss_mb,
+        shed_queue_depth=args.shed_queue_depth,
+        shed_p95_seconds=args.shed_p95_seconds,
+    )
+    out_path = Path(args.out) if args.out else Path(".")
+    model_paths = [resolve_model_path(m) for m in args.model or []]
+    # The last (largest) model is the final tier; the others run first, in order.
+    model_path = model_paths[-1] if model_paths else None
+    cascade_models = tuple(model_paths[:-1])
+    if model_path is not None:
+        # Runtime settings found by `python -m pipeline.llm_tune` on this machine, if any.
+        profile_path = Path(args.llm_profile) if args.llm_profile else default_profile_path(model_path)
+        cfg = apply_profile(cfg, load_profile(profile_path))
+
+    gazetteer_path = Path(args.gazetteer) if args.gazetteer else None
+    gazetteer = Gazetteer.load(gazetteer_path) if gazetteer_path is not None else None
+    if args.gazetteer_import:
+        if gazetteer is None:
+            gazetteer = Gazetteer()
+        gazetteer.merge(Gazetteer.load(Path(args.gazetteer_import)))
+
+    override_rules: list[tuple[str, dict]] = []
+    if args.overrides:
+        try:
+            override_rules = load_override_rules(Path(args.overrides), cfg)
+        except (OSError, ValueError, TypeError) as exc:
+            parser.error(f"--overrides: {exc}")
+
+    templates_path = Path(args.templates) if args.templates else None
+    templates = (
+        TemplateCache.load(templates_path, cfg.template_min_confirmations) if templates_path is not None else None
+    )
+
+    store = ArtifactStore(Path(args.cache_dir)) if args.cache_dir else None
+    ranker_path = Path(args.ranker) if args.ranker else None
+    ranker = load_ranker(str(ranker_path)) if ranker_path is not None else None
+
+    metrics = metrics_writer = None
+    if args.metrics_out or cascade_models:
+        # Also kept without --metrics-out for the cascade escalation report.
+        metrics = Metrics()
+        if store is not None:
+            metrics.bind_cache(store.hits, store.misses)
+    if args.metrics_out:
+        metrics_writer = MetricsWriter(
+            metrics, Path(args.metrics_out), fmt=args.metrics_format, interval_seconds=args.metrics_interval
+        )
+
+    # Conversions run in a child process only when it has a time budget or recycling limits.
+    worker = None
+    if cfg.budget_convert_seconds > 0 or cfg.worker_max_documents > 0 or cfg.worker_max_rss_mb > 0:
+        worker = ConversionWorker(
+            cfg,
+            cfg.budget_convert_seconds,
+            max_documents=cfg.worker_max_documents,
+            max_rss_mb=cfg.worker_max_rss_mb,
+        )
+    allocations = AllocationDiff(args.tracemalloc) if args.tracemalloc > 0 else None
+    recycler = ProcessRecycler(cfg.process_max_documents, cfg.process_max_rss_mb)
+
+    # Once per process: spaCy starts loading now, the LLM after the first usable extraction.
+    # Sized for the largest overridden prompt, so no request reloads the GGUF.
+    preloader = ModelPreloader(widest_request(cfg, override_rules), model_path, cascade_models)
+    shedder = LoadShedder(cfg) if cfg.shed_queue_depth > 0 or cfg.shed_p95_seconds > 0 else None
+    refiner = None
+    if args.two_phase:
+        refiner = RefinementQueue(publish=lambda _key, result: write_json_atomic(out_path, result))
+    ctx = RunContext(
+        cascade_models=cascade_models,
+        ranker=ranker,
+        ranker_path=ranker_path,
+        preloader=preloader,
+        gazetteer=gazetteer,
+        templates=templates,
+        store=store,
+        metrics=metrics,
+        worker=worker,
+        shedder=shedder,
+        refiner=refiner,
+        override_rules=override_rules,
+    )
+
+    def save_learned() -> None:
+        if templates is not None and templates_path is not None and templates.dirty:
+            templates.save(templates_path)
+        if gazetteer is not None and gazetteer_path is not None and gazetteer.dirty:
+            gazetteer.save(gazetteer_path)
+
+    def pdf_path_of(item: Path | PdfMember) -> Path:
+        return Path(item.name) if isinstance(item, PdfMember) else item
+
+    def request_layer(item: Path | PdfMember) -> str:
+        # The request config run() gives this item (see RunContext.override_rules).
+        return layer_hash(with_overrides(cfg, overrides_for(override_rules, str(pdf_path_of(item)))), "request")
+
+    def process(item: Path | PdfMember) -> dict:
+        try:
+            return run(
+                pdf_path=pdf_path_of(item),
+                out_path=out_path,
+                model_path=model_path,
+                cfg=cfg,
+                debug=bool(args.debug),
+                ctx=ctx,
+                data=item.data if isinstance(item, PdfMember) else None,
+            )
+        except Exception as exc:  # noqa: BLE001 - one bad document must not end a batch
+            if metrics is not None:
+                metrics.record_document("error")
+            return fail_safe_result({"error": f"run_failed:{type(exc).__name__}"})
+        finally:
+            recycler.tick()
+            if allocations is not None:
+                allocations.tick()
+            if metrics is not None:
+                metrics.process_rss_bytes.set(rss_bytes())
+                if worker is not None:
+                    metrics.worker_rss_bytes.set(worker.rss_bytes)
+                    metrics.worker_documents.set(worker.documents)
+                    metrics.worker_recycled.set(worker.recycled)
+            if metrics_writer is not None:
+                metrics_writer.maybe_write()
+
+    try:
+        if args.batch:
+            # Turn SIGTERM (e.g. host preemption) into a normal exit so the journal is flushed.
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+            with ResultJournal(out_path) as journal:
+                summary = run_batch(
+                    iter_batch_inputs(Path(args.batch), prefetch_depth=args.prefetch),
+                    journal=journal,
+                    process=process,
+                    config_hash=config_hash(
+                        cfg,
+                        model_fingerprint(model_path),
+                        *(model_fingerprint(m) for m in cascade_models),
+                        *([model_fingerprint(ranker_path)] if ranker else []),
+                        *([json.dumps(override_rules, sort_keys=True)] if override_rules else []),
+                    ),
+                    dedup=None if args.no_dedup else DuplicateIndex(max_distance=cfg.dedup_near_max_distance),
+                    # Duplicates under different --overrides rules are decided separately.
+                    variant=request_layer if override_rules else None,
+                    stop=recycler.stop,
+                )
+            print(
+                f"batch: {summary.processed} processed ({summary.duplicates} reused as duplicates), "
+                f"{summary.skipped} skipped (journal), {summary.unreadable} unreadable, {summary.total} total",
+                file=sys.stderr,
+            )
+        elif args.watch:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+            last: list[WatchStatus] = []
+
+            def report(status: WatchStatus) -> None:
+                if shedder is not None:
+                    shedder.set_queue_depth(status.backlog)
+                if metrics is not None:
+                    metrics.watch_backlog.set(status.backlog)
+                if metrics_writer is not None:
+                    metrics_writer.maybe_write()
+                # A long-running watcher persists what it learned as it goes.
+                save_learned()
+                if not last or status != last[0]:
+                    print(
+                        f"watch: backlog {status.backlog} ({status.settling} settling, {status.queued} queued, "
+                        f"{status.running} running), {status.done} done, {status.failed} failed",
+                        file=sys.stderr,
+                    )
+                    last[:] = [status]
+
+            watcher = FolderWatcher(
+                [Path(d) for d in args.watch],
+                process=process,
+                out_dir=Path(args.out) if args.out else None,
+                workers=args.watch_workers,
+                poll_seconds=args.watch_poll,
+                settle_seconds=args.watch_settle,
+                on_status=report,
+            )
+            try:
+                watcher.run(recycler.stop)
+            except KeyboardInterrupt:
+                pass
+        elif args.queue:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+            queue = WorkQueue(Path(args.queue), lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+            if args.enqueue:
+                source = Path(args.enqueue)
+                pdfs = [p for p in iter_pdf_paths(source) if not is_archive(p)]
+                # Paths below the base name the results in the output tree.
+                parents = [p.resolve().parent for p in pdfs] or [source.resolve().parent]
+                base = source if source.is_dir() else Path(os.path.commonpath(parents))
+                print(f"queue: {queue.enqueue(pdfs, base)} PDFs added", file=sys.stderr)
+            summary = queue.run(process, out_path, poll_seconds=args.queue_poll, stop=recycler.stop)
+            print(
+                f"queue: {summary.processed} processed, {summary.reclaimed} expired leases reclaimed, "
+                f"{summary.failed} moved to failed/",
+                file=sys.stderr,
+            )
+        elif refiner is not None:
+            # The refiner writes both results to --out: the provisional one now, the refined one later.
+            result = process(PdfMember("stdin.pdf", sys.stdin.buffer.read()) if args.pdf == "-" else Path(args.pdf))
+            if result.get("provisional"):
+                print("two-phase: provisional result written, refining", file=sys.stderr)
+            else:
+                # Failed before a decision (e.g. budget): nothing to refine.
+                write_json_atomic(out_path, result)
+        elif args.pdf == "-":
+            write_json_atomic(out_path, process(PdfMember("stdin.pdf", sys.stdin.buffer.read())))
+        else:
+            write_json_atomic(out_path, process(Path(args.pdf)))
+    finally:
+        # Also on SIGTERM (sys.exit in batch, watch and queue modes): learned entries survive a stop.
+        if refiner is not None:
+            refiner.close()
+        if worker is not None:
+            worker.close()
+        save_learned()
+        if gazetteer is not None and args.gazetteer_export:
+            gazetteer.save(Path(args.gazetteer_export))
+        if metrics_writer is not None:
+            metrics_writer.write()
+    if cascade_models and metrics is not None and metrics.cascade_decisions.value:
+        reasons = ", ".join(f"{r} {c.value}" for r, c in metrics.cascade_escalations.items() if c.value)
+        print(
+            f"cascade: {metrics.cascade_escalated.value}/{metrics.cascade_decisions.value} decisions escalated"
+            + (f" ({reasons})" if reasons else ""),
+            file=sys.stderr,
+        )
+    if (args.batch or args.watch or args.queue) and recycler.stop.is_set():
+        print(
+            f"recycle: stopping after {recycler.documents} documents ({rss_bytes() // (1024 * 1024)} MB RSS), "
+            "restart to continue",
+            file=sys.stderr,
+        )
+        return RECYCLE_EXIT_CODE
     return 0
 
 
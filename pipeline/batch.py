@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import tarfile
+import threading
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from pipeline.dedup import DuplicateIndex, text_print
+from pipeline.extract_json import pdf_text_layer
+from pipeline.journal import ResultJournal, journal_key
+from pipeline.shedding import is_shed
+from pipeline.sources import PdfMember, is_archive, iter_archive_members, prefetch
+from pipeline.utils import bytes_sha256, file_sha256
+
+
+@dataclass(frozen=True)
+class BatchSummary:
+    total: int
+    processed: int
+    skipped: int
+    unreadable: int
+    duplicates: int = 0
+
+
+def iter_pdf_paths(source: Path) -> list[Path]:
+    """
+    Resolve a batch source into PDF (or zip/tar archive) paths, in a stable order:
+      - a directory: every *.pdf and archive below it (recursive, sorted)
+      - a .pdf file or an archive: that file
+      - any other file: a list with one path per line (relative paths are resolved
+        against the list file's directory; blank lines and "#" comments are ignored)
+    """
+    if source.is_dir():
+        return sorted(
+            p for p in source.rglob("*") if p.is_file() and (p.suffix.lower() == ".pdf" or is_archive(p))
+        )
+    if source.suffix.lower() == ".pdf" or is_archive(source):
+        return [source]
+    paths: list[Path] = []
+    for line in source.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        p = Path(line)
+        paths.append(p if p.is_absolute() else source.parent / p)
+    return paths
+
+
+def iter_batch_inputs(source: Path, prefetch_depth: int = 2) -> Iterator[Path | PdfMember]:
+    """
+    Batch inputs from `source` (see iter_pdf_paths), with archives expanded into their
+    PDF members. Members are read in memory, `prefetch_depth` ahead of the consumer; an
+    archive that cannot be read (or fails midway) yields one unreadable entry.
+    """
+    for path in iter_pdf_paths(source):
+        if not is_archive(path):
+            yield path
+            continue
+        try:
+            yield from prefetch(iter_archive_members(path), prefetch_depth)
+        except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError):
+            yield PdfMember(str(path), None)
+
+
+def _reusable(result: dict) -> bool:
+    # Fail-safe results (errors, budgets, weak extraction) may be transient: never copy them to duplicates.
+    debug = result.get("debug") or {}
+    return not debug.get("error") and debug.get("extraction_quality", "ok") == "ok"
+
+
+def run_batch(
+    paths: Iterable[Path | PdfMember],
+    journal: ResultJournal,
+    process: Callable[[Path | PdfMember], dict],
+    config_hash: str,
+    dedup: DuplicateIndex | None = None,
+    variant: Callable[[Path | PdfMember], str] | None = None,
+    stop: threading.Event | None = None,
+) -> BatchSummary:
+    """
+    Process every input not already in the journal for this content and config hash.
+    Inputs are PDF paths or in-memory PdfMembers (see iter_batch_inputs).
+    `process` must be fail-safe (return a payload instead of raising).
+
+    With `dedup`, resubmissions within the batch reuse an earlier result instead of
+    being converted again (see DuplicateIndex); reuses are journaled like any result.
+    Only successful results are reused, and only between inputs with the same
+    `variant(input)` (e.g. the request config their --overrides rule gives them).
+    Once `stop` is set, no further input is taken; a re-run with the same journal resumes.
+    """
+    total = processed = skipped = unreadable = duplicates = 0
+    try:
+        for path in paths:
+            if stop is not None and stop.is_set():
+                break
+            total += 1
+            if isinstance(path, PdfMember):
+                if path.data is None:
+                    unreadable += 1
+                    continue
+                name, content_hash = path.name, bytes_sha256(path.data)
+            else:
+                try:
+                    name, content_hash = str(path), file_sha256(path)
+                except OSError:
+                    unreadable += 1
+                    continue
+            done = journal.get(journal_key(name, content_hash, config_hash))
+            # Load-shed results are provisional: a re-run gives them another chance at the LLM.
+            if done is not None and not is_shed(done.get("result") or {}):
+                skipped += 1
+                continue
+            if dedup is None:
+                result = process(path)
+            else:
+                tp = None
+                scope = variant(path) if variant is not None else ""
+                result = dedup.match_content(content_hash, scope)
+                if result is None:
+                    layer = pdf_text_layer(path.data if isinstance(path, PdfMember) else str(path))
+                    tp = text_print(layer) if layer else None
+                    result = dedup.match_text(tp, scope)
+                if result is not None:
+                    duplicates += 1
+                else:
+                    result = process(path)
+                    if _reusable(result):
+                        dedup.remember(name, content_hash, tp, result, scope)
+            journal.append(name, content_hash, config_hash, result)
+            processed += 1
+    finally:
+        journal.flush()
+    return BatchSummary(
+        total=total, processed=processed, skipped=skipped, unreadable=unreadable, duplicates=duplicates
+    )
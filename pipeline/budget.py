@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import threading
+from typing import Any, Callable
+
+from config import PipelineConfig
+from pipeline.extract_json import extract_docling_json, pdf_page_count
+from pipeline.memory import rss_bytes
+
+
+# How long a fresh child may take to import and warm Docling; not part of any document's budget.
+STARTUP_SECONDS = 300.0
+
+
+class BudgetExceeded(Exception):
+    """A document went over a PipelineConfig budget_* limit while in `stage`."""
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(stage)
+        self.stage = stage
+
+
+def warm_docling(cfg: PipelineConfig) -> None:
+    # Pay Docling's import and converter setup before the first document arrives.
+    try:
+        from docling.document_converter import DocumentConverter  # type: ignore
+    except Exception:  # noqa: BLE001
+        return
+    DocumentConverter()
+
+
+def _serve(
+    conn: Any, cfg: PipelineConfig, target: Callable[..., dict], warm: Callable[[PipelineConfig], None] | None
+) -> None:
+    if warm is not None:
+        try:
+            warm(cfg)
+        except Exception:  # noqa: BLE001 - a cold worker still converts
+            pass
+    conn.send(("ready", rss_bytes()))
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        source, name = request
+        try:
+            extracted = target(source, cfg) if isinstance(source, str) else target(source, cfg, name=name)
+            conn.send((True, extracted, rss_bytes()))
+        except Exception as exc:  # noqa: BLE001 - reported to the parent, the worker stays up
+            conn.send((False, type(exc).__name__, rss_bytes()))
+
+
+class _Child:
+    def __init__(self, proc: Any, conn: Any) -> None:
+        self.proc = proc
+        self.conn = conn
+        self.ready = False
+        self.documents = 0
+        self.rss_bytes = 0
+
+
+class ConversionWorker:
+    """
+    Runs Docling conversions in a child process so a hung conversion can be killed.
+
+    The child is long-lived; when a conversion exceeds `timeout_seconds` (0 = no limit)
+    it is killed and a fresh child is started on the next call (`recycled` counts
+    replacements). With `max_documents` or `max_rss_mb`, a child past either limit is
+    also recycled, gracefully: a standby child is started and warmed (`warm`) while the
+    old one keeps converting, and takes over once it reports ready.
+    A child's warm-up is bounded by `startup_seconds` (0 = no limit) instead: the
+    conversion budget only starts once the document is sent.
+    Calls from several threads are serialized.
+    """
+
+    def __init__(
+        self,
+        cfg: PipelineConfig,
+        timeout_seconds: float,
+        target: Callable[..., dict] = extract_docling_json,
+        max_documents: int = 0,
+        max_rss_mb: float = 0.0,
+        warm: Callable[[PipelineConfig], None] | None = warm_docling,
+        startup_seconds: float = STARTUP_SECONDS,
+    ) -> None:
+        self.cfg = cfg
+        self.timeout_seconds = timeout_seconds
+        self.target = target
+        self.max_documents = max_documents
+        self.max_rss_mb = max_rss_mb
+        self.warm = warm
+        self.startup_seconds = startup_seconds
+        self.recycled = 0
+        self._active: _Child | None = None
+        self._standby: _Child | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def documents(self) -> int:
+        """Documents converted by the current child."""
+        return self._active.documents if self._active is not None else 0
+
+    @property
+    def rss_bytes(self) -> int:
+        """Last resident set size reported by the current child."""
+        return self._active.rss_bytes if self._active is not None else 0
+
+    @property
+    def pid(self) -> int | None:
+        return self._active.proc.pid if self._active is not None else None
+
+    def _start(self) -> _Child:
+        # spawn: never fork a parent that may hold llama.cpp/spaCy state and threads.
+        ctx = mp.get_context("spawn")
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_serve, args=(child, self.cfg, self.target, self.warm), daemon=True)
+        proc.start()
+        child.close()
+        return _Child(proc, parent)
+
+    @staticmethod
+    def _wait(conn: Any, seconds: float) -> bool:
+        return conn.poll(seconds if seconds > 0 else None)
+
+    @staticmethod
+    def _stop(child: _Child, graceful: bool) -> None:
+        if graceful:
+            try:
+                child.conn.send(None)
+            except OSError:
+                pass
+            child.proc.join(2.0)
+        else:
+            child.proc.terminate()
+            child.proc.join(1.0)
+        if child.proc.is_alive():
+            child.proc.kill()
+            child.proc.join()
+        child.conn.close()
+
+    def kill(self) -> None:
+        if self._active is None:
+            return
+        self._stop(self._active, graceful=False)
+        self._active = None
+        self.recycled += 1
+
+    def _over_limit(self, child: _Child) -> bool:
+        return (self.max_documents > 0 and child.documents >= self.max_documents) or (
+            self.max_rss_mb > 0 and child.rss_bytes >= self.max_rss_mb * 1024 * 1024
+        )
+
+    def _promote_standby(self, wait: bool) -> None:
+        standby = self._standby
+        if standby is None or not (wait or standby.conn.poll(0)):
+            return
+        self._standby = None
+        if self._active is not None:
+            self._stop(self._active, graceful=True)
+            self.recycled += 1
+        self._active = standby
+
+    def _ensure_ready(self) -> _Child:
+        if self._active is not None and not self._active.proc.is_alive():
+            self._active.conn.close()
+            self._active = None
+        self._promote_standby(wait=self._active is None)
+        if self._active is None:
+            self._active = self._start()
+        child = self._active
+        if not child.ready:
+            ready = self._wait(child.conn, self.startup_seconds)
+            try:
+                if ready:
+                    _, child.rss_bytes = child.conn.recv()
+            except EOFError:
+                ready = False
+            if not ready:
+                self.kill()
+                raise RuntimeError("conversion worker failed to start")
+            child.ready = True
+        return child
+
+    def convert(self, pdf_path: str | bytes, name: str = "document.pdf") -> dict:
+        with self._lock:
+            return self._convert(pdf_path, name)
+
+    def _convert(self, pdf_path: str | bytes, name: str) -> dict:
+        child = self._ensure_ready()
+        child.conn.send((pdf_path, name))
+        if not self._wait(child.conn, self.timeout_seconds):
+            self.kill()
+            raise BudgetExceeded("extract")
+        try:
+            ok, payload, child.rss_bytes = child.conn.recv()
+        except EOFError:
+            # The child died mid-conversion (e.g. OOM-killed): same outcome as a failed conversion.
+            self.kill()
+            return {"blocks": [], "extraction_quality": "weak"}
+        child.documents += 1
+        if self._standby is None and self._over_limit(child):
+            # Warm the replacement now; it takes over at the first call after it is ready.
+            self._standby = self._start()
+        if not ok:
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self) -> None:
+        for child in (self._active, self._standby):
+            if child is not None:
+                self._stop(child, graceful=True)
+        self._active = self._standby = None
+
+    def __enter__(self) -> "ConversionWorker":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def check_page_count(pdf_path: str | bytes, cfg: PipelineConfig) -> None:
+    """Apply the page budget before converting, when the page count can be read cheaply."""
+    if cfg.budget_max_pages <= 0:
+        return
+    n = pdf_page_count(pdf_path)
+    if n is not None and n > cfg.budget_max_pages:
+        raise BudgetExceeded("pages")
+
+
+def check_extracted(extracted: dict, cfg: PipelineConfig) -> None:
+    """Apply the page and block budgets to a conversion result."""
+    blocks = extracted.get("blocks") or []
+    if cfg.budget_max_blocks > 0 and len(blocks) > cfg.budget_max_blocks:
+        raise BudgetExceeded("blocks")
+    if cfg.budget_max_pages > 0:
+        pages = {b.get("page") for b in blocks if isinstance(b, dict)}
+        if len(pages) > cfg.budget_max_pages:
+            raise BudgetExceeded("pages")
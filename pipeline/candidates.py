@@ -1,89 +1,23 @@
 from __future__ import annotations
 
-import re
-from dataclasses import dataclass
+import unicodedata
+from dataclasses import dataclass, replace
+from typing import Callable
 
 from config import PipelineConfig
 from pipeline.blocks import Block
-from pipeline.utils import normalize_for_match, normalize_text
-
-
-_PERSON_FALLBACK_RE = re.compile(
-    r"\b([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ][a-záàâãéèêíìîóòôõúùûç]+(?:\s+"
-    r"[A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ][a-záàâãéèêíìîóòôõúùûç]+){1,3})\b"
-)
-
-_PERSON_ALLCAPS_RE = re.compile(
-    r"\b([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ]{2,}(?:\s+(?:DA|DE|DO|DOS|DAS)\s+)?"
-    r"[A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ]{2,}(?:\s+[A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ]{2,}){0,2})\b"
-)
-
-_PERSON_KEYWORD_LINE_RE = re.compile(
-    r"(?i)\b(?:nome|funcion[áa]rio|empregado)\b\s*[:\-]\s*(.+)$"
-)
-
-_COMPANY_HINT_RE = re.compile(
-    r"\b(LTDA|Ltda|S\/A|SA|EIRELI|ME|EPP|E\.?P\.?P\.?|IND[ÚU]STRIA|COM[ÉE]RCIO|SERVI[ÇC]OS)\b"
+from pipeline.models import load_spacy
+from pipeline.rules import (
+    COMPANY_LABELS,
+    EMPLOYEE_KEYWORDS,
+    could_contain_person,
+    first_tokens,
+    looks_like_company,
+    looks_like_person,
+    scan_block,
 )
-
-_COMPANY_KEYWORD_LINE_RE = re.compile(
-    r"(?i)\b(?:empresa|empregador|raz[aã]o\s+social|unidade|estabelecimento|local|fantasia|nome\s+fantasia)\b\s*(?:[:\-]\s*)?(.+)$"
-)
-
-_COMPANY_PREFIX_RE = re.compile(r"(?i)\b(CEI|EMEI|EMEF|EE|E\.E\.|E\.M\.|E\.M\.E\.I\.)\b")
-
-_STOP_TOKENS = {
-    "cpf",
-    "rg",
-    "cnpj",
-    "ctps",
-    "pis",
-    "nascimento",
-    "endereco",
-    "endereço",
-    "empresa",
-    "empregador",
-    "funcionario",
-    "funcionário",
-    "nome",
-    "razao",
-    "razão",
-    "social",
-    "medica",
-    "médica",
-    "saude",
-    "saúde",
-    "ocupacional",
-}
-
-_COMPANY_STOP_PHRASES = {
-    "exame",
-    "físico",
-    "fisico",
-    "periódico",
-    "periodico",
-    "atestado",
-    "laudo",
-    "resultado",
-    "relatório",
-    "relatorio",
-    "ocupacional",
-    "saúde ocupacional",
-    "saude ocupacional",
-}
-
-_NAME_CONNECTORS = {"da", "de", "do", "dos", "das"}
-_COMPANY_LABELS = {
-    "empresa",
-    "empregador",
-    "razao social",
-    "razão social",
-    "fantasia",
-    "nome fantasia",
-    "unidade",
-    "estabelecimento",
-    "local",
-}
+from pipeline.spatial import SpatialIndex
+from pipeline.utils import normalize_for_match, normalize_text
 
 
 @dataclass(frozen=True)
@@ -95,262 +29,178 @@ class Candidate:
     page: int
     block_index: int
     source: str
-
-
-def _looks_like_person(text: str) -> bool:
-    t = normalize_text(text)
-    if any(ch.isdigit() for ch in t):
-        return False
-    parts = [p for p in t.split(" ") if p]
-    if not (2 <= len(parts) <= 4):
-        return False
-    lowered = normalize_for_match(t)
-    if any(tok in _STOP_TOKENS for tok in lowered.split()):
-        return False
-    # Allow ALL-CAPS names (very common in forms), but still require sane tokens.
-    if t.isupper():
-        alpha_tokens = [p for p in parts if p.isalpha() or p in {"DA", "DE", "DO", "DOS", "DAS"}]
-        return len(alpha_tokens) >= 2
-
-    # Require at least two tokens starting with uppercase, ignoring connectors.
-    title_tokens = 0
-    for p in parts:
-        if normalize_for_match(p) in _NAME_CONNECTORS:
-            continue
-        if p[:1].isupper():
-            title_tokens += 1
-    return title_tokens >= 2
-
-
-def _extract_person_candidates_spacy(blocks: list[Block], cfg: PipelineConfig) -> list[Candidate]:
-    try:
-        import spacy  # type: ignore
-    except Exception:  # noqa: BLE001
-        return []
-
-    try:
-        nlp = spacy.load(cfg.spacy_model)
-    except Exception:  # noqa: BLE001
-        return []
+    # Near-duplicates merged into this candidate by _consolidate: (block_id, source) of
+    # each variant, and their normalized texts (see score_and_rank).
+    variants: tuple[tuple[str, str], ...] = ()
+    aliases: tuple[str, ...] = ()
+
+
+def _candidate(kind: str, value: str, b: Block, source: str) -> Candidate:
+    return Candidate(
+        kind=kind,
+        text=value,
+        norm=normalize_for_match(value),
+        block_id=b.id,
+        page=b.page,
+        block_index=b.index,
+        source=source,
+    )
+
+
+def _ner_block_filter(blocks: list[Block], cfg: PipelineConfig) -> list[bool]:
+    """Return, per block, whether it should go through spaCy NER."""
+    keep = [bool(b.text) for b in blocks]
+    if cfg.ner_prefilter:
+        keep = [k and could_contain_person(b.text) for k, b in zip(keep, blocks)]
+    if cfg.ner_max_block_chars > 0:
+        keep = [k and len(b.text) <= cfg.ner_max_block_chars for k, b in zip(keep, blocks)]
+
+    restrict_top = cfg.ner_top_region_only
+    restrict_kw = cfg.ner_keyword_window >= 0
+    if not (restrict_top or restrict_kw):
+        return keep
+
+    # With region restrictions on, a block must fall in at least one enabled region.
+    allowed = [False] * len(blocks)
+    if restrict_top:
+        for i, b in enumerate(blocks):
+            if b.page == 1 and b.y_norm <= cfg.ner_top_region_y_norm:
+                allowed[i] = True
+    if restrict_kw:
+        w = cfg.ner_keyword_window
+        for i, b in enumerate(blocks):
+            tokens = set(normalize_for_match(b.text).split())
+            if tokens & EMPLOYEE_KEYWORDS:
+                for j in range(max(0, i - w), min(len(blocks), i + w + 1)):
+                    if blocks[j].page == b.page:
+                        allowed[j] = True
+    return [k and a for k, a in zip(keep, allowed)]
+
+
+def _extract_person_candidates_spacy(blocks: list[Block], cfg: PipelineConfig) -> tuple[list[Candidate], dict]:
+    stats = {"ner_blocks_processed": 0, "ner_blocks_skipped": 0}
+    nlp = load_spacy(cfg.spacy_model)
+    if nlp is None:
+        return [], stats
+
+    selected = [b for b, keep in zip(blocks, _ner_block_filter(blocks, cfg)) if keep]
+    stats["ner_blocks_processed"] = len(selected)
+    stats["ner_blocks_skipped"] = len(blocks) - len(selected)
 
     candidates: list[Candidate] = []
-    for b in blocks:
-        if not b.text:
-            continue
-        doc = nlp(b.text)
+    for b, doc in zip(selected, nlp.pipe(b.text for b in selected)):
         for ent in doc.ents:
             label = (ent.label_ or "").upper()
             if label not in {"PER", "PERSON"}:
                 continue
             value = normalize_text(ent.text)
-            if not _looks_like_person(value):
+            if not looks_like_person(value):
                 continue
-            candidates.append(
-                Candidate(
-                    kind="funcionario",
-                    text=value,
-                    norm=normalize_for_match(value),
-                    block_id=b.id,
-                    page=b.page,
-                    block_index=b.index,
-                    source="spacy",
-                )
-            )
-    return candidates
-
-
-def _extract_person_candidates_fallback(blocks: list[Block]) -> list[Candidate]:
-    candidates: list[Candidate] = []
-    for b in blocks:
-        for m in _PERSON_FALLBACK_RE.finditer(b.text or ""):
-            value = normalize_text(m.group(1))
-            if not _looks_like_person(value):
-                continue
-            candidates.append(
-                Candidate(
-                    kind="funcionario",
-                    text=value,
-                    norm=normalize_for_match(value),
-                    block_id=b.id,
-                    page=b.page,
-                    block_index=b.index,
-                    source="regex",
-                )
-            )
-        for m in _PERSON_ALLCAPS_RE.finditer(b.text or ""):
-            value = normalize_text(m.group(1))
-            if not _looks_like_person(value):
-                continue
-            candidates.append(
-                Candidate(
-                    kind="funcionario",
-                    text=value,
-                    norm=normalize_for_match(value),
-                    block_id=b.id,
-                    page=b.page,
-                    block_index=b.index,
-                    source="regex_caps",
-                )
-            )
-    return candidates
-
-
-def _extract_person_candidates_keyword_line(blocks: list[Block]) -> list[Candidate]:
-    candidates: list[Candidate] = []
-    for b in blocks:
-        txt = b.text or ""
-        m = _PERSON_KEYWORD_LINE_RE.search(txt)
-        if not m:
-            continue
-        value = normalize_text(m.group(1))
-        # Cut after 4 tokens to avoid carrying trailing fields (CPF/RG/etc.).
-        parts = [p for p in value.split(" ") if p]
-        value = " ".join(parts[:4])
-        if not _looks_like_person(value):
-            continue
-        candidates.append(
-            Candidate(
-                kind="funcionario",
-                text=value,
-                norm=normalize_for_match(value),
-                block_id=b.id,
-                page=b.page,
-                block_index=b.index,
-                source="keyword_line",
-            )
-        )
-    return candidates
-
-
-def _extract_company_candidates(blocks: list[Block]) -> list[Candidate]:
-    candidates: list[Candidate] = []
+            candidates.append(_candidate("funcionario", value, b, "spacy"))
+    return candidates, stats
 
-    def looks_like_company(value: str) -> bool:
-        v = normalize_text(value)
-        if len(v) < 3 or len(v) > 140:
-            return False
-        # Allow small numbers (e.g., "CEI 1"), but reject identifiers (CNPJ/CPF) by long digit runs.
-        if re.search(r"\d{8,}", v):
-            return False
-        v_norm = normalize_for_match(v)
-        for bad in _COMPANY_STOP_PHRASES:
-            if normalize_for_match(bad) in v_norm:
-                return False
-        # Require either a known prefix (CEI/EMEI/...) or 2+ tokens.
-        parts = [p for p in v.split(" ") if p]
-        if _COMPANY_PREFIX_RE.search(v):
-            return True
-        return len(parts) >= 2
 
-    for b in blocks:
-        txt = b.text or ""
-        if not txt.strip():
+def _label_value_by_layout(b: Block, spatial: SpatialIndex, cfg: PipelineConfig) -> Candidate | None:
+    # Forms put the value right of the label, or under it.
+    for direction, source in (("right", "label_right_block"), ("below", "label_below_block")):
+        nb = spatial.nearest_within_page_fraction(b, direction, cfg.spatial_neighbor_distance)
+        if nb is None or not normalize_text(nb.text):
             continue
+        val = first_tokens(nb.text, 12)
+        if looks_like_company(val):
+            return _candidate("empresa", val, nb, source)
+    return None
+
+
+def _extract_rule_candidates(
+    blocks: list[Block], cfg: PipelineConfig
+) -> tuple[list[Candidate], list[Candidate], list[Candidate]]:
+    """
+    Single pass of the rule scanner over all blocks.
+
+    Returns (person keyword-line, person regex, company) candidates, each in block order,
+    so callers can keep the historical precedence between rule families.
+    """
+    person_keyword: list[Candidate] = []
+    person_regex: list[Candidate] = []
+    company: list[Candidate] = []
+    spatial = SpatialIndex(blocks) if cfg.spatial_neighbor_distance > 0 else None
 
-        # Keyword line in the SAME block, e.g. "Empresa: CEI Erinice Siqueira"
-        # Also supports "Empresa\nCEI Erinice Siqueira" and "Fantasia: ..."
-        lines = [ln.strip() for ln in txt.splitlines() if ln.strip()]
-        if lines:
-            first_norm = normalize_for_match(lines[0])
-            if first_norm in _COMPANY_LABELS and len(lines) >= 2:
-                value = normalize_text(lines[1])
-                parts = [p for p in value.split(" ") if p]
-                value = " ".join(parts[:12])
-                if looks_like_company(value):
-                    candidates.append(
-                        Candidate(
-                            kind="empresa",
-                            text=value,
-                            norm=normalize_for_match(value),
-                            block_id=b.id,
-                            page=b.page,
-                            block_index=b.index,
-                            source="label_next_line",
-                        )
-                    )
-
-        m = _COMPANY_KEYWORD_LINE_RE.search(txt)
-        if m and m.group(1).strip():
-            value = normalize_text(m.group(1))
-            # Keep at most ~12 tokens to avoid carrying trailing fields.
-            parts = [p for p in value.split(" ") if p]
-            value = " ".join(parts[:12])
-            if looks_like_company(value):
-                candidates.append(
-                    Candidate(
-                        kind="empresa",
-                        text=value,
-                        norm=normalize_for_match(value),
-                        block_id=b.id,
-                        page=b.page,
-                        block_index=b.index,
-                        source="keyword_line",
-                    )
-                )
-
-        # Label in one block, value in the next block(s) on the same page.
-        if normalize_for_match(txt) in _COMPANY_LABELS:
-            for delta in (1, 2, 3):
-                # blocks list is in stable order by index
-                nxt_index = b.index + delta
-                if nxt_index >= len(blocks):
-                    break
-                nb = blocks[nxt_index]
-                if nb.page != b.page:
-                    break
-                val = normalize_text(nb.text)
-                if not val:
+    for b in blocks:
+        for m in scan_block(b.text or ""):
+            if m.kind == "funcionario":
+                target = person_keyword if m.source == "keyword_line" else person_regex
+                target.append(_candidate("funcionario", m.text, b, m.source))
+            elif m.kind == "empresa":
+                company.append(_candidate("empresa", m.text, b, m.source))
+            elif m.kind == "empresa_label":
+                by_layout = _label_value_by_layout(b, spatial, cfg) if spatial is not None else None
+                if by_layout is not None:
+                    company.append(by_layout)
                     continue
-                parts = [p for p in val.split(" ") if p]
-                val = " ".join(parts[:12])
-                if looks_like_company(val):
-                    candidates.append(
-                        Candidate(
-                            kind="empresa",
-                            text=val,
-                            norm=normalize_for_match(val),
-                            block_id=nb.id,
-                            page=nb.page,
-                            block_index=nb.index,
-                            source="label_next_block",
-                        )
-                    )
-                    break
-
-        if _COMPANY_HINT_RE.search(txt):
-            value = normalize_text(txt)
-            if len(value) < 4 or not looks_like_company(value):
-                continue
-            candidates.append(
-                Candidate(
-                    kind="empresa",
-                    text=value,
-                    norm=normalize_for_match(value),
-                    block_id=b.id,
-                    page=b.page,
-                    block_index=b.index,
-                    source="company_hint",
-                )
-            )
-
-        # all-caps blocks are often headers / company names
-        if len(txt) >= 8 and txt.isupper() and not any(ch.isdigit() for ch in txt):
-            value = normalize_text(txt)
-            if not looks_like_company(value):
-                continue
-            candidates.append(
-                Candidate(
-                    kind="empresa",
-                    text=value,
-                    norm=normalize_for_match(value),
-                    block_id=b.id,
-                    page=b.page,
-                    block_index=b.index,
-                    source="caps",
-                )
-            )
+                # Label in one block, value in the next block(s) on the same page.
+                for delta in (1, 2, 3):
+                    # blocks list is in stable order by index
+                    nxt_index = b.index + delta
+                    if nxt_index >= len(blocks):
+                        break
+                    nb = blocks[nxt_index]
+                    if nb.page != b.page:
+                        break
+                    if not normalize_text(nb.text):
+                        continue
+                    val = first_tokens(nb.text, 12)
+                    if looks_like_company(val):
+                        company.append(_candidate("empresa", val, nb, "label_next_block"))
+                        break
+
+    return person_keyword, person_regex, company
+
+
+# Labels looked up in the field index, normalized once. A field-index hit skips NER and
+# the rules, so the person labels leave out the generic "nome" ("Nome: ACME LTDA").
+_PERSON_FIELD_LABELS = tuple(sorted({normalize_for_match(w) for w in EMPLOYEE_KEYWORDS - {"nome"}}))
+_COMPANY_FIELD_LABELS = tuple(sorted({normalize_for_match(w) for w in COMPANY_LABELS}))
+
+
+def _field_index_candidates(
+    blocks: list[Block], fields: list[dict]
+) -> tuple[list[Candidate], list[Candidate]]:
+    """
+    (person, company) candidates from Docling's label/value structure: the fields are
+    indexed by normalized label once, and each known employee/employer label is then a
+    dict lookup. A value is tied to the block holding the same text (same page first).
+    """
+    index: dict[str, list[dict]] = {}
+    for f in fields:
+        label = normalize_for_match(str(f.get("label") or "")).rstrip(":").strip()
+        if label:
+            index.setdefault(label, []).append(f)
+    if not index:
+        return [], []
+
+    by_text: dict[str, list[Block]] = {}
+    for b in blocks:
+        by_text.setdefault(b.text, []).append(b)
+
+    def lookup(labels: tuple[str, ...], kind: str, accept: Callable[[str], bool], n_tokens: int = 0) -> list[Candidate]:
+        out: list[Candidate] = []
+        for label in labels:
+            for f in index.get(label, ()):
+                text = normalize_text(str(f.get("value") or ""))
+                holders = by_text.get(text)
+                value = first_tokens(text, n_tokens) if n_tokens else text
+                if not holders or not accept(value):
+                    continue
+                b = next((h for h in holders if h.page == f.get("page")), holders[0])
+                out.append(_candidate(kind, value, b, "field_index"))
+        return sorted(out, key=lambda c: c.block_index)
 
-    return candidates
+    return (
+        # A person value is the whole field: looks_like_person only accepts 2-4 tokens anyway.
+        lookup(_PERSON_FIELD_LABELS, "funcionario", looks_like_person),
+        lookup(_COMPANY_FIELD_LABELS, "empresa", looks_like_company, n_tokens=12),
+    )
 
 
 def _dedupe(cands: list[Candidate]) -> list[Candidate]:
@@ -365,29 +215,138 @@ def _dedupe(cands: list[Candidate]) -> list[Candidate]:
     return out
 
 
-def generate_candidates(blocks: list[Block], cfg: PipelineConfig) -> dict:
-    spacy_ok = False
-    spacy_error: str | None = None
-    try:
-        person = _extract_person_candidates_spacy(blocks, cfg=cfg)
-        spacy_ok = True
-    except Exception as exc:  # noqa: BLE001
-        person = []
-        spacy_ok = False
-        spacy_error = type(exc).__name__
+# Sources whose value was cut out of a "label: value" layout.
+LABEL_VALUE_SOURCES = frozenset(
+    {
+        "keyword_line",
+        "label_next_line",
+        "label_next_block",
+        "label_right_block",
+        "label_below_block",
+        "field_index",
+    }
+)
 
-    person.extend(_extract_person_candidates_keyword_line(blocks))
-    person.extend(_extract_person_candidates_fallback(blocks))
-    company = _extract_company_candidates(blocks)
 
-    person = _dedupe(person)[: cfg.max_candidates_per_type]
-    company = _dedupe(company)[: cfg.max_candidates_per_type]
+def _fold(norm: str) -> tuple[str, ...]:
+    # Accent-folded tokens: "JOAO" and "João" become the same token.
+    decomposed = unicodedata.normalize("NFKD", norm)
+    return tuple("".join(ch for ch in decomposed if not unicodedata.combining(ch)).split())
+
+
+# First tokens of field labels, as 1-tuples to compare with _fold(...)[:1].
+_LABEL_WORDS = frozenset(_fold(normalize_for_match(w))[:1] for w in COMPANY_LABELS | EMPLOYEE_KEYWORDS)
+
+
+def _truncates(short: Candidate, short_tokens: tuple[str, ...], long: Candidate, long_tokens: tuple[str, ...]) -> bool:
+    # A shorter run of whole tokens (never a single token) joins a longer form only as its
+    # prefix, cut from the same block or by the same label source: "Maria Silva" after
+    # "Funcionário:" must not become an alias of a physician's "Maria Silva Santos".
+    n = len(short_tokens)
+    if n < 2 or n >= len(long_tokens) or long_tokens[:n] != short_tokens:
+        return False
+    return short.block_id == long.block_id or (short.source == long.source and short.source in LABEL_VALUE_SOURCES)
+
+
+def _consolidate(cands: list[Candidate]) -> list[Candidate]:
+    """
+    Cluster near-duplicate candidates: accent/case variants, and prefixes truncated in the
+    same block or by the same label source (such as "Sandra Regina" in "Nome: Sandra
+    Regina Hortencio"). A contained run found elsewhere stays a candidate of its own, so
+    one member's label evidence never lands on another person's block.
+
+    The canonical candidate carries the others as variants: the longest form not starting
+    with a label word (a whole block such as "Empresa: ACME LTDA" never wins over "ACME
+    LTDA"), earliest on ties. Clusters keep the position of their
+    earliest member. Cluster heads are found through a token index, so each candidate is
+    only compared with clusters that share its first token.
+    """
+    folded = [_fold(c.norm) for c in cands]
+    order = sorted(range(len(cands)), key=lambda i: (-len(folded[i]), i))
+    heads: list[int] = []
+    members: dict[int, list[int]] = {}
+    by_token: dict[str, list[int]] = {}
+    for i in order:
+        tokens = folded[i]
+        found = None
+        for h in by_token.get(tokens[0], []) if tokens else []:
+            if folded[h] == tokens or any(_truncates(cands[i], tokens, cands[m], folded[m]) for m in members[h]):
+                found = h
+                break
+        if found is None:
+            heads.append(i)
+            members[i] = [i]
+            for t in set(tokens):
+                by_token.setdefault(t, []).append(i)
+        else:
+            members[found].append(i)
+
+    out: list[tuple[int, Candidate]] = []
+    for h in heads:
+        best = min(members[h], key=lambda m: (folded[m][:1] in _LABEL_WORDS, -len(folded[m]), m))
+        head = cands[best]
+        variants: list[tuple[str, str]] = []
+        aliases: list[str] = []
+        for m in sorted(members[h]):
+            c = cands[m]
+            ref = (c.block_id, c.source)
+            if ref != (head.block_id, head.source) and ref not in variants:
+                variants.append(ref)
+            if c.norm != head.norm and c.norm not in aliases:
+                aliases.append(c.norm)
+        out.append((min(members[h]), replace(head, variants=tuple(variants), aliases=tuple(aliases))))
+    return [c for _, c in sorted(out, key=lambda pair: pair[0])]
+
+
+def generate_candidates(blocks: list[Block], cfg: PipelineConfig, fields: list[dict] | None = None) -> dict:
+    """
+    Employee and employer candidates for `blocks`. A field resolved from the Docling
+    label/value structure (`fields`, see extract_docling_json) is taken as is; only
+    unresolved fields go through the regex rules and spaCy NER.
+    """
+    by_field: tuple[list[Candidate], list[Candidate]] = ([], [])
+    if cfg.use_field_index and fields:
+        by_field = _field_index_candidates(blocks, fields)
+    resolved = [kind for kind, found in zip(("funcionario", "empresa"), by_field) if found]
+
+    # "ok": NER ran; "skipped": the field index resolved the person; "unavailable": NER failed.
+    spacy = "skipped"
+    spacy_error: str | None = None
+    ner_stats: dict = {}
+    if by_field[0]:
+        person = list(by_field[0])
+    else:
+        try:
+            person, ner_stats = _extract_person_candidates_spacy(blocks, cfg=cfg)
+            spacy = "ok"
+        except Exception as exc:  # noqa: BLE001
+            person = []
+            spacy = "unavailable"
+            spacy_error = type(exc).__name__
+
+    if len(resolved) < 2:
+        person_keyword, person_regex, company = _extract_rule_candidates(blocks, cfg=cfg)
+        if not by_field[0]:
+            person.extend(person_keyword)
+            person.extend(person_regex)
+        if by_field[1]:
+            company = list(by_field[1])
+    else:
+        company = list(by_field[1])
+
+    person = _dedupe(person)
+    company = _dedupe(company)
+    if cfg.consolidate_candidates:
+        person = _consolidate(person)
+        company = _consolidate(company)
+    person = person[: cfg.max_candidates_per_type]
+    company = company[: cfg.max_candidates_per_type]
 
     return {
         "funcionarios": [{"text": c.text, "block_id": c.block_id, "page": c.page} for c in person],
         "empresas": [{"text": c.text, "block_id": c.block_id, "page": c.page} for c in company],
         "_internal": {"funcionarios": person, "empresas": company},
-        "_meta": {"spacy_ok": spacy_ok, "spacy_error": spacy_error},
+        "_meta": {"spacy": spacy, "spacy_error": spacy_error, "field_index": resolved} | ner_stats,
     }
 
 
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from config import PipelineConfig
+from pipeline.blocks import Block
+from pipeline.confidence import compute_confidence
+from pipeline.decision_llm import decide_with_llm
+
+
+KINDS = ("funcionario", "empresa")
+
+
+def escalation_reasons(decision: dict, ranked: dict, blocks: list[Block], cfg: PipelineConfig) -> list[str]:
+    """Why a smaller model's decision is not final (empty when it is)."""
+    if not decision.get("llm_used"):
+        return ["unavailable"]
+    reasons: list[str] = []
+    if any(decision.get(k) == "INDEFINIDO" for k in KINDS):
+        reasons.append("indefinido")
+    for kind in KINDS:
+        items = ranked.get(kind) or []
+        if items and decision.get(kind) != items[0].get("text"):
+            reasons.append("disagrees_with_top1")
+            break
+    conf = compute_confidence(ranked=ranked, decision=decision, blocks=blocks, cfg=cfg)
+    if any(conf[k] < cfg.cascade_min_confidence for k in KINDS):
+        reasons.append("low_confidence")
+    return reasons
+
+
+def decide_with_cascade(
+    blocks: list[Block], ranked: dict, model_paths: list[Path], cfg: PipelineConfig
+) -> dict:
+    """
+    decide_with_llm over `model_paths`, smallest first: a tier's answer is final unless it
+    is INDEFINIDO, disagrees with the heuristic top-1 or has a confidence below
+    cascade_min_confidence, in which case the next model decides. The last model's answer
+    is always final. Every model stays resident in the load_llama cache.
+    The decision's `cascade` records the deciding tier and the escalation reasons.
+    """
+    escalations: list[list[str]] = []
+    decision: dict = {}
+    for tier, model_path in enumerate(model_paths):
+        decision = decide_with_llm(blocks=blocks, ranked=ranked, model_path=model_path, cfg=cfg)
+        if tier == len(model_paths) - 1:
+            break
+        reasons = escalation_reasons(decision, ranked, blocks, cfg)
+        if not reasons:
+            break
+        escalations.append(reasons)
+    return decision | {"cascade": {"tier": len(escalations), "escalations": escalations}}
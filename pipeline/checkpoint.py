@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from config import PipelineConfig, stage_config_hash
+from pipeline.blocks import Block
+from pipeline.candidates import Candidate
+from pipeline.scoring import ScoredCandidate
+from pipeline.utils import write_json_atomic
+
+
+T = TypeVar("T")
+
+# Bump a stage's version whenever its code changes what it produces;
+# older artifacts then stop matching and are recomputed.
+_STAGE_VERSIONS = {
+    "extract": 2,
+    "blocks": 1,
+    "segments": 1,
+    "candidates": 6,
+    "ranked": 3,
+    "decision": 1,
+}
+
+
+def stage_key(stage: str, cfg: PipelineConfig, *inputs: str) -> str:
+    material = json.dumps(
+        [stage, _STAGE_VERSIONS[stage], stage_config_hash(cfg, stage), list(inputs)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+
+def model_fingerprint(model_path: Path | None) -> str:
+    # Path, size and mtime identify a GGUF file without hashing gigabytes.
+    if model_path is None or not model_path.exists():
+        return "none"
+    st = model_path.stat()
+    return f"{model_path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def decision_inputs(ranked: dict, cfg: PipelineConfig) -> str:
+    # The decision sees the top-K lists (the fallback also looks at the runner-up).
+    n = max(cfg.top_k_for_llm, 2)
+    view = {
+        kind: [
+            {"text": c.get("text"), "score": c.get("score"), "reasons": c.get("reasons")}
+            for c in (ranked.get(kind) or [])[:n]
+        ]
+        for kind in ("funcionario", "empresa")
+    }
+    return json.dumps(view, sort_keys=True, ensure_ascii=False)
+
+
+def _encode(stage: str, value: Any) -> Any:
+    if stage == "blocks":
+        return [asdict(b) for b in value]
+    if stage == "candidates":
+        internal = value.get("_internal") or {}
+        return value | {"_internal": {k: [asdict(c) for c in v] for k, v in internal.items()}}
+    if stage == "ranked":
+        internal = value.get("_internal") or {}
+        return value | {
+            "_internal": {
+                k: [{"candidate": asdict(s.candidate), "score": s.score, "reasons": s.reasons} for s in v]
+                for k, v in internal.items()
+            }
+        }
+    return value
+
+
+def _candidate_from(d: dict) -> Candidate:
+    # JSON turns the variant tuples into lists.
+    return Candidate(**(d | {"variants": tuple(tuple(v) for v in d["variants"]), "aliases": tuple(d["aliases"])}))
+
+
+def _decode(stage: str, value: Any) -> Any:
+    if stage == "blocks":
+        return [Block(**(d | {"bbox": tuple(d["bbox"]) if d["bbox"] is not None else None})) for d in value]
+    if stage == "candidates":
+        internal = value.get("_internal") or {}
+        return value | {"_internal": {k: [_candidate_from(c) for c in v] for k, v in internal.items()}}
+    if stage == "ranked":
+        internal = value.get("_internal") or {}
+        return value | {
+            "_internal": {
+                k: [
+                    ScoredCandidate(candidate=_candidate_from(s["candidate"]), score=s["score"], reasons=s["reasons"])
+                    for s in v
+                ]
+                for k, v in internal.items()
+            }
+        }
+    return value
+
+
+class ArtifactStore:
+    """
+    On-disk cache of per-stage pipeline outputs.
+
+    Artifacts live at <root>/<stage>/<key[:2]>/<key>.json, where the key hashes the
+    stage version, the config fields the stage depends on and the keys of its inputs.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage / key[:2] / f"{key}.json"
+
+    def get(self, stage: str, key: str) -> Any | None:
+        path = self._path(stage, key)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return _decode(stage, raw)
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        write_json_atomic(self._path(stage, key), _encode(stage, value), indent=None)
+
+
+def checkpointed(
+    store: ArtifactStore | None,
+    stage: str,
+    key: str,
+    compute: Callable[[], T],
+    keep: Callable[[T], bool] | None = None,
+) -> T:
+    if store is None:
+        return compute()
+    cached = store.get(stage, key)
+    if cached is not None:
+        store.hits[stage] = store.hits.get(stage, 0) + 1
+        return cached
+    store.misses[stage] = store.misses.get(stage, 0) + 1
+    value = compute()
+    if keep is None or keep(value):
+        store.put(stage, key, value)
+    return value
@@ -44,10 +44,14 @@ def compute_confidence(ranked: dict, decision: dict, blocks: list[Block], cfg: P
 
     chosen_f = decision.get("funcionario", "INDEFINIDO")
     chosen_e = decision.get("empresa", "INDEFINIDO")
+    # Calibrated probabilities from the learned ranker, for the fields it answered.
+    probability = decision.get("probability") or {}
 
     def one(kind: str, ranked_items: list[dict], chosen: str) -> float:
         if chosen == "INDEFINIDO":
             return 0.0
+        if kind in probability:
+            return max(cfg.min_confidence_when_defined, _clamp01(float(probability[kind])))
         base = _margin_confidence(ranked_items)
         bonus = _redundancy_bonus(chosen, blocks)
         val = _clamp01(base + bonus)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import json
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 from config import PipelineConfig
 from pipeline.blocks import Block
+from pipeline.budget import BudgetExceeded
+from pipeline.models import LLAMA_RUN_LOCK, load_llama, load_llama_vocab
 
 
 @dataclass(frozen=True)
@@ -107,6 +110,89 @@ def _build_prompt(allowed_funcionarios: list[str], allowed_empresas: list[str])
     )
 
 
+_USER_MESSAGE = "Select the best options now."
+# Tokens the chat template wraps around the two messages (role markers, BOS/EOS).
+_CHAT_TEMPLATE_OVERHEAD = 48
+_N_CTX_STEP = 256
+
+
+def size_n_ctx(model_path: Path, prompt: str, cfg: PipelineConfig) -> int:
+    """
+    Smallest context (rounded up to a 256-token step, capped at cfg.llama_n_ctx) that fits
+    the tokenized prompt plus llama_max_tokens, so the KV cache is not oversized.
+    """
+    if not cfg.llama_auto_n_ctx:
+        return cfg.llama_n_ctx
+    try:
+        vocab = load_llama_vocab(str(model_path))
+        n_prompt = len(vocab.tokenize(f"{prompt}\n{_USER_MESSAGE}".encode("utf-8"), add_bos=True, special=True))
+    except Exception:  # noqa: BLE001
+        return cfg.llama_n_ctx
+    needed = n_prompt + _CHAT_TEMPLATE_OVERHEAD + cfg.llama_max_tokens
+    sized = -(-needed // _N_CTX_STEP) * _N_CTX_STEP
+    return min(max(sized, _N_CTX_STEP * 2), cfg.llama_n_ctx)
+
+
+# Long-ish candidate texts, so a context sized for them fits most real prompts.
+_TYPICAL_FUNCIONARIO = "Maria Aparecida dos Santos Oliveira"
+_TYPICAL_EMPRESA = "Centro de Educação Infantil Municipal Exemplo LTDA"
+
+
+def typical_n_ctx(model_path: Path, cfg: PipelineConfig) -> int:
+    """Context size for a prompt with top_k_for_llm typical candidates per field (used to preload)."""
+    prompt = _build_prompt([_TYPICAL_FUNCIONARIO] * cfg.top_k_for_llm, [_TYPICAL_EMPRESA] * cfg.top_k_for_llm)
+    return size_n_ctx(model_path, prompt, cfg)
+
+
+def _deadline_kwargs(deadline: float) -> dict:
+    # llama.cpp checks stopping criteria after every generated token.
+    try:
+        from llama_cpp import StoppingCriteriaList  # type: ignore
+    except Exception:  # noqa: BLE001
+        return {}
+    return {"stopping_criteria": StoppingCriteriaList([lambda input_ids, logits: time.monotonic() >= deadline])}
+
+
+def complete(llm: Any, prompt: str, cfg: PipelineConfig) -> str:
+    if cfg.budget_llm_seconds <= 0:
+        return _complete(llm, prompt, cfg, {})
+    deadline = time.monotonic() + cfg.budget_llm_seconds
+    content = _complete(llm, prompt, cfg, _deadline_kwargs(deadline))
+    if time.monotonic() >= deadline:
+        raise BudgetExceeded("decision")
+    return content
+
+
+def _complete(llm: Any, prompt: str, cfg: PipelineConfig, extra: dict) -> str:
+    # Prefer chat completion API if available.
+    if hasattr(llm, "create_chat_completion"):
+        resp = llm.create_chat_completion(
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": _USER_MESSAGE},
+            ],
+            temperature=cfg.llama_temperature,
+            top_p=cfg.llama_top_p,
+            top_k=cfg.llama_top_k,
+            max_tokens=cfg.llama_max_tokens,
+            **extra,
+        )
+        return (
+            resp.get("choices", [{}])[0]
+            .get("message", {})
+            .get("content", "")
+        )
+    resp = llm(
+        prompt,
+        temperature=cfg.llama_temperature,
+        top_p=cfg.llama_top_p,
+        top_k=cfg.llama_top_k,
+        max_tokens=cfg.llama_max_tokens,
+        **extra,
+    )
+    return resp.get("choices", [{}])[0].get("text", "")
+
+
 def decide_with_llm(blocks: list[Block], ranked: dict, model_path: Path | None, cfg: PipelineConfig) -> dict:
     # Use only top-K candidates to constrain the model.
     top_f = [c["text"] for c in (ranked.get("funcionario") or [])[: cfg.top_k_for_llm]]
@@ -116,47 +202,15 @@ def decide_with_llm(blocks: list[Block], ranked: dict, model_path: Path | None,
         d = _fallback_decision(ranked)
         return {"funcionario": d.funcionario, "empresa": d.empresa, "llm_used": False}
 
-    try:
-        from llama_cpp import Llama  # type: ignore
-    except Exception:  # noqa: BLE001
-        d = _fallback_decision(ranked)
-        return {"funcionario": d.funcionario, "empresa": d.empresa, "llm_used": False}
-
     prompt = _build_prompt(top_f, top_e)
 
     try:
-        llm = Llama(
-            model_path=str(model_path),
-            n_ctx=cfg.llama_n_ctx,
-            seed=cfg.seed,
-            chat_format=cfg.llama_chat_format,
-        )
-        # Prefer chat completion API if available.
-        if hasattr(llm, "create_chat_completion"):
-            resp = llm.create_chat_completion(
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": "Select the best options now."},
-                ],
-                temperature=cfg.llama_temperature,
-                top_p=cfg.llama_top_p,
-                top_k=cfg.llama_top_k,
-                max_tokens=cfg.llama_max_tokens,
-            )
-            content = (
-                resp.get("choices", [{}])[0]
-                .get("message", {})
-                .get("content", "")
-            )
-        else:
-            resp = llm(
-                prompt,
-                temperature=cfg.llama_temperature,
-                top_p=cfg.llama_top_p,
-                top_k=cfg.llama_top_k,
-                max_tokens=cfg.llama_max_tokens,
-            )
-            content = resp.get("choices", [{}])[0].get("text", "")
+        n_ctx = size_n_ctx(model_path, prompt, cfg)
+        with LLAMA_RUN_LOCK:
+            llm = load_llama(str(model_path), n_ctx, cfg)
+            content = complete(llm, prompt, cfg)
+    except BudgetExceeded:
+        raise
     except Exception:  # noqa: BLE001
         d = _fallback_decision(ranked)
         return {"funcionario": d.funcionario, "empresa": d.empresa, "llm_used": False}
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+from dataclasses import dataclass
+
+from pipeline.utils import normalize_for_match
+
+
+_SIMHASH_BITS = 64
+_BANDS = 4
+_BAND_BITS = _SIMHASH_BITS // _BANDS
+_SHINGLE = 3
+
+
+@dataclass(frozen=True)
+class TextPrint:
+    text_hash: str
+    simhash: int
+    text_norm: str
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(tokens: list[str]) -> int:
+    if len(tokens) < _SHINGLE:
+        features = [" ".join(tokens)] if tokens else []
+    else:
+        features = [" ".join(tokens[i : i + _SHINGLE]) for i in range(len(tokens) - _SHINGLE + 1)]
+    weights = [0] * _SIMHASH_BITS
+    for f in features:
+        h = _feature_hash(f)
+        for bit in range(_SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    out = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            out |= 1 << bit
+    return out
+
+
+def text_print(text: str) -> TextPrint | None:
+    text_norm = normalize_for_match(text)
+    if not text_norm:
+        return None
+    return TextPrint(
+        text_hash=hashlib.sha1(text_norm.encode("utf-8")).hexdigest(),
+        simhash=simhash(text_norm.split(" ")),
+        text_norm=text_norm,
+    )
+
+
+def _bands(fp: int) -> list[tuple[int, int]]:
+    mask = (1 << _BAND_BITS) - 1
+    return [(i, (fp >> (i * _BAND_BITS)) & mask) for i in range(_BANDS)]
+
+
+def _values_present(result: dict, text_norm: str) -> bool:
+    # A near-duplicate may be the same template filled for someone else: only reuse
+    # when every defined answer of the earlier document also appears in this text.
+    defined = [result.get(k) for k in ("funcionario", "empresa") if result.get(k) not in (None, "INDEFINIDO")]
+    if not defined:
+        return False
+    return all(normalize_for_match(str(v)) in text_norm for v in defined)
+
+
+class DuplicateIndex:
+    """
+    In-batch index of finished documents, used to reuse results for resubmissions:
+      - "exact": same file bytes (content hash), checked before any conversion
+      - "text": different bytes, identical normalized text layer
+      - "near": SimHash of text-layer 3-shingles within `max_distance` bits, found through
+        4 x 16-bit bands (any fingerprint within 3 bits shares at least one band)
+    Every key is scoped by `variant` (e.g. the request-config layer of the document), so a
+    result computed under one set of overrides is never handed to a document under another.
+    """
+
+    def __init__(self, max_distance: int = 3) -> None:
+        self.max_distance = max_distance
+        self._by_content: dict[tuple[str, str], tuple[str, dict]] = {}
+        self._by_text: dict[tuple[str, str], tuple[str, dict]] = {}
+        self._bands: dict[tuple[str, int, int], list[tuple[int, str, dict]]] = {}
+        self.reused: dict[str, int] = {"exact": 0, "text": 0, "near": 0}
+
+    def _reuse(self, kind: str, ref: tuple[str, dict], distance: int = 0) -> dict:
+        self.reused[kind] += 1
+        path, result = ref
+        out = copy.deepcopy(result)
+        info: dict = {"kind": kind, "of": path}
+        if kind == "near":
+            info["distance"] = distance
+        out["debug"] = dict(out.get("debug") or {}) | {"duplicate": info}
+        return out
+
+    def match_content(self, content_hash: str, variant: str = "") -> dict | None:
+        ref = self._by_content.get((variant, content_hash))
+        return self._reuse("exact", ref) if ref is not None else None
+
+    def match_text(self, tp: TextPrint | None, variant: str = "") -> dict | None:
+        if tp is None:
+            return None
+        ref = self._by_text.get((variant, tp.text_hash))
+        if ref is not None:
+            return self._reuse("text", ref)
+        if self.max_distance <= 0:
+            return None
+        best: tuple[int, str, dict] | None = None
+        for band in _bands(tp.simhash):
+            for fp, path, result in self._bands.get((variant, *band), []):
+                distance = bin(fp ^ tp.simhash).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, path, result)
+        if best is None or not _values_present(best[2], tp.text_norm):
+            return None
+        return self._reuse("near", (best[1], best[2]), distance=best[0])
+
+    def remember(
+        self, path: str, content_hash: str, tp: TextPrint | None, result: dict, variant: str = ""
+    ) -> None:
+        self._by_content.setdefault((variant, content_hash), (path, result))
+        if tp is None:
+            return
+        self._by_text.setdefault((variant, tp.text_hash), (path, result))
+        for band in _bands(tp.simhash):
+            self._bands.setdefault((variant, *band), []).append((tp.simhash, path, result))
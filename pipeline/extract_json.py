@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import json
+import multiprocessing as mp
 import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from typing import Any
 
 from config import PipelineConfig
@@ -55,17 +58,119 @@ def _extract_blocks_recursive(node: Any, page_hint: int | None = None) -> list[d
     return blocks
 
 
-def extract_docling_json(pdf_path: str, cfg: PipelineConfig) -> dict:
+def _prov_page(node: dict, default: int | None) -> int | None:
+    prov = node.get("prov")
+    if isinstance(prov, dict):
+        prov = [prov]
+    if isinstance(prov, list) and prov and isinstance(prov[0], dict) and isinstance(prov[0].get("page_no"), int):
+        return int(prov[0]["page_no"])
+    return default
+
+
+def _cell_text(cell: Any) -> str:
+    return str(cell.get("text") or "").strip() if isinstance(cell, dict) else ""
+
+
+def _table_fields(cells: list, page: int | None) -> list[dict]:
+    # A label cell pairs with the next cell in its row; a column header with the cell below it.
+    grid: dict[tuple[int, int], dict] = {}
+    for cell in cells:
+        if isinstance(cell, dict) and _cell_text(cell):
+            row, col = cell.get("start_row_offset_idx"), cell.get("start_col_offset_idx")
+            if isinstance(row, int) and isinstance(col, int):
+                grid.setdefault((row, col), cell)
+    fields: list[dict] = []
+    for (row, col), cell in sorted(grid.items()):
+        right = grid.get((row, int(cell.get("end_col_offset_idx") or col + 1)))
+        if right is not None and not right.get("column_header"):
+            fields.append({"label": _cell_text(cell), "value": _cell_text(right), "page": page, "via": "table_row"})
+        below = grid.get((int(cell.get("end_row_offset_idx") or row + 1), col))
+        if cell.get("column_header") and below is not None:
+            fields.append({"label": _cell_text(cell), "value": _cell_text(below), "page": page, "via": "table_header"})
+    return fields
+
+
+def _graph_fields(cells: list, links: list, page: int | None) -> list[dict]:
+    # Docling key_value_items / form_items: key cells linked to value cells.
+    by_id = {c.get("cell_id"): c for c in cells if isinstance(c, dict)}
+    fields: list[dict] = []
+    for link in links:
+        if not isinstance(link, dict) or link.get("label", "to_value") != "to_value":
+            continue
+        key, value = by_id.get(link.get("source_cell_id")), by_id.get(link.get("target_cell_id"))
+        if _cell_text(key) and _cell_text(value):
+            cell_page = _prov_page(value, page)
+            fields.append({"label": _cell_text(key), "value": _cell_text(value), "page": cell_page, "via": "key_value"})
+    return fields
+
+
+def _extract_fields_recursive(node: Any, page_hint: int | None = None) -> list[dict]:
     """
-    Convert a PDF into a normalized dict with a minimal schema:
-      - blocks: list[{text,page,bbox}]
-      - extraction_quality: "ok" | "weak"
+    Label/value pairs kept from Docling's structure (table cells and key/value or form
+    items), which _extract_blocks_recursive flattens into unrelated text blocks.
+    """
+    fields: list[dict] = []
+    if isinstance(node, dict):
+        page = _prov_page(node, page_hint)
+        cells = node.get("table_cells")
+        if isinstance(cells, list):
+            fields.extend(_table_fields(cells, page))
+        graph_cells, links = node.get("cells"), node.get("links")
+        if isinstance(graph_cells, list) and isinstance(links, list):
+            fields.extend(_graph_fields(graph_cells, links, page))
+        for k, v in node.items():
+            if k not in ("table_cells", "grid", "cells", "links"):
+                fields.extend(_extract_fields_recursive(v, page))
+    elif isinstance(node, list):
+        for item in node:
+            fields.extend(_extract_fields_recursive(item, page_hint))
+    return fields
 
-    This function is intentionally defensive: Docling APIs can vary by version.
-    If extraction fails or yields too little text, we return extraction_quality="weak".
+
+def pdf_text_layer(pdf_path: str | bytes) -> str | None:
     """
+    Read the embedded text layer with pypdfium2 (installed with Docling), without layout
+    analysis. Returns None when the PDF cannot be read or pypdfium2 is unavailable.
+    """
+    try:
+        import pypdfium2 as pdfium  # type: ignore
+    except Exception:  # noqa: BLE001
+        return None
+    try:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            parts: list[str] = []
+            for i in range(len(pdf)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    except Exception:  # noqa: BLE001
+        return None
+    return "\n".join(parts)
+
 
-    raw: Any
+def pdf_page_count(pdf_path: str | bytes) -> int | None:
+    """Page count from pypdfium2 (no rendering); None when unavailable or unreadable."""
+    try:
+        import pypdfium2 as pdfium  # type: ignore
+    except Exception:  # noqa: BLE001
+        return None
+    try:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _convert_blocks(pdf_path: str | bytes, cfg: PipelineConfig, name: str) -> tuple[list[dict], list[dict]] | None:
+    # One Docling conversion into (blocks, fields); None when it fails.
     try:
         if not cfg.allow_network:
             # Best-effort offline mode: force HF/transformers to stay offline.
@@ -79,19 +184,121 @@ def extract_docling_json(pdf_path: str, cfg: PipelineConfig) -> dict:
         except Exception:  # noqa: BLE001
             from docling import DocumentConverter  # type: ignore
 
+        if isinstance(pdf_path, bytes):
+            # In-memory input (e.g. an archive member): no temporary file.
+            from docling.datamodel.base_models import DocumentStream  # type: ignore
+
+            source: Any = DocumentStream(name=name, stream=BytesIO(pdf_path))
+        else:
+            source = pdf_path
         converter = DocumentConverter()
-        result = converter.convert(pdf_path)
+        result = converter.convert(source)
         raw = _maybe_to_dict(result)
     except Exception:  # noqa: BLE001
-        return {"blocks": [], "extraction_quality": "weak"}
+        return None
 
     raw = _maybe_to_dict(raw)
-    blocks = _extract_blocks_recursive(raw)
+    return _extract_blocks_recursive(raw), _extract_fields_recursive(raw)
+
+
+def page_ranges(n_pages: int, shards: int) -> list[tuple[int, int]]:
+    """Split pages 0..n_pages-1 into `shards` contiguous [start, end) ranges of near-equal size."""
+    shards = max(1, min(shards, n_pages))
+    bounds = [round(i * n_pages / shards) for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(shards)]
+
+
+def _split_pdf(pdf_path: str | bytes, ranges: list[tuple[int, int]]) -> list[bytes] | None:
+    try:
+        import pypdfium2 as pdfium  # type: ignore
+    except Exception:  # noqa: BLE001
+        return None
+    try:
+        pdf = pdfium.PdfDocument(pdf_path)
+        parts: list[bytes] = []
+        try:
+            for start, end in ranges:
+                part = pdfium.PdfDocument.new()
+                part.import_pages(pdf, pages=list(range(start, end)))
+                buf = BytesIO()
+                part.save(buf)
+                part.close()
+                parts.append(buf.getvalue())
+        finally:
+            pdf.close()
+    except Exception:  # noqa: BLE001
+        return None
+    return parts
+
+
+def merge_shards(shards: list[tuple[int, list[dict]]]) -> list[dict]:
+    """
+    Concatenate per-shard blocks (or fields) in page order, turning each shard's local
+    page numbers (1-based) into global ones by adding the shard's first page offset.
+    Items without an int page (e.g. a field whose prov has none) keep it as is.
+    """
+    merged: list[dict] = []
+    for offset, blocks in sorted(shards, key=lambda s: s[0]):
+        for b in blocks:
+            page = b.get("page")
+            merged.append(b | {"page": page + offset} if isinstance(page, int) else dict(b))
+    return merged
+
 
+def _convert_sharded(
+    pdf_path: str | bytes, n_pages: int, cfg: PipelineConfig, name: str
+) -> tuple[list[dict], list[dict]] | None:
+    ranges = page_ranges(n_pages, cfg.convert_shards)
+    parts = _split_pdf(pdf_path, ranges)
+    if parts is None:
+        return None
+    # spawn: Docling and torch do not survive fork in a threaded parent.
+    with ProcessPoolExecutor(max_workers=len(parts), mp_context=mp.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(_convert_blocks, data, cfg, f"{name}#{start + 1}-{end}")
+            for data, (start, end) in zip(parts, ranges)
+        ]
+        results = [f.result() for f in futures]
+    if any(r is None for r in results):
+        return None
+    starts = [start for start, _ in ranges]
+    return (
+        merge_shards([(start, r[0]) for start, r in zip(starts, results)]),
+        merge_shards([(start, r[1]) for start, r in zip(starts, results)]),
+    )
+
+
+def extract_docling_json(pdf_path: str | bytes, cfg: PipelineConfig, name: str = "document.pdf") -> dict:
+    """
+    Convert a PDF (a path, or the file's bytes, named `name`) into a normalized dict with a minimal schema:
+      - blocks: list[{text,page,bbox}]
+      - fields: list[{label,value,page,via}] from Docling tables and key/value items
+      - extraction_quality: "ok" | "weak"
+
+    PDFs with at least `convert_shard_min_pages` pages are split into `convert_shards`
+    page ranges converted in parallel processes (falling back to one conversion if the
+    split or any shard fails).
+
+    This function is intentionally defensive: Docling APIs can vary by version.
+    If extraction fails or yields too little text, we return extraction_quality="weak".
+    """
+    converted: tuple[list[dict], list[dict]] | None = None
+    if cfg.convert_shard_min_pages > 0 and cfg.convert_shards > 1:
+        n_pages = pdf_page_count(pdf_path)
+        if n_pages is not None and n_pages >= cfg.convert_shard_min_pages:
+            try:
+                converted = _convert_sharded(pdf_path, n_pages, cfg, name)
+            except Exception:  # noqa: BLE001 - e.g. no child processes allowed (daemonic worker)
+                converted = None
+    if converted is None:
+        converted = _convert_blocks(pdf_path, cfg, name)
+    if converted is None:
+        return {"blocks": [], "extraction_quality": "weak"}
+
+    blocks, fields = converted
     quality = "ok" if useful_char_count([b["text"] for b in blocks]) >= cfg.min_useful_chars else "weak"
     return {
         "blocks": blocks,
+        "fields": fields,
         "extraction_quality": quality,
     }
-
-
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from pipeline.blocks import Block
+from pipeline.utils import normalize_for_match, write_json_atomic
+
+
+_CNPJ_RE = re.compile(r"(?<!\d)(\d{2})\.?(\d{3})\.?(\d{3})\s*/?\s*(\d{4})\s*-?\s*(\d{2})(?!\d)")
+
+_GAZETTEER_VERSION = 1
+
+
+@dataclass(frozen=True)
+class GazetteerHit:
+    name: str
+    via: str  # "cnpj" | "name"
+    block_id: str
+    page: int
+
+
+def _cnpj_checksum_ok(digits: str) -> bool:
+    if len(digits) != 14 or len(set(digits)) == 1:
+        return False
+    nums = [int(ch) for ch in digits]
+    weights = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    for pos, w in ((12, weights), (13, [6] + weights)):
+        total = sum(n * k for n, k in zip(nums[:pos], w))
+        check = 0 if total % 11 < 2 else 11 - total % 11
+        if nums[pos] != check:
+            return False
+    return True
+
+
+def normalize_cnpj(text: str) -> str | None:
+    digits = "".join(ch for ch in text if ch.isdigit())
+    return digits if _cnpj_checksum_ok(digits) else None
+
+
+def find_cnpjs(text: str) -> list[str]:
+    out: list[str] = []
+    for m in _CNPJ_RE.finditer(text or ""):
+        cnpj = normalize_cnpj("".join(m.groups()))
+        if cnpj is not None and cnpj not in out:
+            out.append(cnpj)
+    return out
+
+
+def cnpjs_near(blocks: list[Block], block_id: str, window: int = 2) -> list[str]:
+    by_id = {b.id: b for b in blocks}
+    anchor = by_id.get(block_id)
+    if anchor is None:
+        return []
+    out: list[str] = []
+    for b in blocks:
+        if b.page != anchor.page or abs(b.index - anchor.index) > window:
+            continue
+        for cnpj in find_cnpjs(b.text):
+            if cnpj not in out:
+                out.append(cnpj)
+    return out
+
+
+class Gazetteer:
+    """
+    Persistent index of previously confirmed employers.
+
+    Entries are keyed by normalized name; a second dict maps each normalized CNPJ
+    to its entry, so both lookups are O(1). The first confirmed name for a CNPJ wins.
+    Updates and snapshots are locked: --watch confirms employers from several threads.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, dict] = {}
+        self._by_cnpj: dict[str, str] = {}
+        self._lock = threading.RLock()
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup_cnpj(self, cnpj: str) -> str | None:
+        key = self._by_cnpj.get(cnpj)
+        return self._entries[key]["name"] if key is not None else None
+
+    def lookup_name(self, text: str) -> str | None:
+        entry = self._entries.get(normalize_for_match(text))
+        return entry["name"] if entry is not None else None
+
+    def add(self, name: str, cnpjs: list[str] | tuple[str, ...] = (), hits: int = 1) -> None:
+        key = normalize_for_match(name)
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"name": name, "cnpjs": [], "hits": 0}
+                self._entries[key] = entry
+            entry["hits"] += max(0, int(hits))
+            for raw in cnpjs:
+                cnpj = normalize_cnpj(raw)
+                if cnpj is None or cnpj in self._by_cnpj:
+                    continue
+                self._by_cnpj[cnpj] = key
+                entry["cnpjs"].append(cnpj)
+            self.dirty = True
+
+    def resolve(self, blocks: list[Block], company_candidates: list[dict] | None = None) -> GazetteerHit | None:
+        """Return a hit only when every CNPJ (or, failing that, every name) found agrees on one employer."""
+        cnpj_hits: dict[str, GazetteerHit] = {}
+        for b in blocks:
+            for cnpj in find_cnpjs(b.text):
+                name = self.lookup_cnpj(cnpj)
+                if name is not None and name not in cnpj_hits:
+                    cnpj_hits[name] = GazetteerHit(name=name, via="cnpj", block_id=b.id, page=b.page)
+        if len(cnpj_hits) == 1:
+            return next(iter(cnpj_hits.values()))
+        if cnpj_hits:
+            return None
+
+        name_hits: dict[str, GazetteerHit] = {}
+        for c in company_candidates or []:
+            name = self.lookup_name(str(c.get("text", "")))
+            if name is not None and name not in name_hits:
+                name_hits[name] = GazetteerHit(
+                    name=name, via="name", block_id=str(c.get("block_id", "")), page=int(c.get("page", 1))
+                )
+        if len(name_hits) == 1:
+            return next(iter(name_hits.values()))
+        return None
+
+    def merge(self, other: Gazetteer) -> None:
+        for entry in other.entries():
+            self.add(entry["name"], entry["cnpjs"], hits=entry["hits"])
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"name": e["name"], "cnpjs": list(e["cnpjs"]), "hits": e["hits"]}
+                for _, e in sorted(self._entries.items())
+            ]
+
+    def to_dict(self) -> dict:
+        return {"version": _GAZETTEER_VERSION, "entries": self.entries()}
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> Gazetteer:
+        gz = cls()
+        for entry in payload.get("entries") or []:
+            if not isinstance(entry, dict) or not entry.get("name"):
+                continue
+            gz.add(str(entry["name"]), [str(c) for c in entry.get("cnpjs") or []], hits=int(entry.get("hits", 1)))
+        gz.dirty = False
+        return gz
+
+    @classmethod
+    def load(cls, path: Path) -> Gazetteer:
+        if not path.exists():
+            return cls()
+        return cls.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, path: Path) -> None:
+        # Snapshot and clear `dirty` together, so an add racing the write marks it dirty again.
+        with self._lock:
+            payload = self.to_dict()
+            self.dirty = False
+        write_json_atomic(path, payload)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+
+
+def journal_key(input_path: str, content_hash: str, config_hash: str) -> tuple[str, str, str]:
+    return (input_path, content_hash, config_hash)
+
+
+class ResultJournal:
+    """
+    Append-only JSONL journal of batch results.
+
+    One line per finished document: {"input", "content_hash", "config_hash", "result"}.
+    Records are buffered and written with a single write + fsync per flush, so a crash
+    loses at most the unflushed tail, never a partial line that later reads would trust.
+    On open, a torn last line (no newline or invalid JSON) is truncated away.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 8, flush_seconds: float = 5.0) -> None:
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.flush_seconds = flush_seconds
+        self._index: dict[tuple[str, str, str], dict] = {}
+        self._pending: list[bytes] = []
+        self._last_flush = time.monotonic()
+        self._recover()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("ab")
+
+    def _recover(self) -> None:
+        if not self.path.exists():
+            return
+        good_end = 0
+        with self.path.open("rb") as fh:
+            for raw in fh:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(raw.decode("utf-8"))
+                except ValueError:
+                    break
+                if isinstance(rec, dict):
+                    self._remember(rec)
+                good_end += len(raw)
+        if good_end != self.path.stat().st_size:
+            with self.path.open("r+b") as fh:
+                fh.truncate(good_end)
+
+    def _remember(self, rec: dict) -> None:
+        key = journal_key(str(rec.get("input", "")), str(rec.get("content_hash", "")), str(rec.get("config_hash", "")))
+        self._index[key] = rec
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: tuple[str, str, str]) -> bool:
+        return key in self._index
+
+    def get(self, key: tuple[str, str, str]) -> dict | None:
+        return self._index.get(key)
+
+    def append(self, input_path: str, content_hash: str, config_hash: str, result: dict) -> None:
+        rec = {"input": input_path, "content_hash": content_hash, "config_hash": config_hash, "result": result}
+        self._pending.append((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._remember(rec)
+        if len(self._pending) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._fh.write(b"".join(self._pending))
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._pending.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self.flush()
+        self._fh.close()
+
+    def __enter__(self) -> ResultJournal:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
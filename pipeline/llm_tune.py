@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from config import PipelineConfig
+from pipeline.decision_llm import _build_prompt, complete, size_n_ctx
+from pipeline.models import load_llama
+
+
+# Settings a profile may carry; anything else in a profile file is ignored.
+PROFILE_FIELDS = ("llama_n_threads", "llama_n_batch", "llama_use_mmap", "llama_use_mlock")
+
+_SAMPLE_FUNCIONARIOS = [
+    "Sandra Regina Hortencio",
+    "João da Silva",
+    "Maria José Santos",
+    "Paulo Mendes",
+    "Ana Paula Oliveira",
+]
+_SAMPLE_EMPRESAS = [
+    "CEI Erinice Siqueira",
+    "ACME Serviços LTDA",
+    "Transportes Pereira ME",
+    "Clínica Saúde Total",
+    "Indústria Brasileira de Peças S/A",
+]
+
+
+def default_profile_path(model_path: Path) -> Path:
+    return model_path.with_name(model_path.name + ".profile.json")
+
+
+def machine_id() -> str:
+    return f"{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu"
+
+
+def _time_one(model_path: Path, cfg: PipelineConfig, repeats: int) -> tuple[float, float]:
+    prompt = _build_prompt(_SAMPLE_FUNCIONARIOS, _SAMPLE_EMPRESAS)
+    t0 = time.perf_counter()
+    llm = load_llama(str(model_path), size_n_ctx(model_path, prompt, cfg), cfg)
+    load_s = time.perf_counter() - t0
+    complete(llm, prompt, cfg)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        complete(llm, prompt, cfg)
+    return load_s, (time.perf_counter() - t0) / repeats
+
+
+def sweep(
+    model_path: Path,
+    cfg: PipelineConfig,
+    threads: list[int | None],
+    batches: list[int],
+    mmap: list[bool],
+    mlock: list[bool],
+    repeats: int = 2,
+) -> list[dict]:
+    """Time one representative decision prompt for every settings combination."""
+    trials: list[dict] = []
+    for n_threads, n_batch, use_mmap, use_mlock in itertools.product(threads, batches, mmap, mlock):
+        settings = {
+            "llama_n_threads": n_threads,
+            "llama_n_batch": n_batch,
+            "llama_use_mmap": use_mmap,
+            "llama_use_mlock": use_mlock,
+        }
+        trial = dict(settings)
+        try:
+            load_s, infer_s = _time_one(model_path, replace(cfg, **settings), repeats)
+            trial |= {"load_seconds": round(load_s, 4), "infer_seconds": round(infer_s, 4)}
+        except Exception as exc:  # noqa: BLE001 - e.g. mlock refused by the OS
+            trial |= {"error": type(exc).__name__}
+        trials.append(trial)
+    return trials
+
+
+def fastest_profile(model_path: Path, trials: list[dict]) -> dict | None:
+    ok = [t for t in trials if "infer_seconds" in t]
+    if not ok:
+        return None
+    best = min(ok, key=lambda t: (t["infer_seconds"], t["load_seconds"]))
+    return {
+        "model": model_path.name,
+        "machine": machine_id(),
+        "settings": {k: best[k] for k in PROFILE_FIELDS},
+        "infer_seconds": best["infer_seconds"],
+        "trials": trials,
+    }
+
+
+def load_profile(path: Path) -> dict | None:
+    try:
+        profile = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return profile if isinstance(profile, dict) else None
+
+
+def apply_profile(cfg: PipelineConfig, profile: dict | None) -> PipelineConfig:
+    """Apply a stored profile, but only one measured on this kind of machine."""
+    if not profile or profile.get("machine") != machine_id():
+        return cfg
+    settings = {k: v for k, v in (profile.get("settings") or {}).items() if k in PROFILE_FIELDS}
+    return replace(cfg, **settings)
+
+
+def _int_list(text: str) -> list[int | None]:
+    return [None if t.strip() in {"", "auto"} else int(t) for t in text.split(",")]
+
+
+def _bool_list(text: str) -> list[bool]:
+    return [t.strip().lower() in {"1", "true", "yes", "on"} for t in text.split(",")]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    cpus = os.cpu_count() or 4
+    default_threads = ",".join(str(n) for n in sorted({max(1, cpus // 4), max(1, cpus // 2), cpus}))
+    p = argparse.ArgumentParser(description="Sweep llama.cpp runtime settings and store the fastest profile")
+    p.add_argument("--model", required=True, help="Path to GGUF model for llama.cpp")
+    p.add_argument("--chat-format", required=False, help="Optional llama.cpp chat format (e.g., qwen).")
+    p.add_argument("--out", required=False, help="Profile path (default: <model>.profile.json)")
+    p.add_argument("--threads", default=default_threads, help="Comma-separated n_threads values ('auto' = default)")
+    p.add_argument("--batches", default="128,256,512", help="Comma-separated n_batch values")
+    p.add_argument("--mmap", default="true,false", help="Comma-separated use_mmap values")
+    p.add_argument("--mlock", default="false", help="Comma-separated use_mlock values")
+    p.add_argument("--repeats", type=int, default=2, help="Timed completions per setting")
+    return p
+
+
+def main(argv: list[str]) -> int:
+    args = build_parser().parse_args(argv)
+    model_path = Path(args.model)
+    cfg = PipelineConfig(llama_chat_format=args.chat_format)
+    trials = sweep(
+        model_path,
+        cfg,
+        threads=_int_list(args.threads),
+        batches=[int(b) for b in args.batches.split(",")],
+        mmap=_bool_list(args.mmap),
+        mlock=_bool_list(args.mlock),
+        repeats=args.repeats,
+    )
+    profile = fastest_profile(model_path, trials)
+    if profile is None:
+        print("llm_tune: no setting could run the model", file=sys.stderr)
+        return 1
+    out = Path(args.out) if args.out else default_profile_path(model_path)
+    out.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"llm_tune: fastest {profile['settings']} ({profile['infer_seconds']} s/decision) -> {out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import tracemalloc
+from typing import TextIO
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable; 0 if unknown)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:  # noqa: BLE001
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:  # noqa: BLE001
+        return 0
+
+
+# Exit status of a process that stopped to be recycled (EX_TEMPFAIL): restart it as is.
+RECYCLE_EXIT_CODE = 75
+
+
+class ProcessRecycler:
+    """
+    Counts the documents of this process and sets `stop` once it has handled
+    `max_documents` or its RSS crossed `max_rss_mb` (0 disables either). The long-running
+    modes poll `stop`, so they finish their current work and return instead of taking more.
+    """
+
+    def __init__(self, max_documents: int = 0, max_rss_mb: float = 0.0) -> None:
+        self.max_documents = max_documents
+        self.max_rss_mb = max_rss_mb
+        self.documents = 0
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def tick(self) -> None:
+        with self._lock:
+            self.documents += 1
+            documents = self.documents
+        if (self.max_documents > 0 and documents >= self.max_documents) or (
+            self.max_rss_mb > 0 and rss_bytes() >= self.max_rss_mb * 1024 * 1024
+        ):
+            self.stop.set()
+
+
+class AllocationDiff:
+    """
+    tracemalloc growth report: every `every` documents, prints the `top` source lines
+    whose Python allocations grew most since the first snapshot.
+    """
+
+    def __init__(self, every: int, top: int = 10, out: TextIO | None = None) -> None:
+        self.every = max(1, every)
+        self.top = top
+        self.out = out or sys.stderr
+        self.documents = 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._baseline = tracemalloc.take_snapshot()
+
+    def report(self) -> list[str]:
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(self._baseline, "lineno")
+        return [str(s) for s in stats[: self.top] if s.size_diff > 0]
+
+    def close(self) -> None:
+        tracemalloc.stop()
+
+    def tick(self) -> None:
+        self.documents += 1
+        if self.documents % self.every:
+            return
+        print(f"tracemalloc: growth after {self.documents} documents", file=self.out)
+        for line in self.report():
+            print(f"  {line}", file=self.out)
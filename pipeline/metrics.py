@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from pipeline.utils import write_text_atomic
+
+
+STAGES = ("extract", "blocks", "candidates", "scoring", "decision", "confidence", "total")
+QUALITIES = ("ok", "weak", "error")
+FIELDS = ("funcionario", "empresa")
+ESCALATION_REASONS = ("unavailable", "indefinido", "disagrees_with_top1", "low_confidence")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 30, 50, 100)
+
+
+# Metrics are updated from --watch worker threads, refiners and the conversion worker.
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1) -> None:
+        with self._lock:
+            self.value += n
+
+
+class Gauge:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: int) -> None:
+        with self._lock:
+            self.value = value
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        slot = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        """Counts, sum and count read together, so an export never sees half an observation."""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Metrics:
+    """
+    Pre-registered counters and histograms for batch and service runs.
+
+    Every label combination exists from construction, so recording an event is a dict
+    lookup plus an integer/float update; formatting only happens on export.
+    """
+
+    def __init__(self) -> None:
+        self.stage_seconds = {s: Histogram(_LATENCY_BUCKETS) for s in STAGES}
+        self.documents = {q: Counter() for q in QUALITIES}
+        self.llm_used = Counter()
+        self.ranker_decisions = Counter()
+        self.fallback_decisions = Counter()
+        self.template_decisions = Counter()
+        self.shed_decisions = Counter()
+        # Model cascade: documents decided by it, escalated past the first model, and why.
+        self.cascade_decisions = Counter()
+        self.cascade_escalated = Counter()
+        self.cascade_escalations = {r: Counter() for r in ESCALATION_REASONS}
+        self.indefinido = {f: Counter() for f in FIELDS}
+        self.candidates = {f: Histogram(_COUNT_BUCKETS) for f in FIELDS}
+        self.spacy_ok = Counter()
+        self.spacy_skipped = Counter()  # person resolved from the field index, NER not run
+        self.spacy_unavailable = Counter()
+        self.watch_backlog = Gauge()  # --watch: PDFs settling, queued or running
+        self.process_rss_bytes = Gauge()
+        self.worker_rss_bytes = Gauge()  # conversion worker child, when there is one
+        self.worker_documents = Gauge()  # documents converted by the current worker child
+        self.worker_recycled = Gauge()
+        # Per-stage artifact cache counters, read by reference at export time (see bind_cache).
+        self._cache_hits: dict[str, int] = {}
+        self._cache_misses: dict[str, int] = {}
+
+    def bind_cache(self, hits: dict[str, int], misses: dict[str, int]) -> None:
+        self._cache_hits, self._cache_misses = hits, misses
+
+    def lap(self, stage: str, t0: float) -> float:
+        now = time.perf_counter()
+        self.stage_seconds[stage].observe(now - t0)
+        return now
+
+    def record_document(self, quality: str) -> None:
+        self.documents[quality if quality in self.documents else "error"].inc()
+
+    def record_candidates(self, n_funcionarios: int, n_empresas: int, spacy: str) -> None:
+        self.candidates["funcionario"].observe(n_funcionarios)
+        self.candidates["empresa"].observe(n_empresas)
+        {"ok": self.spacy_ok, "skipped": self.spacy_skipped}.get(spacy, self.spacy_unavailable).inc()
+
+    def record_decision(self, decision: dict) -> None:
+        if decision.get("llm_used"):
+            self.llm_used.inc()
+        elif decision.get("ranker_used"):
+            self.ranker_decisions.inc()
+        elif decision.get("template"):
+            self.template_decisions.inc()
+        else:
+            self.fallback_decisions.inc()
+        if decision.get("shed"):
+            self.shed_decisions.inc()
+        cascade = decision.get("cascade")
+        if cascade:
+            self.cascade_decisions.inc()
+            if cascade.get("tier"):
+                self.cascade_escalated.inc()
+            for reasons in cascade.get("escalations") or []:
+                for r in reasons:
+                    if r in self.cascade_escalations:
+                        self.cascade_escalations[r].inc()
+        for f in FIELDS:
+            if decision.get(f, "INDEFINIDO") == "INDEFINIDO":
+                self.indefinido[f].inc()
+
+    def to_json(self) -> dict:
+        def hist(h: Histogram) -> dict:
+            counts, total, count = h.snapshot()
+            return {"buckets": list(h.bounds), "counts": counts, "sum": total, "count": count}
+
+        return {
+            "stage_seconds": {k: hist(v) for k, v in self.stage_seconds.items()},
+            "documents_total": {k: v.value for k, v in self.documents.items()},
+            "llm_used_total": self.llm_used.value,
+            "ranker_decisions_total": self.ranker_decisions.value,
+            "fallback_decisions_total": self.fallback_decisions.value,
+            "template_decisions_total": self.template_decisions.value,
+            "shed_decisions_total": self.shed_decisions.value,
+            "cascade_decisions_total": self.cascade_decisions.value,
+            "cascade_escalated_total": self.cascade_escalated.value,
+            "cascade_escalations_total": {k: v.value for k, v in self.cascade_escalations.items()},
+            "indefinido_total": {k: v.value for k, v in self.indefinido.items()},
+            "candidates": {k: hist(v) for k, v in self.candidates.items()},
+            "spacy_ok_total": self.spacy_ok.value,
+            "spacy_skipped_total": self.spacy_skipped.value,
+            "spacy_unavailable_total": self.spacy_unavailable.value,
+            "cache_hits_total": dict(self._cache_hits),
+            "cache_misses_total": dict(self._cache_misses),
+            "watch_backlog": self.watch_backlog.value,
+            "process_rss_bytes": self.process_rss_bytes.value,
+            "worker_rss_bytes": self.worker_rss_bytes.value,
+            "worker_documents": self.worker_documents.value,
+            "worker_recycled": self.worker_recycled.value,
+        }
+
+    def to_prometheus(self) -> str:
+        lines: list[str] = []
+
+        def histogram(name: str, help_text: str, label: str, series: dict[str, Histogram]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                counts, total, count = h.snapshot()
+                cumulative = 0
+                for bound, n in zip(h.bounds, counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {count}')
+                lines.append(f'{name}_sum{{{label}="{key}"}} {total:.6f}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {count}')
+
+        def counter(name: str, help_text: str, value: int, label: str = "", key: str = "") -> None:
+            if not lines or not lines[-1].startswith(name):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+            labels = f'{{{label}="{key}"}}' if label else ""
+            lines.append(f"{name}{labels} {value}")
+
+        def gauge(name: str, help_text: str, value: int) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        histogram("pipeline_stage_seconds", "Per-stage latency in seconds.", "stage", self.stage_seconds)
+        for q, c in self.documents.items():
+            counter("pipeline_documents_total", "Documents by extraction quality.", c.value, "extraction_quality", q)
+        counter("pipeline_llm_used_total", "Decisions made by the LLM.", self.llm_used.value)
+        counter("pipeline_ranker_decisions_total", "Decisions made by the learned ranker alone.",
+                self.ranker_decisions.value)
+        counter("pipeline_fallback_decisions_total", "Decisions made by the heuristic fallback.",
+                self.fallback_decisions.value)
+        counter("pipeline_template_decisions_total", "Decisions read from a confirmed layout template.",
+                self.template_decisions.value)
+        counter("pipeline_shed_decisions_total", "Decisions that skipped the LLM under load shedding.",
+                self.shed_decisions.value)
+        counter("pipeline_cascade_decisions_total", "Decisions made through the model cascade.",
+                self.cascade_decisions.value)
+        counter("pipeline_cascade_escalated_total", "Cascade decisions escalated past the first model.",
+                self.cascade_escalated.value)
+        for r, c in self.cascade_escalations.items():
+            counter("pipeline_cascade_escalations_total", "Cascade escalations by reason.", c.value, "reason", r)
+        for f, c in self.indefinido.items():
+            counter("pipeline_indefinido_total", "INDEFINIDO answers per field.", c.value, "field", f)
+        histogram("pipeline_candidates", "Candidates per document.", "field", self.candidates)
+        counter("pipeline_spacy_ok_total", "Documents where spaCy NER ran.", self.spacy_ok.value)
+        counter("pipeline_spacy_skipped_total", "Documents whose employee came from the field index, without NER.",
+                self.spacy_skipped.value)
+        counter("pipeline_spacy_unavailable_total", "Documents where spaCy NER failed.", self.spacy_unavailable.value)
+        for stage, n in sorted(self._cache_hits.items()):
+            counter("pipeline_cache_hits_total", "Stage artifacts reused from --cache-dir.", n, "stage", stage)
+        for stage, n in sorted(self._cache_misses.items()):
+            counter("pipeline_cache_misses_total", "Stage artifacts computed.", n, "stage", stage)
+        gauge("pipeline_watch_backlog", "PDFs settling, queued or running in --watch mode.", self.watch_backlog.value)
+        gauge("pipeline_process_rss_bytes", "Resident set size of the pipeline process.", self.process_rss_bytes.value)
+        gauge("pipeline_worker_rss_bytes", "Resident set size of the conversion worker.", self.worker_rss_bytes.value)
+        gauge("pipeline_worker_documents", "Documents converted by the current conversion worker.",
+              self.worker_documents.value)
+        gauge("pipeline_worker_recycled", "Conversion workers replaced so far.", self.worker_recycled.value)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsWriter:
+    """
+    Periodically writes a Metrics snapshot (Prometheus textfile or JSON), atomically.
+    Called from every --watch worker once its document is decided, so writes are
+    serialized and a failed write is reported instead of raised.
+    """
+
+    def __init__(self, metrics: Metrics, path: Path, fmt: str | None = None, interval_seconds: float = 30.0) -> None:
+        self.metrics = metrics
+        self.path = path
+        self.fmt = fmt or ("json" if path.suffix.lower() == ".json" else "prometheus")
+        self.interval_seconds = interval_seconds
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def maybe_write(self) -> None:
+        if time.monotonic() - self._last >= self.interval_seconds:
+            self.write()
+
+    def write(self) -> None:
+        with self._lock:
+            try:
+                if self.fmt == "json":
+                    text = json.dumps(self.metrics.to_json(), ensure_ascii=False, indent=2)
+                else:
+                    text = self.metrics.to_prometheus()
+                write_text_atomic(self.path, text)
+            except Exception as exc:  # noqa: BLE001 - metrics must never fail a document
+                print(f"metrics: cannot write {self.path}: {exc}", file=sys.stderr)
+            # Also after a failure: retry at the next interval, not on every document.
+            self._last = time.monotonic()
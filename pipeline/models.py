@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Any
+
+from config import PipelineConfig
+
+
+# Process-wide model caches so batch and service runs load each model once.
+
+_LLAMA_LOCK = threading.Lock()
+# A Llama instance is not thread-safe: one generation at a time (watch mode runs documents
+# on several threads). Held around load + generate so a reload never swaps a busy instance.
+LLAMA_RUN_LOCK = threading.Lock()
+# model_path -> (load settings, n_ctx, Llama): one resident instance per GGUF file.
+_LLAMA_CACHE: dict[str, tuple[tuple, int, Any]] = {}
+
+
+@lru_cache(maxsize=4)
+def load_spacy(name: str) -> Any | None:
+    try:
+        import spacy  # type: ignore
+    except Exception:  # noqa: BLE001
+        return None
+    try:
+        return spacy.load(name)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _llama_settings(cfg: PipelineConfig) -> tuple:
+    return (
+        cfg.seed,
+        cfg.llama_chat_format,
+        cfg.llama_n_threads,
+        cfg.llama_n_batch,
+        cfg.llama_use_mmap,
+        cfg.llama_use_mlock,
+    )
+
+
+def load_llama(model_path: str, n_ctx: int, cfg: PipelineConfig, keep_existing: bool = False) -> Any:
+    """
+    Return a resident Llama for `model_path` whose context holds at least `n_ctx` tokens.
+
+    The instance is reused while it is large enough and reloaded (with the larger context)
+    otherwise, so per-document prompt sizing never thrashes between context sizes.
+    With `keep_existing` (preloading), any resident instance with the same settings is kept.
+    Raises on failure; nothing is cached then, so a later call retries.
+    """
+    settings = _llama_settings(cfg)
+    with _LLAMA_LOCK:
+        cached = _LLAMA_CACHE.get(model_path)
+        if cached is not None and cached[0] == settings and (keep_existing or cached[1] >= n_ctx):
+            return cached[2]
+
+        from llama_cpp import Llama  # type: ignore
+
+        _LLAMA_CACHE.pop(model_path, None)
+        llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,
+            n_batch=min(cfg.llama_n_batch, n_ctx),
+            n_threads=cfg.llama_n_threads,
+            use_mmap=cfg.llama_use_mmap,
+            use_mlock=cfg.llama_use_mlock,
+            seed=cfg.seed,
+            chat_format=cfg.llama_chat_format,
+            verbose=False,
+        )
+        _LLAMA_CACHE[model_path] = (settings, n_ctx, llm)
+        return llm
+
+
+@lru_cache(maxsize=4)
+def load_llama_vocab(model_path: str) -> Any:
+    # Vocabulary-only load: tokenizes prompts without mapping the weights.
+    from llama_cpp import Llama  # type: ignore
+
+    return Llama(model_path=model_path, vocab_only=True, verbose=False)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from config import PipelineConfig
+from pipeline.decision_llm import typical_n_ctx
+from pipeline.models import load_llama, load_spacy
+
+
+def _start(fn: Callable[..., Any], *args: Any) -> threading.Thread:
+    def target() -> None:
+        try:
+            fn(*args)
+        except Exception:  # noqa: BLE001 - the stage loads again itself and falls back on failure
+            pass
+
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    return t
+
+
+def _load_llama_for_typical_prompt(model_path: Path, cfg: PipelineConfig) -> None:
+    load_llama(str(model_path), typical_n_ctx(model_path, cfg), cfg, keep_existing=True)
+
+
+class ModelPreloader:
+    """
+    Loads the spaCy model in a daemon thread while the first PDF converts, and the GGUF
+    model(s) once a document's extraction is usable (`start_llm`), so the LLM load overlaps
+    spaCy and candidate generation but a weak document never maps a model.
+
+    Both loaders fill the process-wide caches in pipeline.models, so the stages pick the
+    models up from there. spaCy is joined (`wait_spacy`) before candidate generation; the
+    LLM needs no explicit join, since load_llama holds a lock while loading. One preloader
+    serves the whole process (batch and watch modes): each loader thread starts once.
+    """
+
+    def __init__(self, cfg: PipelineConfig, model_path: Path | None, cascade_models: tuple[Path, ...] = ()) -> None:
+        self._cfg = cfg
+        # Cascade models first: they answer most documents.
+        self._llm_paths = [p for p in (*cascade_models, model_path) if p is not None]
+        self._llm_started = False
+        self._lock = threading.Lock()
+        self._spacy = _start(load_spacy, cfg.spacy_model)
+
+    def start_llm(self) -> None:
+        with self._lock:
+            if self._llm_started:
+                return
+            self._llm_started = True
+        for path in self._llm_paths:
+            if path.exists():
+                _start(_load_llama_for_typical_prompt, path, self._cfg)
+
+    def wait_spacy(self) -> None:
+        self._spacy.join()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from config import PipelineConfig
+from pipeline.blocks import Block
+from pipeline.decision_llm import decide_with_llm
+
+
+KINDS = ("funcionario", "empresa")
+# The ranker sees the same top 3 that --debug stores in `top_ranked`, so labelled
+# debug outputs are its training data.
+TOP_K = 3
+_REASON_FEATURES = ("label_value", "keyword_same_block", "keyword_nearby", "top_of_doc", "frequency")
+FEATURES = _REASON_FEATURES + ("score", "gap_next", "gap_top", "is_top", "n_candidates")
+
+
+def candidate_features(items: list[dict], i: int) -> list[float]:
+    item = items[i]
+    reasons = set(item.get("reasons") or [])
+    score = float(item.get("score", 0.0))
+    top = float(items[0].get("score", 0.0))
+    nxt = float(items[i + 1].get("score", 0.0)) if i + 1 < len(items) else 0.0
+    return [
+        *(1.0 if r in reasons else 0.0 for r in _REASON_FEATURES),
+        score,
+        score - nxt,
+        top - score,
+        1.0 if i == 0 else 0.0,
+        float(len(items)),
+    ]
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+@dataclass(frozen=True)
+class Ranker:
+    """
+    One logistic regression per field over candidate_features: P(candidate is the
+    answer). Trained with log loss, so its outputs are usable as confidences.
+    """
+
+    weights: dict[str, list[float]]  # per kind: bias, then one weight per feature
+    mean: list[float]
+    std: list[float]
+
+    def probabilities(self, kind: str, items: list[dict]) -> list[float]:
+        w = self.weights[kind]
+        out: list[float] = []
+        for i in range(len(items)):
+            x = candidate_features(items, i)
+            z = w[0] + sum(wj * (xj - m) / s for wj, xj, m, s in zip(w[1:], x, self.mean, self.std))
+            out.append(_sigmoid(z))
+        return out
+
+    def pick(self, kind: str, items: list[dict]) -> tuple[str, float] | None:
+        items = items[:TOP_K]
+        if not items:
+            return None
+        probs = self.probabilities(kind, items)
+        best = max(range(len(items)), key=lambda i: (probs[i], -i))
+        return str(items[best].get("text", "")), probs[best]
+
+    def to_dict(self) -> dict:
+        return {"version": 1, "features": list(FEATURES), "weights": self.weights, "mean": self.mean, "std": self.std}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Ranker":
+        if data.get("features") != list(FEATURES):
+            raise ValueError("ranker was trained on a different feature set")
+        return cls(weights={k: list(data["weights"][k]) for k in KINDS}, mean=data["mean"], std=data["std"])
+
+
+@lru_cache(maxsize=4)
+def load_ranker(path: str) -> Ranker:
+    return Ranker.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def labelled_examples(results: Iterable[dict]) -> dict[str, list[tuple[list[float], int]]]:
+    """
+    Turn reviewed --debug results into (features, label) rows: a top-ranked candidate is
+    positive when its text equals the result's (corrected) answer for that field.
+    """
+    rows: dict[str, list[tuple[list[float], int]]] = {k: [] for k in KINDS}
+    for result in results:
+        top_ranked = (result.get("debug") or {}).get("top_ranked") or {}
+        for kind in KINDS:
+            gold = result.get(kind)
+            items = (top_ranked.get(kind) or [])[:TOP_K]
+            if gold is None or not items:
+                continue
+            for i, item in enumerate(items):
+                rows[kind].append((candidate_features(items, i), 1 if item.get("text") == gold else 0))
+    return rows
+
+
+def train(
+    rows: dict[str, list[tuple[list[float], int]]], epochs: int = 500, lr: float = 0.5, l2: float = 1e-3
+) -> Ranker:
+    all_x = [x for kind in KINDS for x, _ in rows[kind]]
+    n_feat = len(FEATURES)
+    n = max(len(all_x), 1)
+    mean = [sum(x[j] for x in all_x) / n for j in range(n_feat)]
+    # Constant features (std 0) keep a unit scale.
+    std = [math.sqrt(sum((x[j] - mean[j]) ** 2 for x in all_x) / n) or 1.0 for j in range(n_feat)]
+
+    weights: dict[str, list[float]] = {}
+    for kind in KINDS:
+        data = [([1.0] + [(xj - m) / s for xj, m, s in zip(x, mean, std)], y) for x, y in rows[kind]]
+        w = [0.0] * (n_feat + 1)
+        for _ in range(epochs if data else 0):
+            grad = [0.0] * len(w)
+            for x, y in data:
+                err = _sigmoid(sum(wj * xj for wj, xj in zip(w, x))) - y
+                for j, xj in enumerate(x):
+                    grad[j] += err * xj
+            for j in range(len(w)):
+                reg = l2 * w[j] if j > 0 else 0.0
+                w[j] -= lr * (grad[j] / len(data) + reg)
+        weights[kind] = w
+    return Ranker(weights=weights, mean=mean, std=std)
+
+
+def decide_with_ranker(
+    blocks: list[Block],
+    ranked: dict,
+    model_path: Path | None,
+    cfg: PipelineConfig,
+    ranker: Ranker,
+    decide: Callable[..., dict] = decide_with_llm,
+) -> dict:
+    """
+    Decision engine in front of decide_with_llm (or `decide`): fields the ranker is sure
+    about (probability >= ranker_accept_probability) are answered directly, and the LLM
+    (or its fallback) is only consulted when at least one field is uncertain.
+    """
+    confident: dict[str, str] = {}
+    probability: dict[str, float] = {}
+    for kind in KINDS:
+        pick = ranker.pick(kind, ranked.get(kind) or [])
+        if pick is not None and pick[1] >= cfg.ranker_accept_probability:
+            confident[kind] = pick[0]
+            probability[kind] = pick[1]
+    if len(confident) == len(KINDS):
+        return {**confident, "llm_used": False, "ranker_used": True, "probability": probability}
+    decision = decide(blocks=blocks, ranked=ranked, model_path=model_path, cfg=cfg)
+    return decision | confident | {"ranker_used": bool(confident), "probability": probability}
+
+
+def _iter_results(path: Path) -> Iterator[dict]:
+    if path.is_dir():
+        for p in sorted(path.rglob("*")):
+            if p.suffix.lower() in {".json", ".jsonl"}:
+                yield from _iter_results(p)
+        return
+    text = path.read_text(encoding="utf-8")
+    for line in text.splitlines() if path.suffix.lower() == ".jsonl" else [text]:
+        if not line.strip():
+            continue
+        obj = json.loads(line)
+        obj = obj.get("result", obj)  # batch journal lines wrap the result
+        yield from obj.get("forms") or [obj]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Train the candidate ranker from reviewed --debug results")
+    p.add_argument("inputs", nargs="+", help="Result JSON files, batch journals (JSONL) or directories of them")
+    p.add_argument("--out", required=True, help="Path of the ranker JSON to write")
+    p.add_argument("--epochs", type=int, default=500)
+    return p
+
+
+def main(argv: list[str]) -> int:
+    args = build_parser().parse_args(argv)
+    results = [r for path in args.inputs for r in _iter_results(Path(path))]
+    rows = labelled_examples(results)
+    if not any(rows.values()):
+        print("ranker: no result with debug.top_ranked found", file=sys.stderr)
+        return 1
+    ranker = train(rows, epochs=args.epochs)
+    Path(args.out).write_text(json.dumps(ranker.to_dict(), indent=2), encoding="utf-8")
+    print(
+        f"ranker: trained on {len(results)} results "
+        f"({len(rows['funcionario'])} funcionario / {len(rows['empresa'])} empresa candidates) -> {args.out}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
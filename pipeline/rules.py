@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from pipeline.utils import normalize_for_match, normalize_text
+
+
+# All patterns, stop lists and label sets are compiled / normalized once at import.
+
+_UPPER = "A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ"
+_LOWER = "a-záàâãéèêíìîóòôõúùûç"
+
+PERSON_TITLE_RE = re.compile(rf"\b([{_UPPER}][{_LOWER}]+(?:\s+[{_UPPER}][{_LOWER}]+){{1,3}})\b")
+
+PERSON_ALLCAPS_RE = re.compile(
+    rf"\b([{_UPPER}]{{2,}}(?:\s+(?:DA|DE|DO|DOS|DAS)\s+)?"
+    rf"[{_UPPER}]{{2,}}(?:\s+[{_UPPER}]{{2,}}){{0,2}})\b"
+)
+
+PERSON_KEYWORD_LINE_RE = re.compile(r"(?i)\b(?:nome|funcion[áa]rio|empregado)\b\s*[:\-]\s*(.+)$")
+
+COMPANY_HINT_RE = re.compile(
+    r"\b(LTDA|Ltda|S\/A|SA|EIRELI|ME|EPP|E\.?P\.?P\.?|IND[ÚU]STRIA|COM[ÉE]RCIO|SERVI[ÇC]OS)\b"
+)
+
+COMPANY_KEYWORD_LINE_RE = re.compile(
+    r"(?i)\b(?:empresa|empregador|raz[aã]o\s+social|unidade|estabelecimento|local|fantasia|nome\s+fantasia)\b"
+    r"\s*(?:[:\-]\s*)?(.+)$"
+)
+
+COMPANY_PREFIX_RE = re.compile(r"(?i)\b(CEI|EMEI|EMEF|EE|E\.E\.|E\.M\.|E\.M\.E\.I\.)\b")
+
+_IDENTIFIER_RE = re.compile(r"\d{8,}")
+
+_LETTER_RUN_RE = re.compile(r"[^\W\d_]+")
+
+STOP_TOKENS = frozenset(
+    {
+        "cpf",
+        "rg",
+        "cnpj",
+        "ctps",
+        "pis",
+        "nascimento",
+        "endereco",
+        "endereço",
+        "empresa",
+        "empregador",
+        "funcionario",
+        "funcionário",
+        "nome",
+        "razao",
+        "razão",
+        "social",
+        "medica",
+        "médica",
+        "saude",
+        "saúde",
+        "ocupacional",
+    }
+)
+
+COMPANY_STOP_PHRASES = frozenset(
+    {
+        "exame",
+        "físico",
+        "fisico",
+        "periódico",
+        "periodico",
+        "atestado",
+        "laudo",
+        "resultado",
+        "relatório",
+        "relatorio",
+        "ocupacional",
+        "saúde ocupacional",
+        "saude ocupacional",
+    }
+)
+_COMPANY_STOP_NORMS = tuple(sorted({normalize_for_match(p) for p in COMPANY_STOP_PHRASES}))
+
+EMPLOYEE_KEYWORDS = frozenset(
+    {
+        "funcionario",
+        "funcionário",
+        "empregado",
+        "nome",
+        "trabalhador",
+        "colaborador",
+    }
+)
+
+NAME_CONNECTORS = frozenset({"da", "de", "do", "dos", "das"})
+_CAPS_CONNECTORS = frozenset({"DA", "DE", "DO", "DOS", "DAS"})
+
+COMPANY_LABELS = frozenset(
+    {
+        "empresa",
+        "empregador",
+        "razao social",
+        "razão social",
+        "fantasia",
+        "nome fantasia",
+        "unidade",
+        "estabelecimento",
+        "local",
+    }
+)
+
+
+# Name tokens repeat heavily across blocks and documents.
+_normalize_token = lru_cache(maxsize=8192)(normalize_for_match)
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    kind: str  # "funcionario" | "empresa" | "empresa_label"
+    source: str
+    text: str
+    start: int
+    end: int
+
+
+def looks_like_person(text: str) -> bool:
+    return _person_shape_ok(normalize_text(text))
+
+
+def _person_shape_ok(t: str) -> bool:
+    # `t` must already be normalize_text()-ed.
+    if any(map(str.isdigit, t)):
+        return False
+    parts = [p for p in t.split(" ") if p]
+    if not (2 <= len(parts) <= 4):
+        return False
+    lowered = normalize_for_match(t)
+    if any(tok in STOP_TOKENS for tok in lowered.split()):
+        return False
+    # Allow ALL-CAPS names (very common in forms), but still require sane tokens.
+    if t.isupper():
+        alpha_tokens = [p for p in parts if p.isalpha() or p in _CAPS_CONNECTORS]
+        return len(alpha_tokens) >= 2
+
+    # Require at least two tokens starting with uppercase, ignoring connectors.
+    title_tokens = 0
+    for p in parts:
+        if p[:1].isupper() and _normalize_token(p) not in NAME_CONNECTORS:
+            title_tokens += 1
+    return title_tokens >= 2
+
+
+def looks_like_company(value: str) -> bool:
+    return _company_shape_ok(normalize_text(value))
+
+
+def _company_shape_ok(v: str) -> bool:
+    # `v` must already be normalize_text()-ed.
+    if len(v) < 3 or len(v) > 140:
+        return False
+    # Allow small numbers (e.g., "CEI 1"), but reject identifiers (CNPJ/CPF) by long digit runs.
+    if _IDENTIFIER_RE.search(v):
+        return False
+    v_norm = normalize_for_match(v)
+    for bad in _COMPANY_STOP_NORMS:
+        if bad in v_norm:
+            return False
+    # Require either a known prefix (CEI/EMEI/...) or 2+ tokens.
+    if COMPANY_PREFIX_RE.search(v):
+        return True
+    return len(v.split(" ")) >= 2
+
+
+def could_contain_person(text: str) -> bool:
+    """
+    Cheap necessary condition for any span of `text` to pass looks_like_person:
+    at least two letter runs that do not start lowercase (title-case or all-caps tokens).
+    """
+    hits = 0
+    for m in _LETTER_RUN_RE.finditer(text):
+        if not m.group()[0].islower():
+            hits += 1
+            if hits >= 2:
+                return True
+    return False
+
+
+def first_tokens(text: str, n: int) -> str:
+    return " ".join(normalize_text(text).split(" ")[:n]) if text.strip() else ""
+
+
+def _label_and_next_line(text: str) -> tuple[str, str] | None:
+    # Every line separator is non-printable, so single-line blocks (the usual case,
+    # since block text is whitespace-normalized) skip splitlines entirely.
+    if text.isprintable():
+        return None
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    if len(lines) < 2:
+        return None
+    return lines[0], lines[1]
+
+
+def scan_block(text: str) -> list[RuleMatch]:
+    """
+    Scan one block and return every rule match that passes validation, in the order
+    candidate generation consumes them: person keyword line, person title/caps
+    regexes, then the company rules.
+    """
+    matches: list[RuleMatch] = []
+    if not text:
+        return matches
+
+    m = PERSON_KEYWORD_LINE_RE.search(text)
+    if m:
+        # Cut after 4 tokens to avoid carrying trailing fields (CPF/RG/etc.).
+        value = first_tokens(m.group(1), 4)
+        if _person_shape_ok(value):
+            matches.append(RuleMatch("funcionario", "keyword_line", value, m.start(1), m.end(1)))
+
+    for pattern, source in ((PERSON_TITLE_RE, "regex"), (PERSON_ALLCAPS_RE, "regex_caps")):
+        for m in pattern.finditer(text):
+            value = normalize_text(m.group(1))
+            if _person_shape_ok(value):
+                matches.append(RuleMatch("funcionario", source, value, m.start(1), m.end(1)))
+
+    if not text.strip():
+        return matches
+
+    # "Empresa\nCEI Erinice Siqueira": label on the first line, value on the next one.
+    two = _label_and_next_line(text)
+    if two is not None and normalize_for_match(two[0]) in COMPANY_LABELS:
+        value = first_tokens(two[1], 12)
+        if _company_shape_ok(value):
+            start = text.find(two[1])
+            matches.append(RuleMatch("empresa", "label_next_line", value, start, start + len(two[1])))
+
+    m = COMPANY_KEYWORD_LINE_RE.search(text)
+    if m and m.group(1).strip():
+        # Keep at most ~12 tokens to avoid carrying trailing fields.
+        value = first_tokens(m.group(1), 12)
+        if _company_shape_ok(value):
+            matches.append(RuleMatch("empresa", "keyword_line", value, m.start(1), m.end(1)))
+
+    # A bare label: the value lives in a following block (resolved by the caller).
+    if normalize_for_match(text) in COMPANY_LABELS:
+        matches.append(RuleMatch("empresa_label", "label", text, 0, len(text)))
+
+    if COMPANY_HINT_RE.search(text):
+        value = normalize_text(text)
+        if len(value) < 4 or not _company_shape_ok(value):
+            return matches
+        matches.append(RuleMatch("empresa", "company_hint", value, 0, len(text)))
+
+    # all-caps blocks are often headers / company names
+    if len(text) >= 8 and text.isupper() and not any(ch.isdigit() for ch in text):
+        value = normalize_text(text)
+        if _company_shape_ok(value):
+            matches.append(RuleMatch("empresa", "caps", value, 0, len(text)))
+
+    return matches
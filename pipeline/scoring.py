@@ -4,7 +4,9 @@ from dataclasses import dataclass
 
 from config import PipelineConfig
 from pipeline.blocks import Block
-from pipeline.candidates import Candidate
+from pipeline.candidates import LABEL_VALUE_SOURCES, Candidate
+from pipeline.rules import EMPLOYEE_KEYWORDS
+from pipeline.spatial import SpatialIndex
 from pipeline.utils import normalize_for_match
 
 
@@ -17,14 +19,7 @@ _KEYWORDS_EMPRESA = {
     "contratante",
 }
 
-_KEYWORDS_FUNCIONARIO = {
-    "funcionario",
-    "funcionário",
-    "empregado",
-    "nome",
-    "trabalhador",
-    "colaborador",
-}
+_KEYWORDS_FUNCIONARIO = set(EMPLOYEE_KEYWORDS)
 
 
 @dataclass(frozen=True)
@@ -52,6 +47,15 @@ def _shape_score(text: str) -> float:
     return 0.5
 
 
+def _nearby_blocks(b: Block, blocks_by_index: dict[int, Block], spatial: SpatialIndex | None, cfg: PipelineConfig):
+    # Lazy, so the layout queries only run when reading order found nothing.
+    for delta in (-2, -1, 1, 2):
+        yield blocks_by_index.get(b.index + delta)
+    if spatial is not None:
+        for direction in ("left", "above"):
+            yield spatial.nearest_within_page_fraction(b, direction, cfg.spatial_neighbor_distance)
+
+
 def score_and_rank(blocks: list[Block], candidates_payload: dict, cfg: PipelineConfig) -> dict:
     internal = candidates_payload.get("_internal") or {}
     people: list[Candidate] = internal.get("funcionarios") or []
@@ -59,47 +63,60 @@ def score_and_rank(blocks: list[Block], candidates_payload: dict, cfg: PipelineC
 
     blocks_by_id = {b.id: b for b in blocks}
     blocks_by_index = {b.index: b for b in blocks}
+    spatial = SpatialIndex(blocks) if cfg.spatial_neighbor_distance > 0 else None
 
     freq: dict[tuple[str, str], int] = {}
     for b in blocks:
         norm = normalize_for_match(b.text)
         for c in people:
-            if c.norm and c.norm in norm:
+            # A consolidated candidate counts the blocks mentioning any of its variants.
+            if any(n and n in norm for n in (c.norm, *c.aliases)):
                 freq[("funcionario", c.norm)] = freq.get(("funcionario", c.norm), 0) + 1
         for c in companies:
-            if c.norm and c.norm in norm:
+            if any(n and n in norm for n in (c.norm, *c.aliases)):
                 freq[("empresa", c.norm)] = freq.get(("empresa", c.norm), 0) + 1
 
     def score_one(c: Candidate) -> ScoredCandidate:
-        b = blocks_by_id.get(c.block_id)
         reasons: list[str] = []
         score = 0.0
+        # Evidence from every occurrence merged into the candidate, each reason counted once.
+        occurrences = [(c.block_id, c.source), *c.variants]
 
-        if c.kind == "empresa" and c.source in {"keyword_line", "label_next_line", "label_next_block"}:
+        if c.kind == "empresa" and any(source in LABEL_VALUE_SOURCES for _, source in occurrences):
             score += cfg.weight_keyword_same_block
             reasons.append("label_value")
 
-        if b is not None:
-            text_norm = normalize_for_match(b.text)
-            kw_set = _KEYWORDS_FUNCIONARIO if c.kind == "funcionario" else _KEYWORDS_EMPRESA
-            if _keywords_in_text(text_norm, kw_set):
-                score += cfg.weight_keyword_same_block
-                reasons.append("keyword_same_block")
-
-            # Nearby blocks (same page, index +/- 2)
-            for delta in (-2, -1, 1, 2):
-                nb = blocks_by_index.get(b.index + delta)
-                if nb is None or nb.page != b.page:
-                    continue
-                nb_norm = normalize_for_match(nb.text)
-                if _keywords_in_text(nb_norm, kw_set):
-                    score += cfg.weight_keyword_nearby
-                    reasons.append("keyword_nearby")
-                    break
+        kw_set = _KEYWORDS_FUNCIONARIO if c.kind == "funcionario" else _KEYWORDS_EMPRESA
+        same_block = nearby = top_of_doc = False
+        for block_id, _ in occurrences:
+            b = blocks_by_id.get(block_id)
+            if b is None:
+                continue
+            if not same_block and _keywords_in_text(normalize_for_match(b.text), kw_set):
+                same_block = True
+
+            # Nearby blocks: same page, index +/- 2, then the layout neighbours a label
+            # usually occupies (left of or above the value) when reading order is off.
+            if not nearby:
+                for nb in _nearby_blocks(b, blocks_by_index, spatial, cfg):
+                    if nb is None or nb.page != b.page:
+                        continue
+                    if _keywords_in_text(normalize_for_match(nb.text), kw_set):
+                        nearby = True
+                        break
 
             if c.kind == "empresa" and b.page == 1 and b.y_norm <= 0.25:
-                score += cfg.weight_top_of_doc_for_company
-                reasons.append("top_of_doc")
+                top_of_doc = True
+
+        if same_block:
+            score += cfg.weight_keyword_same_block
+            reasons.append("keyword_same_block")
+        if nearby:
+            score += cfg.weight_keyword_nearby
+            reasons.append("keyword_nearby")
+        if top_of_doc:
+            score += cfg.weight_top_of_doc_for_company
+            reasons.append("top_of_doc")
 
         f = freq.get((c.kind, c.norm), 0)
         if f > 1:
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+
+from config import PipelineConfig
+from pipeline.blocks import Block
+from pipeline.rules import EMPLOYEE_KEYWORDS, PERSON_KEYWORD_LINE_RE
+from pipeline.utils import normalize_for_match
+
+
+@dataclass(frozen=True)
+class Segment:
+    start_page: int
+    end_page: int
+    blocks: list[Block]  # re-indexed from 0, so blocks[b.index] is b inside the segment
+
+
+def _header_tokens(page_blocks: list[Block], y_norm_max: float) -> frozenset[str]:
+    top = [b for b in page_blocks if b.bbox is not None and b.y_norm <= y_norm_max]
+    if not top:
+        top = page_blocks[:3]  # no layout: the first blocks in reading order
+    tokens: set[str] = set()
+    for b in top:
+        # Page numbers, dates and protocol numbers change between forms of the same template.
+        tokens.update(t for t in normalize_for_match(b.text).split(" ") if t and not any(ch.isdigit() for ch in t))
+    return frozenset(tokens)
+
+
+def _title(page_blocks: list[Block]) -> str:
+    with_bbox = [b for b in page_blocks if b.bbox is not None]
+    first = min(with_bbox, key=lambda b: (b.y_norm, b.index)) if with_bbox else page_blocks[0]
+    return normalize_for_match(first.text)
+
+
+def _has_person_label(page_blocks: list[Block]) -> bool:
+    return any(
+        PERSON_KEYWORD_LINE_RE.search(b.text) or normalize_for_match(b.text) in EMPLOYEE_KEYWORDS
+        for b in page_blocks
+    )
+
+
+def _similar(a: frozenset[str], b: frozenset[str], threshold: float) -> bool:
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= threshold
+
+
+def _segment(pages: list[int], by_page: dict[int, list[Block]]) -> Segment:
+    blocks = [b for p in pages for b in by_page[p]]
+    return Segment(
+        start_page=pages[0],
+        end_page=pages[-1],
+        blocks=[replace(b, index=i) for i, b in enumerate(blocks)],
+    )
+
+
+def split_segments(blocks: list[Block], cfg: PipelineConfig) -> list[Segment]:
+    """
+    Split a bundle of forms into per-form segments, at page granularity.
+
+    A page starts a new form when it repeats the header (token overlap of the top
+    region) or the title of the page the current form started on, it carries an
+    employee label ("Nome:", "Funcionário", ...) and the current form already had one.
+    Anything else, including pages without text, continues the current form.
+    """
+    by_page: dict[int, list[Block]] = {}
+    for b in blocks:
+        by_page.setdefault(b.page, []).append(b)
+    if not by_page:
+        return []
+
+    segments: list[Segment] = []
+    current: list[int] = []
+    start_header: frozenset[str] = frozenset()
+    start_title = ""
+    labelled = False
+    for page in sorted(by_page):
+        page_blocks = by_page[page]
+        header = _header_tokens(page_blocks, cfg.segment_header_y_norm)
+        title = _title(page_blocks)
+        has_label = _has_person_label(page_blocks)
+        repeats = _similar(header, start_header, cfg.segment_header_similarity) or (
+            bool(title) and title == start_title
+        )
+        if current and labelled and has_label and repeats:
+            segments.append(_segment(current, by_page))
+            current, labelled = [], False
+        if not current:
+            start_header, start_title = header, title
+        current.append(page)
+        labelled = labelled or has_label
+    segments.append(_segment(current, by_page))
+    return segments
+
+
+def merge_repeated_forms(forms: list[dict]) -> list[dict]:
+    """
+    Join consecutive results naming the same employee and employer (a multi-page form
+    that repeats the employee label on every page), widening the page range.
+    """
+    merged: list[dict] = []
+    for form in forms:
+        prev = merged[-1] if merged else None
+        if (
+            prev is not None
+            and form["funcionario"] != "INDEFINIDO"
+            and form["funcionario"] == prev["funcionario"]
+            and form["empresa"] == prev["empresa"]
+        ):
+            prev["pages"] = [prev["pages"][0], form["pages"][1]]
+            prev["confidence"] = {
+                k: max(prev["confidence"].get(k, 0.0), form["confidence"].get(k, 0.0)) for k in prev["confidence"]
+            }
+            continue
+        merged.append(form)
+    return merged
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+
+from config import PipelineConfig
+from pipeline.decision_llm import _fallback_decision
+
+
+KINDS = ("funcionario", "empresa")
+
+
+class LoadShedder:
+    """
+    Load-aware switch between the LLM and the heuristic decision.
+
+    Pressure is the queue depth (set by the caller, e.g. the --watch backlog) and the
+    p95 of the last `shed_window` document latencies. Shedding starts when either
+    crosses its threshold and stops once both are back under `shed_resume_fraction`
+    of it, so the policy does not flap around the threshold.
+    """
+
+    def __init__(self, cfg: PipelineConfig) -> None:
+        self.cfg = cfg
+        self.queue_depth = 0
+        self.shedding = False
+        self._latencies: deque[float] = deque(maxlen=max(1, cfg.shed_window))
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def set_queue_depth(self, depth: int) -> None:
+        self.queue_depth = depth
+
+    def p95(self) -> float:
+        with self._lock:
+            values = sorted(self._latencies)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, math.ceil(0.95 * len(values)) - 1)]
+
+    def overloaded(self) -> bool:
+        cfg = self.cfg
+        factor = cfg.shed_resume_fraction if self.shedding else 1.0
+        p95 = self.p95()
+        self.shedding = (cfg.shed_queue_depth > 0 and self.queue_depth >= cfg.shed_queue_depth * factor) or (
+            cfg.shed_p95_seconds > 0 and p95 >= cfg.shed_p95_seconds * factor
+        )
+        return self.shedding
+
+
+def _margin(items: list[dict]) -> float:
+    if not items:
+        return 0.0
+    s1 = float(items[0].get("score", 0.0))
+    return s1 - float(items[1].get("score", 0.0)) if len(items) > 1 else s1
+
+
+def shed_decision(ranked: dict, cfg: PipelineConfig) -> dict | None:
+    """
+    The heuristic decision when every field's top-1/top-2 score margin is at least
+    shed_min_margin (and the heuristic names a candidate); None when some field still
+    needs the LLM. The decision carries `shed` so the document can be reprocessed.
+    """
+    d = _fallback_decision(ranked)
+    picks = {"funcionario": d.funcionario, "empresa": d.empresa}
+    for kind in KINDS:
+        if picks[kind] == "INDEFINIDO" or _margin(ranked.get(kind) or []) < cfg.shed_min_margin:
+            return None
+    return {**picks, "llm_used": False, "shed": list(KINDS)}
+
+
+def is_shed(result: dict) -> bool:
+    """Whether a run result (or any form of a bundle result) was decided under load shedding."""
+    forms = result.get("forms") or [result]
+    return any((form.get("debug") or {}).get("shed") for form in forms)
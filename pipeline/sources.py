@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import queue
+import tarfile
+import threading
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, TypeVar
+
+
+T = TypeVar("T")
+
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+@dataclass(frozen=True)
+class PdfMember:
+    """
+    A PDF held in memory, e.g. read from an archive; `name` identifies it in the journal.
+    `data` is None when it (or the archive holding it) could not be read.
+    """
+
+    name: str
+    data: bytes | None
+
+
+def is_archive(path: Path) -> bool:
+    name = path.name.lower()
+    return name.endswith(".zip") or name.endswith(_TAR_SUFFIXES)
+
+
+def iter_archive_members(archive: Path) -> Iterator[PdfMember]:
+    """
+    Yield every *.pdf member of a zip or tar archive in archive order, read straight
+    into memory. Tar archives (compressed or not) are read as a forward-only stream,
+    which suits network storage.
+    """
+    if archive.name.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+                    yield PdfMember(f"{archive}!{info.filename}", zf.read(info))
+        return
+    with tarfile.open(archive, mode="r|*") as tf:
+        for member in tf:
+            if member.isfile() and member.name.lower().endswith(".pdf"):
+                fh = tf.extractfile(member)
+                if fh is not None:
+                    yield PdfMember(f"{archive}!{member.name}", fh.read())
+
+
+class _Failure:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+_DONE = object()
+
+
+def prefetch(items: Iterable[T], depth: int) -> Iterator[T]:
+    """
+    Iterate `items` while a background thread reads up to `depth` items ahead, so
+    reading the next archive members overlaps with converting the current one.
+    Errors raised by the producer are re-raised at the point they occurred.
+    """
+    if depth <= 0:
+        yield from items
+        return
+
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fill() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as exc:  # noqa: BLE001 - handed over to the consumer
+            put(_Failure(exc))
+
+    threading.Thread(target=fill, name="pdf-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
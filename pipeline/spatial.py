@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import math
+
+from pipeline.blocks import Block
+
+
+_DIRECTIONS = ("right", "below", "left", "above")
+# Allowed overlap (in bbox units) between a block and the neighbour it points to.
+_TOLERANCE = 1.0
+
+
+def _box(b: Block) -> tuple[float, float, float, float] | None:
+    # (left, top, right, bottom), with y growing downwards as in build_blocks' y_norm.
+    if b.bbox is None:
+        return None
+    x0, y0, x1, y1 = b.bbox
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+
+class _PageGrid:
+    def __init__(self, items: list[tuple[Block, tuple[float, float, float, float]]]) -> None:
+        self.extent = max((max(box[2], box[3]) for _, box in items), default=0.0)
+        side = max(1, math.ceil(math.sqrt(len(items))))
+        self.cell = max(self.extent / side, 1.0)
+        self.cells: dict[tuple[int, int], list[tuple[Block, tuple[float, float, float, float]]]] = {}
+        for item in items:
+            _, (left, top, right, bottom) = item
+            for cx in range(self._c(left), self._c(right) + 1):
+                for cy in range(self._c(top), self._c(bottom) + 1):
+                    self.cells.setdefault((cx, cy), []).append(item)
+
+    def _c(self, v: float) -> int:
+        return int(v // self.cell)
+
+    def query(self, left: float, top: float, right: float, bottom: float):
+        seen: set[str] = set()
+        for cx in range(self._c(left), self._c(right) + 1):
+            for cy in range(self._c(top), self._c(bottom) + 1):
+                for item in self.cells.get((cx, cy), ()):
+                    if item[0].id not in seen:
+                        seen.add(item[0].id)
+                        yield item
+
+
+class SpatialIndex:
+    """
+    Per-page uniform grid over Block.bbox (about one block per cell), answering
+    "nearest block to the right/below/left/above within distance d" by visiting only
+    the cells of the search strip instead of every block on the page.
+    """
+
+    def __init__(self, blocks: list[Block]) -> None:
+        by_page: dict[int, list[tuple[Block, tuple[float, float, float, float]]]] = {}
+        for b in blocks:
+            box = _box(b)
+            if box is not None:
+                by_page.setdefault(b.page, []).append((b, box))
+        self._pages = {page: _PageGrid(items) for page, items in by_page.items()}
+
+    def page_extent(self, page: int) -> float:
+        grid = self._pages.get(page)
+        return grid.extent if grid is not None else 0.0
+
+    def nearest(self, b: Block, direction: str, max_dist: float) -> Block | None:
+        if direction not in _DIRECTIONS:
+            raise ValueError(f"unknown direction: {direction}")
+        grid = self._pages.get(b.page)
+        box = _box(b)
+        if grid is None or box is None or max_dist <= 0:
+            return None
+        left, top, right, bottom = box
+
+        # Search strip: same row (right/left) or same column (below/above) as `b`.
+        if direction == "right":
+            strip = (right - _TOLERANCE, top, right + max_dist, bottom)
+        elif direction == "left":
+            strip = (left - max_dist, top, left + _TOLERANCE, bottom)
+        elif direction == "below":
+            strip = (left, bottom - _TOLERANCE, right, bottom + max_dist)
+        else:
+            strip = (left, top - max_dist, right, top + _TOLERANCE)
+
+        best: tuple[float, int, Block] | None = None
+        for nb, (nl, nt, nr, nbot) in grid.query(*strip):
+            if nb.id == b.id:
+                continue
+            if direction in ("right", "left"):
+                if not (nt < bottom and nbot > top):
+                    continue
+                gap = nl - right if direction == "right" else left - nr
+            else:
+                if not (nl < right and nr > left):
+                    continue
+                gap = nt - bottom if direction == "below" else top - nbot
+            if gap < -_TOLERANCE or gap > max_dist:
+                continue
+            key = (max(gap, 0.0), nb.index, nb)
+            if best is None or key[:2] < best[:2]:
+                best = key
+        return best[2] if best is not None else None
+
+    def nearest_within_page_fraction(self, b: Block, direction: str, fraction: float) -> Block | None:
+        return self.nearest(b, direction, fraction * self.page_extent(b.page))
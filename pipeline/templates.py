@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from pipeline.blocks import Block
+from pipeline.rules import COMPANY_LABELS, EMPLOYEE_KEYWORDS, first_tokens, looks_like_company, looks_like_person
+from pipeline.utils import normalize_for_match, normalize_text, write_json_atomic
+
+
+_TEMPLATES_VERSION = 1
+KINDS = ("funcionario", "empresa")
+# Quantization grid for block positions: 1/20 of the page height, 1/10 of its width.
+_Y_STEPS = 20
+_X_STEPS = 10
+_MIN_LABELS = 3
+_KNOWN_LABELS = frozenset(normalize_for_match(w) for w in COMPANY_LABELS | EMPLOYEE_KEYWORDS)
+
+
+@dataclass(frozen=True)
+class TemplateHit:
+    fingerprint: str
+    funcionario: str
+    empresa: str
+    block_ids: dict[str, str]
+
+
+def _label_of(text: str) -> str | None:
+    # "Nome: Sandra" -> "nome"; a bare "Empresa" block -> "empresa".
+    head, sep, _ = text.partition(":")
+    label = normalize_for_match(head if sep else text)
+    if sep and label and len(label.split()) <= 4 and not any(ch.isdigit() for ch in label):
+        return label
+    return label if label in _KNOWN_LABELS else None
+
+
+def _first_page(blocks: list[Block]) -> list[Block]:
+    if not blocks:
+        return []
+    page = min(b.page for b in blocks)
+    return [b for b in blocks if b.page == page and b.bbox is not None]
+
+
+def _cell(b: Block, width: float) -> tuple[int, int]:
+    x0 = b.bbox[0] if b.bbox is not None else 0.0
+    return (int(b.y_norm * _Y_STEPS), int(x0 / width * _X_STEPS) if width > 0 else 0)
+
+
+def _page_width(blocks: list[Block]) -> float:
+    return max((b.bbox[2] for b in blocks if b.bbox is not None), default=0.0)
+
+
+def layout_fingerprint(blocks: list[Block]) -> str | None:
+    """
+    Hash of the labels on the first page and their quantized positions (from bbox and
+    y_norm). Values are left out, so every filled-in copy of a form shares the print.
+    None when the page has too few labels to tell templates apart.
+    """
+    page = _first_page(blocks)
+    width = _page_width(page)
+    labels = sorted({(label, *_cell(b, width)) for b in page if (label := _label_of(b.text)) is not None})
+    if len(labels) < _MIN_LABELS:
+        return None
+    material = json.dumps(labels, ensure_ascii=False)
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+
+
+def _region(b: Block, value: str, width: float) -> dict | None:
+    # Where `value` sits: after the label of a "Label: value" block, or as a block of its own.
+    # None when the block holds more than that (e.g. a sentence), which a region cannot replay.
+    wanted = normalize_for_match(value)
+    label = _label_of(b.text) if ":" in b.text else None
+    if label and normalize_for_match(b.text.partition(":")[2]).startswith(wanted):
+        return {"cell": list(_cell(b, width)), "label": label}
+    if normalize_for_match(b.text) == wanted:
+        return {"cell": list(_cell(b, width)), "label": None}
+    return None
+
+
+def _value_at(region: dict, page: list[Block], width: float, kind: str) -> tuple[str, Block] | None:
+    y, x = region["cell"]
+    for b in page:
+        by, bx = _cell(b, width)
+        if abs(by - y) > 1 or abs(bx - x) > 1:
+            continue
+        if region.get("label"):
+            if _label_of(b.text) != region["label"]:
+                continue
+            text = normalize_text(b.text.partition(":")[2])
+        elif _label_of(b.text) is not None:
+            continue
+        else:
+            text = normalize_text(b.text)
+        value = first_tokens(text, 8 if kind == "funcionario" else 12)
+        # Consistency check: the value must still look like what the region held.
+        ok = looks_like_person(value) if kind == "funcionario" else looks_like_company(value)
+        if ok and normalize_for_match(value) not in _KNOWN_LABELS:
+            return value, b
+    return None
+
+
+class TemplateCache:
+    """
+    Persistent map from layout fingerprint to where confirmed answers sat on the page.
+
+    A template answers new documents (skipping candidates, scoring and the LLM) once it
+    has been confirmed `min_confirmations` times with the same regions; a confirmation
+    with different regions drops it, since the layout does not pin the answers down.
+    Updates and snapshots are locked: --watch learns from several threads.
+    """
+
+    def __init__(self, min_confirmations: int = 2) -> None:
+        self.min_confirmations = min_confirmations
+        self._templates: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def extract(self, blocks: list[Block]) -> TemplateHit | None:
+        fp = layout_fingerprint(blocks)
+        entry = self._templates.get(fp) if fp is not None else None
+        if entry is None or entry.get("conflict") or entry["confirmations"] < self.min_confirmations:
+            return None
+        page = _first_page(blocks)
+        width = _page_width(page)
+        found = {kind: _value_at(entry["regions"][kind], page, width, kind) for kind in KINDS}
+        if any(v is None for v in found.values()):
+            return None
+        return TemplateHit(
+            fingerprint=fp,
+            funcionario=found["funcionario"][0],
+            empresa=found["empresa"][0],
+            block_ids={kind: found[kind][1].id for kind in KINDS},
+        )
+
+    def learn(self, blocks: list[Block], answers: dict[str, tuple[str, str]]) -> None:
+        """Record confirmed answers: kind -> (value, block_id of the block holding it)."""
+        fp = layout_fingerprint(blocks)
+        if fp is None or set(answers) != set(KINDS):
+            return
+        page = _first_page(blocks)
+        by_id = {b.id: b for b in page}
+        width = _page_width(page)
+        regions: dict[str, dict] = {}
+        for kind, (value, block_id) in answers.items():
+            b = by_id.get(block_id)
+            region = _region(b, value, width) if b is not None else None
+            if region is None:
+                return
+            regions[kind] = region
+        with self._lock:
+            entry = self._templates.get(fp)
+            if entry is None:
+                self._templates[fp] = {"regions": regions, "confirmations": 1}
+            elif entry["regions"] == regions:
+                entry["confirmations"] += 1
+            else:
+                entry["conflict"] = True
+            self.dirty = True
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            templates = {fp: dict(entry) for fp, entry in sorted(self._templates.items())}
+        return {"version": _TEMPLATES_VERSION, "templates": templates}
+
+    @classmethod
+    def from_dict(cls, payload: dict, min_confirmations: int = 2) -> TemplateCache:
+        cache = cls(min_confirmations)
+        if payload.get("version") == _TEMPLATES_VERSION:
+            cache._templates = {str(k): v for k, v in (payload.get("templates") or {}).items() if isinstance(v, dict)}
+        return cache
+
+    @classmethod
+    def load(cls, path: Path, min_confirmations: int = 2) -> TemplateCache:
+        if not path.exists():
+            return cls(min_confirmations)
+        return cls.from_dict(json.loads(path.read_text(encoding="utf-8")), min_confirmations)
+
+    def save(self, path: Path) -> None:
+        with self._lock:
+            payload = self.to_dict()
+            self.dirty = False
+        write_json_atomic(path, payload)
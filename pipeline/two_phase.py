@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+class RefinementQueue:
+    """
+    Second phase of two-phase results.
+
+    `submit` takes the provisional (heuristic) result of a document, publishes and returns
+    it at once and runs `refine` (the full decision, LLM included) on a background thread.
+    The refined result replaces the provisional one in `poll` and is published after it,
+    so `publish(key, result)` always sees a document's results in that order. A failed
+    refinement republishes the provisional result with a `refine_error`.
+    """
+
+    def __init__(self, workers: int = 1, publish: Callable[[str, dict], None] | None = None) -> None:
+        self.publish = publish
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="refine")
+        self._latest: dict[str, dict] = {}
+        self._pending: set[Future] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, provisional: dict, refine: Callable[[], dict]) -> dict:
+        with self._lock:
+            self._latest[key] = provisional
+        self._publish(key, provisional)
+        with self._lock:
+            fut = self._pool.submit(self._refine, key, provisional, refine)
+            self._pending.add(fut)
+        fut.add_done_callback(self._discard)
+        return provisional
+
+    def _discard(self, fut: Future) -> None:
+        with self._lock:
+            self._pending.discard(fut)
+
+    def _refine(self, key: str, provisional: dict, refine: Callable[[], dict]) -> dict:
+        try:
+            result = refine()
+        except Exception as exc:  # noqa: BLE001
+            result = provisional | {"refine_error": type(exc).__name__}
+        with self._lock:
+            self._latest[key] = result
+        self._publish(key, result)
+        return result
+
+    def _publish(self, key: str, result: dict) -> None:
+        if self.publish is None:
+            return
+        try:
+            self.publish(key, result)
+        except Exception:  # noqa: BLE001
+            pass
+
+    def poll(self, key: str) -> dict | None:
+        """Latest result for `key`: provisional until its refinement finished."""
+        with self._lock:
+            return self._latest.get(key)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def close(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import hashlib
+import json
+import os
 import re
+import threading
 import unicodedata
-from typing import Iterable
+from pathlib import Path
+from typing import Any, Iterable
 
 
 _WS_RE = re.compile(r"\s+")
@@ -15,16 +19,53 @@ def stable_short_hash(text: str, length: int = 12) -> str:
     return h[:length]
 
 
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def bytes_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    """
+    Write-then-rename, so readers never see a half-written file. The temp name is unique
+    per process and thread: watch workers, refiners and queue nodes may write the same path.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def write_json_atomic(path: Path, payload: Any, indent: int | None = 2) -> None:
+    write_text_atomic(path, json.dumps(payload, ensure_ascii=False, indent=indent))
+
+
+def _collapse_ws(text: str) -> str:
+    # Printable strings contain no whitespace other than " ", so without a double
+    # space there is nothing to collapse (the common case for normalized block text).
+    if text.isprintable() and "  " not in text:
+        return text
+    return _WS_RE.sub(" ", text)
+
+
 def normalize_text(text: str) -> str:
     text = unicodedata.normalize("NFKC", text)
     text = text.strip()
-    text = _WS_RE.sub(" ", text)
+    text = _collapse_ws(text)
     return text
 
 
 def normalize_for_match(text: str) -> str:
     text = normalize_text(text)
     text = text.casefold()
+    if _PUNCT_RE.search(text) is None:
+        return text
     text = _PUNCT_RE.sub(" ", text)
     text = _WS_RE.sub(" ", text).strip()
     return text
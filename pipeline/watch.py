@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from pipeline.utils import write_json_atomic
+
+
+@dataclass(frozen=True)
+class WatchStatus:
+    settling: int  # PDFs seen but still changing (or not yet stable for settle_seconds)
+    queued: int  # stable PDFs waiting for a free slot
+    running: int
+    done: int
+    failed: int
+
+    @property
+    def backlog(self) -> int:
+        return self.settling + self.queued + self.running
+
+
+def output_path(pdf: Path, root: Path, out_dir: Path | None, n_roots: int = 1) -> Path:
+    """
+    Result path for `pdf` found under the watched `root`: next to the PDF without
+    `out_dir`, otherwise the same relative path below `out_dir` (prefixed with the
+    watched directory's name when several directories are watched).
+    """
+    if out_dir is None:
+        return pdf.with_suffix(".json")
+    rel = pdf.relative_to(root).with_suffix(".json")
+    return out_dir / root.name / rel if n_roots > 1 else out_dir / rel
+
+
+class FolderWatcher:
+    """
+    Long-running ingestion of PDFs dropped into `roots` (polled recursively).
+
+    A PDF is enqueued once its size and mtime stayed unchanged for `settle_seconds`
+    (copies and scanner uploads still in progress keep changing), then processed by
+    `process` on at most `workers` threads of this process, so models stay warm.
+    A PDF whose result is already newer than the PDF is skipped, which makes restarts
+    cheap; a PDF replaced in place is processed again. `process` must be fail-safe.
+    """
+
+    def __init__(
+        self,
+        roots: list[Path],
+        process: Callable[[Path], dict],
+        out_dir: Path | None = None,
+        workers: int = 2,
+        poll_seconds: float = 2.0,
+        settle_seconds: float = 5.0,
+        on_status: Callable[[WatchStatus], None] | None = None,
+    ) -> None:
+        self.roots = roots
+        self.process = process
+        self.out_dir = out_dir
+        self.workers = max(1, workers)
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.on_status = on_status
+        # path -> ((size, mtime_ns), first time this signature was seen)
+        self._settling: dict[Path, tuple[tuple[int, int], float]] = {}
+        # path -> signature already queued or processed
+        self._handled: dict[Path, tuple[int, int]] = {}
+        self._queue: deque[tuple[Path, Path]] = deque()
+        self._running: set[Future] = set()
+        self.done = 0
+        self.failed = 0
+
+    def _pdfs(self) -> list[tuple[Path, Path]]:
+        found: list[tuple[Path, Path]] = []
+        for root in self.roots:
+            try:
+                found.extend((root, p) for p in sorted(root.rglob("*")) if p.suffix.lower() == ".pdf" and p.is_file())
+            except OSError:
+                continue
+        return found
+
+    def _up_to_date(self, out: Path, mtime_ns: int) -> bool:
+        try:
+            return out.stat().st_mtime_ns >= mtime_ns
+        except OSError:
+            return False
+
+    def scan(self, now: float | None = None) -> None:
+        """One poll: track changing files and enqueue the ones that settled."""
+        now = time.monotonic() if now is None else now
+        settling: dict[Path, tuple[tuple[int, int], float]] = {}
+        for root, pdf in self._pdfs():
+            try:
+                st = pdf.stat()
+            except OSError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            if self._handled.get(pdf) == sig:
+                continue
+            out = output_path(pdf, root, self.out_dir, len(self.roots))
+            if pdf not in self._handled and self._up_to_date(out, st.st_mtime_ns):
+                self._handled[pdf] = sig
+                continue
+            prev = self._settling.get(pdf)
+            since = prev[1] if prev is not None and prev[0] == sig else now
+            if st.st_size > 0 and now - since >= self.settle_seconds:
+                self._handled[pdf] = sig
+                self._queue.append((pdf, out))
+            else:
+                settling[pdf] = (sig, since)
+        self._settling = settling
+
+    def _job(self, pdf: Path, out: Path) -> None:
+        write_json_atomic(out, self.process(pdf))
+
+    def _reap(self) -> None:
+        for fut in [f for f in self._running if f.done()]:
+            self._running.discard(fut)
+            if fut.exception() is None:
+                self.done += 1
+            else:
+                self.failed += 1
+
+    def status(self) -> WatchStatus:
+        return WatchStatus(
+            settling=len(self._settling),
+            queued=len(self._queue),
+            running=len(self._running),
+            done=self.done,
+            failed=self.failed,
+        )
+
+    def run(self, stop: threading.Event) -> None:
+        """
+        Poll until `stop` is set. On exit, running documents finish and are written;
+        queued ones are left for the next start (they have no result yet).
+        """
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="watch")
+        try:
+            while True:
+                self._reap()
+                self.scan()
+                while self._queue and len(self._running) < self.workers:
+                    pdf, out = self._queue.popleft()
+                    self._running.add(pool.submit(self._job, pdf, out))
+                if self.on_status is not None:
+                    self.on_status(self.status())
+                if stop.wait(self.poll_seconds):
+                    return
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._reap()
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+from pipeline.utils import write_json_atomic
+
+
+# A lease is the item file renamed into leased/ as "<item>~<attempt>~<node>"; a reclaimed
+# item goes back to pending/ as "<item>~<attempts so far>". Counting attempts in names
+# means no node ever rewrites a lease, which could recreate one reclaimed meanwhile.
+_SEP = "~"
+
+
+def _split(name: str) -> tuple[str, int]:
+    item, _, rest = name.partition(_SEP)
+    return item, int(rest.partition(_SEP)[0] or 0)
+
+
+@dataclass(frozen=True)
+class QueueSummary:
+    processed: int
+    reclaimed: int  # expired leases this node put back into pending/
+    failed: int = 0  # items this node moved to failed/ after max_attempts expired leases
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def item_name(rel: str) -> str:
+    return hashlib.sha1(rel.encode("utf-8")).hexdigest()[:16] + ".json"
+
+
+def result_path(out_dir: Path, rel: str) -> Path:
+    return out_dir / Path(rel).with_suffix(".json")
+
+
+class WorkQueue:
+    """
+    Broker-free work queue in a directory shared by several nodes (e.g. over NFS).
+
+    Items are small JSON files in pending/. A node claims one by renaming it into
+    leased/ (rename is atomic, so exactly one node wins) and keeps the lease alive by
+    touching it while the document runs. A lease not touched for `lease_seconds` belongs
+    to a crashed node and is renamed back into pending/ by whichever node sees it first.
+    A finished item moves to done/ after its result was written to the output tree.
+    Every claim counts an attempt in the item's name; an item claimed `max_attempts` times
+    without finishing (a PDF that kills or hangs its node) moves to failed/ instead of
+    taking down the next node.
+    Lease expiry compares mtimes with the local clock, so node clocks must be in sync (NTP).
+    """
+
+    def __init__(self, root: Path, lease_seconds: float = 300.0, max_attempts: int = 3) -> None:
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.pending = root / "pending"
+        self.leased = root / "leased"
+        self.done = root / "done"
+        self.failed = root / "failed"
+        for d in (self.pending, self.leased, self.done, self.failed):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def _known(self) -> set[str]:
+        names = {p.name for d in (self.done, self.failed) for p in d.glob("*.json")}
+        return names | {_split(p.name)[0] for d in (self.pending, self.leased) for p in d.iterdir()}
+
+    def enqueue(self, pdfs: Iterable[Path], base: Path) -> int:
+        """
+        Add PDFs (named by their path relative to `base`, which is also their place in the
+        output tree); PDFs already pending, leased or done are left alone. Run it once,
+        before or while the nodes run, not from every node.
+        """
+        known = self._known()
+        added = 0
+        for pdf in pdfs:
+            rel = pdf.resolve().relative_to(base.resolve()).as_posix()
+            name = item_name(rel)
+            if name in known:
+                continue
+            write_json_atomic(self.pending / name, {"pdf": str(pdf.resolve()), "rel": rel})
+            known.add(name)
+            added += 1
+        return added
+
+    def reclaim(self, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        reclaimed = 0
+        for lease in sorted(self.leased.iterdir()):
+            try:
+                if now - lease.stat().st_mtime < self.lease_seconds:
+                    continue
+                item, attempt = _split(lease.name)
+                os.rename(lease, self.pending / f"{item}{_SEP}{attempt}")
+            except OSError:
+                continue  # finished, renewed or reclaimed by another node meanwhile
+            reclaimed += 1
+        return reclaimed
+
+    def claim(self, node: str) -> Path | None:
+        for item in sorted(self.pending.iterdir()):
+            if item.suffix == ".tmp":
+                continue  # being written by enqueue()
+            name, attempts = _split(item.name)
+            lease = self.leased / f"{name}{_SEP}{attempts + 1}{_SEP}{node}"
+            try:
+                # Touch first: rename keeps the mtime, and an old one would read as expired.
+                os.utime(item)
+                os.rename(item, lease)
+            except OSError:
+                continue  # another node claimed it first
+            return lease
+        return None
+
+    def admit(self, lease: Path) -> dict | None:
+        """
+        Return the claimed item; None when earlier attempts used them all up, in which case
+        the item moved to failed/. Raises OSError when the lease was reclaimed meanwhile.
+        """
+        name, attempt = _split(lease.name)
+        if attempt > self.max_attempts:
+            try:
+                os.rename(lease, self.failed / name)
+            except OSError:
+                pass
+            return None
+        return json.loads(lease.read_text(encoding="utf-8")) | {"attempt": attempt}
+
+    def complete(self, lease: Path, item: dict, result: dict, out_dir: Path) -> bool:
+        """Write the result, then retire the lease; False when the lease was lost meanwhile."""
+        write_json_atomic(result_path(out_dir, item["rel"]), result)
+        try:
+            os.rename(lease, self.done / _split(lease.name)[0])
+        except OSError:
+            return False
+        return True
+
+    def _renew(self, lease: Path, stop: threading.Event) -> None:
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                os.utime(lease)
+            except OSError:
+                return
+
+    def run(
+        self,
+        process: Callable[[Path], dict],
+        out_dir: Path,
+        node: str | None = None,
+        poll_seconds: float = 5.0,
+        stop: threading.Event | None = None,
+    ) -> QueueSummary:
+        """
+        Claim and process items until none is pending or leased (waiting on other nodes'
+        leases, which either finish or expire and come back), or until `stop` is set.
+        `process` must be fail-safe; if it raises, the lease is left to expire.
+        """
+        node = node or default_node_id()
+        stop = stop or threading.Event()
+        processed = reclaimed = failed = 0
+        while not stop.is_set():
+            reclaimed += self.reclaim()
+            lease = self.claim(node)
+            if lease is None:
+                if not any(self.leased.iterdir()):
+                    break
+                stop.wait(poll_seconds)
+                continue
+            try:
+                item = self.admit(lease)
+            except OSError:
+                continue  # reclaimed by another node before it was read
+            if item is None:
+                failed += 1
+                continue
+            beat = threading.Event()
+            renewer = threading.Thread(target=self._renew, args=(lease, beat), daemon=True)
+            renewer.start()
+            try:
+                result = process(Path(item["pdf"]))
+            finally:
+                beat.set()
+                renewer.join()
+            if self.complete(lease, item, result, out_dir):
+                processed += 1
+        return QueueSummary(processed=processed, reclaimed=reclaimed, failed=failed)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import copy
+from typing import Callable
+
+import pytest
+
+import main
+
+
+# A form with both answers on labelled lines, as extract_docling_json returns it.
+EXTRACTED = {
+    "blocks": [
+        {"text": "Empresa: CEI Erinice Siqueira LTDA", "page": 1, "bbox": [0, 30, 100, 45]},
+        {"text": "Nome: Sandra Regina Hortencio", "page": 1, "bbox": [0, 50, 100, 65]},
+    ],
+    "extraction_quality": "ok",
+}
+
+
+@pytest.fixture
+def fake_extract(monkeypatch) -> Callable[..., list[str]]:
+    """
+    fake_extract(*results, before=None) replaces main.extract_docling_json: each call
+    returns a copy of the next result (the last one repeats; None or no result stands for
+    EXTRACTED), after calling `before()` when given. Returns the paths converted so far.
+    """
+
+    def install(*results: dict | None, before: Callable[[], None] | None = None) -> list[str]:
+        queue = list(results) or [None]
+        calls: list[str] = []
+
+        def extract(pdf_path, cfg) -> dict:
+            calls.append(str(pdf_path))
+            if before is not None:
+                before()
+            result = queue[min(len(calls), len(queue)) - 1]
+            return copy.deepcopy(EXTRACTED if result is None else result)
+
+        monkeypatch.setattr(main, "extract_docling_json", extract)
+        return calls
+
+    return install
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from pipeline.batch import iter_pdf_paths, run_batch
+from pipeline.journal import ResultJournal, journal_key
+
+
+def _make_pdfs(root: Path, n: int) -> list[Path]:
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n):
+        p = root / f"doc{i}.pdf"
+        p.write_bytes(f"%PDF-1.4 {i}".encode())
+        paths.append(p)
+    return paths
+
+
+def test_journal_truncates_torn_tail(tmp_path: Path) -> None:
+    path = tmp_path / "journal.jsonl"
+    with ResultJournal(path) as j:
+        j.append("a.pdf", "h1", "c1", {"funcionario": "X"})
+    with path.open("ab") as fh:
+        fh.write(b'{"input": "b.pdf", "content_ha')
+
+    j = ResultJournal(path)
+    assert journal_key("a.pdf", "h1", "c1") in j
+    assert len(j) == 1
+    j.close()
+    assert path.read_bytes().endswith(b"}\n")
+    assert all(json.loads(line) for line in path.read_text(encoding="utf-8").splitlines())
+
+
+def test_batch_resumes_and_skips_completed(tmp_path: Path) -> None:
+    pdfs = _make_pdfs(tmp_path / "in", 5)
+    journal_path = tmp_path / "out.jsonl"
+    seen: list[str] = []
+
+    def process(p: Path) -> dict:
+        seen.append(p.name)
+        return {"funcionario": p.stem}
+
+    with ResultJournal(journal_path, flush_every=1) as j:
+        first = run_batch(pdfs[:3], j, process, config_hash="cfg")
+    with ResultJournal(journal_path) as j:
+        second = run_batch(iter_pdf_paths(tmp_path / "in"), j, process, config_hash="cfg")
+
+    assert (first.processed, second.processed, second.skipped) == (3, 2, 3)
+    assert seen == ["doc0.pdf", "doc1.pdf", "doc2.pdf", "doc3.pdf", "doc4.pdf"]
+
+    with ResultJournal(journal_path) as j:
+        changed = run_batch(pdfs[:1], j, process, config_hash="other")
+    assert changed.processed == 1
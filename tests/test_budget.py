@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+
+import main
+from config import PipelineConfig
+from pipeline.budget import BudgetExceeded, ConversionWorker
+from pipeline.decision_llm import complete
+
+
+
+def _convert(pdf_path: str, cfg: PipelineConfig) -> dict:
+    # Module-level so the spawned worker can import it.
+    if "hang" in pdf_path:
+        time.sleep(60)
+    return {"blocks": [], "extraction_quality": "ok"}
+
+
+def test_hung_conversion_is_killed_and_worker_recycled() -> None:
+    with ConversionWorker(PipelineConfig(), timeout_seconds=3.0, target=_convert) as worker:
+        assert worker.convert("ok.pdf")["extraction_quality"] == "ok"
+        with pytest.raises(BudgetExceeded) as exc:
+            worker.convert("hang.pdf")
+        assert exc.value.stage == "extract" and worker.recycled == 1
+        assert worker.convert("ok.pdf")["extraction_quality"] == "ok"
+
+
+def _slow_warm(cfg: PipelineConfig) -> None:
+    time.sleep(2.0)
+
+
+def test_warm_up_does_not_count_against_the_conversion_budget() -> None:
+    with ConversionWorker(PipelineConfig(), timeout_seconds=1.0, target=_convert, warm=_slow_warm) as worker:
+        assert worker.convert("ok.pdf")["extraction_quality"] == "ok"
+        assert worker.recycled == 0
+    stuck = ConversionWorker(PipelineConfig(), 0.0, target=_convert, warm=_slow_warm, startup_seconds=0.5)
+    with stuck, pytest.raises(RuntimeError, match="failed to start"):
+        stuck.convert("ok.pdf")
+
+
+@pytest.mark.parametrize(("budget", "stage"), [({"budget_max_blocks": 2}, "blocks"), ({"budget_max_pages": 1}, "pages")])
+def test_size_budgets_return_fail_safe(tmp_path: Path, fake_extract, budget: dict, stage: str) -> None:
+    blocks = [{"text": text, "page": page} for text, page in (("Empresa: ACME", 1), ("Nome: Ana", 1), ("Fim", 2))]
+    fake_extract({"blocks": blocks, "extraction_quality": "ok"})
+    result = main.run(tmp_path / "doc.pdf", tmp_path / "out.json", None, PipelineConfig(**budget), debug=False)
+    assert result["funcionario"] == result["empresa"] == "INDEFINIDO"
+    assert result["debug"] == {"error": f"budget_exceeded:{stage}"}
+
+
+def test_llm_deadline() -> None:
+    class SlowLlama:
+        def __call__(self, prompt: str, **kwargs) -> dict:
+            time.sleep(0.2)
+            return {"choices": [{"text": "{"}]}
+
+    with pytest.raises(BudgetExceeded) as exc:
+        complete(SlowLlama(), "prompt", PipelineConfig(budget_llm_seconds=0.05))
+    assert exc.value.stage == "decision"
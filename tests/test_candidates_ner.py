@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sys
+import types
+from dataclasses import replace
+
+import pytest
+
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.candidates import generate_candidates
+from pipeline.models import load_spacy
+
+
+@pytest.fixture(autouse=True)
+def _fresh_spacy_cache():
+    load_spacy.cache_clear()
+    yield
+    load_spacy.cache_clear()
+
+
+class _Ent:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.label_ = "PER"
+
+
+class _FakeNlp:
+    def __init__(self) -> None:
+        self.seen: list[str] = []
+
+    def pipe(self, texts):
+        for t in texts:
+            self.seen.append(t)
+            yield types.SimpleNamespace(ents=[_Ent(t.replace("Nome: ", ""))] if t.startswith("Nome:") else [])
+
+
+def _blocks():
+    return build_blocks(
+        {
+            "blocks": [
+                {"text": "Nome: Sandra Regina Hortencio", "page": 1, "bbox": [0, 10, 100, 20]},
+                {"text": "123.456.789-00", "page": 1, "bbox": [0, 30, 100, 40]},
+                {"text": "resultado dentro da normalidade", "page": 1, "bbox": [0, 50, 100, 60]},
+                {"text": "Dr Paulo Mendes CRM", "page": 2, "bbox": [0, 90, 100, 100]},
+            ]
+        }
+    )
+
+
+def test_prefilter_skips_blocks_and_reports_counts(monkeypatch) -> None:
+    nlp = _FakeNlp()
+    monkeypatch.setitem(sys.modules, "spacy", types.SimpleNamespace(load=lambda name: nlp))
+    cands = generate_candidates(_blocks(), cfg=PipelineConfig())
+
+    assert nlp.seen == ["Nome: Sandra Regina Hortencio", "Dr Paulo Mendes CRM"]
+    assert cands["_meta"]["ner_blocks_processed"] == 2
+    assert cands["_meta"]["ner_blocks_skipped"] == 2
+    assert any(c.source == "spacy" for c in cands["_internal"]["funcionarios"])
+
+
+def test_prefilter_region_restrictions(monkeypatch) -> None:
+    nlp = _FakeNlp()
+    monkeypatch.setitem(sys.modules, "spacy", types.SimpleNamespace(load=lambda name: nlp))
+    cfg = replace(PipelineConfig(), ner_keyword_window=1)
+    generate_candidates(_blocks(), cfg=cfg)
+    assert nlp.seen == ["Nome: Sandra Regina Hortencio"]
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pipeline.cascade as cascade
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.metrics import Metrics
+
+
+_BLOCKS = build_blocks(
+    {
+        "blocks": [
+            {"text": "Empresa: ACME LTDA", "page": 1, "bbox": [0, 10, 100, 20]},
+            {"text": "Nome: Ana Souza", "page": 1, "bbox": [0, 30, 100, 40]},
+        ],
+        "extraction_quality": "ok",
+    }
+)
+_RANKED = {
+    "funcionario": [
+        {"text": "Ana Souza", "score": 4.0, "reasons": ["keyword_same_block"]},
+        {"text": "Bia Lima", "score": 1.0, "reasons": ["shape"]},
+    ],
+    "empresa": [{"text": "ACME LTDA", "score": 4.0, "reasons": ["label_value"]}],
+}
+SMALL, LARGE = Path("small.gguf"), Path("large.gguf")
+
+
+def _fake_llm(answers: dict[Path, dict], calls: list[Path]):
+    def decide(blocks, ranked, model_path, cfg) -> dict:
+        calls.append(model_path)
+        return answers[model_path] | {"llm_used": True}
+
+    return decide
+
+
+def test_easy_document_stays_on_the_small_model(monkeypatch) -> None:
+    calls: list[Path] = []
+    answers = {SMALL: {"funcionario": "Ana Souza", "empresa": "ACME LTDA"}}
+    monkeypatch.setattr(cascade, "decide_with_llm", _fake_llm(answers, calls))
+    decision = cascade.decide_with_cascade(_BLOCKS, _RANKED, [SMALL, LARGE], PipelineConfig())
+    assert calls == [SMALL]
+    assert decision["cascade"] == {"tier": 0, "escalations": []}
+
+
+def test_indefinido_or_disagreement_escalates(monkeypatch) -> None:
+    calls: list[Path] = []
+    answers = {
+        SMALL: {"funcionario": "Bia Lima", "empresa": "INDEFINIDO"},
+        LARGE: {"funcionario": "Ana Souza", "empresa": "ACME LTDA"},
+    }
+    monkeypatch.setattr(cascade, "decide_with_llm", _fake_llm(answers, calls))
+    decision = cascade.decide_with_cascade(_BLOCKS, _RANKED, [SMALL, LARGE], PipelineConfig())
+    assert calls == [SMALL, LARGE]
+    assert decision["funcionario"] == "Ana Souza"
+    assert decision["cascade"]["tier"] == 1
+    assert decision["cascade"]["escalations"][0][:2] == ["indefinido", "disagrees_with_top1"]
+
+    metrics = Metrics()
+    metrics.record_decision(decision)
+    snap = metrics.to_json()
+    assert snap["cascade_decisions_total"] == snap["cascade_escalated_total"] == 1
+    assert snap["cascade_escalations_total"]["indefinido"] == 1
+
+
+def test_low_confidence_threshold_escalates(monkeypatch) -> None:
+    calls: list[Path] = []
+    answers = {s: {"funcionario": "Ana Souza", "empresa": "ACME LTDA"} for s in (SMALL, LARGE)}
+    monkeypatch.setattr(cascade, "decide_with_llm", _fake_llm(answers, calls))
+    decision = cascade.decide_with_cascade(_BLOCKS, _RANKED, [SMALL, LARGE], PipelineConfig(cascade_min_confidence=1.01))
+    assert calls == [SMALL, LARGE]
+    assert decision["cascade"]["escalations"] == [["low_confidence"]]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import main
+from config import STAGE_CONFIG_FIELDS, UNSTAGED_FIELDS, PipelineConfig, config_field_names
+from pipeline.checkpoint import ArtifactStore
+
+
+
+def test_every_config_field_is_classified() -> None:
+    staged = {f for names in STAGE_CONFIG_FIELDS.values() for f in names}
+    assert set(config_field_names()) == staged | UNSTAGED_FIELDS
+
+
+def test_weight_change_reuses_upstream_artifacts(tmp_path: Path, fake_extract) -> None:
+    calls = fake_extract()
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+    cfg = PipelineConfig()
+
+    store = ArtifactStore(tmp_path / "cache")
+    first = main.run(pdf, tmp_path / "out.json", None, cfg, debug=False, ctx=main.RunContext(store=store))
+
+    store = ArtifactStore(tmp_path / "cache")
+    second = main.run(
+        pdf, tmp_path / "out.json", None, replace(cfg, weight_shape=0.5), debug=False, ctx=main.RunContext(store=store)
+    )
+
+    assert len(calls) == 1
+    assert store.hits.get("extract") == 1 and store.hits.get("blocks") == 1
+    assert store.misses.get("ranked") == 1
+    assert second["empresa"] == first["empresa"] == "CEI Erinice Siqueira LTDA"
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.candidates import generate_candidates
+from pipeline.decision_llm import _fallback_decision
+from pipeline.scoring import score_and_rank
+
+
+_EXTRACTED = {
+    "blocks": [
+        {"text": "ATESTADO DE SAÚDE OCUPACIONAL", "page": 1, "bbox": [0, 5, 300, 20]},
+        {"text": "Empresa: CEI Erinice Siqueira", "page": 1, "bbox": [0, 30, 300, 45]},
+        {"text": "Nome: Sandra Regina", "page": 1, "bbox": [0, 60, 300, 75]},
+        {"text": "Declaro que SANDRA REGINA HORTÊNCIO está apta", "page": 1, "bbox": [0, 200, 300, 215]},
+        {"text": "Funcionário: Sandra Regina Hortencio", "page": 1, "bbox": [0, 380, 300, 395]},
+    ],
+    "extraction_quality": "ok",
+}
+
+
+def _sandra(cfg: PipelineConfig) -> tuple[list[str], dict]:
+    blocks = build_blocks(_EXTRACTED)
+    candidates = generate_candidates(blocks, cfg=cfg)
+    ranked = score_and_rank(blocks, candidates, cfg=cfg)
+    sandra = [c["text"] for c in candidates["funcionarios"] if c["text"].casefold().startswith("sandra")]
+    return sandra, ranked
+
+
+def test_variants_collapse_into_one_candidate_with_merged_evidence() -> None:
+    people, ranked = _sandra(PipelineConfig())
+    assert people == ["Sandra Regina Hortencio"]
+    top = ranked["funcionario"][0]
+    # "Nome: Sandra Regina" is a truncation by the same label source, so it joins too.
+    assert "keyword_same_block" in top["reasons"] and "frequency" in top["reasons"]
+    assert _fallback_decision(ranked).funcionario == "Sandra Regina Hortencio"
+
+
+def test_flag_keeps_separate_candidates() -> None:
+    people, _ = _sandra(PipelineConfig(consolidate_candidates=False))
+    assert len(people) >= 3
+
+
+def test_contained_name_of_another_person_stays_separate() -> None:
+    # The employee's labelled "Maria Silva" is not a truncation of the physician's name.
+    extracted = {
+        "blocks": [
+            {"text": "Funcionário: Maria Silva", "page": 1, "bbox": [0, 30, 300, 45]},
+            {"text": "Médico responsável: Maria Silva Santos CRM 12345", "page": 1, "bbox": [0, 400, 300, 415]},
+        ],
+        "extraction_quality": "ok",
+    }
+    cfg = PipelineConfig()
+    blocks = build_blocks(extracted)
+    candidates = generate_candidates(blocks, cfg=cfg)
+    people = {c.text: c for c in candidates["_internal"]["funcionarios"]}
+    assert set(people) == {"Maria Silva", "Maria Silva Santos"}
+    assert people["Maria Silva Santos"].aliases == () and people["Maria Silva Santos"].variants == ()
+    ranked = score_and_rank(blocks, candidates, cfg=cfg)
+    assert ranked["funcionario"][0]["text"] == "Maria Silva"
+    assert "keyword_same_block" not in ranked["funcionario"][1]["reasons"]
+    assert _fallback_decision(ranked).funcionario == "Maria Silva"
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from pipeline.batch import run_batch
+from pipeline.dedup import DuplicateIndex, text_print
+from pipeline.journal import ResultJournal, journal_key
+from pipeline.utils import file_sha256
+
+
+_FORM = (
+    "ATESTADO DE SAÚDE OCUPACIONAL Empresa: CEI Erinice Siqueira Nome: Sandra Regina Hortencio "
+    "CPF 123.456.789-00 Exame periódico realizado conforme NR-7, apto para a função de professora, "
+    "riscos ocupacionais ausentes, médico responsável pelo PCMSO, data do exame e assinatura."
+)
+_RESULT = {"funcionario": "Sandra Regina Hortencio", "empresa": "CEI Erinice Siqueira", "debug": {}}
+
+
+def test_identical_text_and_near_duplicate_are_reused() -> None:
+    idx = DuplicateIndex(max_distance=3)
+    idx.remember("a.pdf", "hash-a", text_print(_FORM), _RESULT)
+
+    same_text = idx.match_text(text_print(_FORM.replace(" ", "  ")))
+    assert same_text is not None and same_text["debug"]["duplicate"] == {"kind": "text", "of": "a.pdf"}
+
+    near = idx.match_text(text_print(_FORM + " Página 1"))
+    assert near is not None and near["debug"]["duplicate"]["kind"] == "near"
+    assert near["funcionario"] == "Sandra Regina Hortencio"
+
+
+def test_same_template_for_another_person_is_not_reused() -> None:
+    idx = DuplicateIndex(max_distance=64)
+    idx.remember("a.pdf", "hash-a", text_print(_FORM), _RESULT)
+    other = _FORM.replace("Sandra Regina Hortencio", "Maria José Santos")
+    assert idx.match_text(text_print(other)) is None
+
+
+def test_batch_reuses_byte_identical_files(tmp_path: Path) -> None:
+    a, b = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    a.write_bytes(b"%PDF-1.4 same")
+    b.write_bytes(b"%PDF-1.4 same")
+    calls: list[str] = []
+
+    def process(p: Path) -> dict:
+        calls.append(p.name)
+        return dict(_RESULT)
+
+    with ResultJournal(tmp_path / "j.jsonl") as j:
+        summary = run_batch([a, b], j, process, config_hash="c", dedup=DuplicateIndex())
+        reused = j.get(journal_key(str(b), file_sha256(b), "c"))
+
+    assert calls == ["a.pdf"]
+    assert summary.duplicates == 1
+    assert reused is not None and reused["result"]["debug"]["duplicate"] == {"kind": "exact", "of": str(a)}
+
+
+def test_fail_safe_results_are_not_reused(tmp_path: Path) -> None:
+    a, b = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    a.write_bytes(b"%PDF-1.4 same")
+    b.write_bytes(b"%PDF-1.4 same")
+    results = iter(
+        [
+            {"funcionario": "INDEFINIDO", "empresa": "INDEFINIDO", "debug": {"error": "budget_exceeded:extract"}},
+            dict(_RESULT),
+        ]
+    )
+
+    with ResultJournal(tmp_path / "j.jsonl") as j:
+        summary = run_batch([a, b], j, lambda p: next(results), config_hash="c", dedup=DuplicateIndex())
+        second = j.get(journal_key(str(b), file_sha256(b), "c"))
+
+    assert summary.duplicates == 0
+    assert second is not None and second["result"]["funcionario"] == "Sandra Regina Hortencio"
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.candidates import generate_candidates
+from pipeline.extract_json import _extract_blocks_recursive, _extract_fields_recursive
+
+
+def _cell(text: str, row: int, col: int, header: bool = False) -> dict:
+    return {
+        "text": text,
+        "start_row_offset_idx": row,
+        "end_row_offset_idx": row + 1,
+        "start_col_offset_idx": col,
+        "end_col_offset_idx": col + 1,
+        "column_header": header,
+    }
+
+
+# Shaped like a DoclingDocument export: a form table and a key/value item.
+_DOC = {
+    "texts": [{"text": "ATESTADO DE SAÚDE OCUPACIONAL", "prov": [{"page_no": 1}]}],
+    "tables": [
+        {
+            "prov": [{"page_no": 1}],
+            "data": {
+                "table_cells": [
+                    _cell("Empresa:", 0, 0),
+                    _cell("CEI Erinice Siqueira", 0, 1),
+                    _cell("CNPJ", 1, 0),
+                    _cell("12.345.678/0001-90", 1, 1),
+                ]
+            },
+        }
+    ],
+    "key_value_items": [
+        {
+            "prov": [{"page_no": 1}],
+            "graph": {
+                "cells": [
+                    {"cell_id": 0, "text": "Funcionário", "label": "key"},
+                    {"cell_id": 1, "text": "Sandra Regina Hortencio", "label": "value"},
+                ],
+                "links": [{"label": "to_value", "source_cell_id": 0, "target_cell_id": 1}],
+            },
+        }
+    ],
+}
+
+
+def test_table_and_key_value_structure_becomes_fields() -> None:
+    fields = _extract_fields_recursive(_DOC)
+    assert {(f["label"], f["value"], f["via"]) for f in fields} == {
+        ("Empresa:", "CEI Erinice Siqueira", "table_row"),
+        ("CNPJ", "12.345.678/0001-90", "table_row"),
+        ("Funcionário", "Sandra Regina Hortencio", "key_value"),
+    }
+
+
+def test_indexed_fields_resolve_both_kinds_without_scanning() -> None:
+    extracted = {"blocks": _extract_blocks_recursive(_DOC), "extraction_quality": "ok"}
+    blocks = build_blocks(extracted)
+    cands = generate_candidates(blocks, PipelineConfig(), fields=_extract_fields_recursive(_DOC))
+    assert [c["text"] for c in cands["funcionarios"]] == ["Sandra Regina Hortencio"]
+    assert [c["text"] for c in cands["empresas"]] == ["CEI Erinice Siqueira"]
+    assert cands["_meta"]["field_index"] == ["funcionario", "empresa"]
+    assert cands["_meta"]["spacy"] == "skipped"
+    assert "ner_blocks_processed" not in cands["_meta"]
+
+    scanned = generate_candidates(blocks, PipelineConfig(use_field_index=False), fields=_extract_fields_recursive(_DOC))
+    assert scanned["_meta"]["field_index"] == []
+    assert "ner_blocks_processed" in scanned["_meta"]  # the regular path ran
+    assert [c["text"] for c in scanned["empresas"]] == ["CEI Erinice Siqueira"]
+
+
+def test_generic_name_label_does_not_resolve_the_employee() -> None:
+    blocks = build_blocks(
+        {
+            "blocks": [
+                {"text": "Nome: ACME SERVICOS LTDA", "page": 1},
+                {"text": "ACME SERVICOS LTDA", "page": 1},
+                {"text": "Sandra Regina Hortencio", "page": 1},
+            ],
+            "extraction_quality": "ok",
+        }
+    )
+    fields = [
+        {"label": "Nome:", "value": "ACME SERVICOS LTDA", "page": 1},
+        {"label": "Nome", "value": "Sandra Regina Hortencio", "page": 1},
+    ]
+    cands = generate_candidates(blocks, PipelineConfig(), fields=fields)
+    assert "funcionario" not in cands["_meta"]["field_index"]
+    assert cands["_meta"]["spacy"] != "skipped"  # the regular path ran
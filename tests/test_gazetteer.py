@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+from pipeline.blocks import build_blocks
+from pipeline.gazetteer import Gazetteer, cnpjs_near, find_cnpjs
+
+
+def test_find_cnpjs_normalizes_and_validates() -> None:
+    text = "CNPJ: 11.222.333/0001-81 / 11222333000180 / 11444777000161"
+    assert find_cnpjs(text) == ["11222333000181", "11444777000161"]
+
+
+def test_resolve_by_cnpj_and_name() -> None:
+    gz = Gazetteer()
+    gz.add("CEI Erinice Siqueira", ["11.222.333/0001-81"])
+    blocks = build_blocks(
+        {
+            "blocks": [
+                {"text": "EXAME FÍSICO - PERIÓDICO", "page": 1, "bbox": [0, 5, 100, 20]},
+                {"text": "CNPJ 11.222.333/0001-81", "page": 1, "bbox": [0, 30, 100, 45]},
+            ]
+        }
+    )
+    hit = gz.resolve(blocks)
+    assert hit is not None and hit.name == "CEI Erinice Siqueira" and hit.via == "cnpj"
+
+    hit = gz.resolve(blocks[:1], [{"text": "CEI ERINICE SIQUEIRA", "block_id": "x", "page": 1}])
+    assert hit is not None and hit.via == "name"
+
+
+def test_resolve_is_none_when_cnpjs_disagree() -> None:
+    gz = Gazetteer()
+    gz.add("ACME LTDA", ["11222333000181"])
+    gz.add("Outra Empresa ME", ["11444777000161"])
+    blocks = build_blocks({"blocks": [{"text": "11222333000181 11444777000161", "page": 1, "bbox": None}]})
+    assert gz.resolve(blocks) is None
+
+
+def test_cnpjs_near_uses_same_page_window() -> None:
+    blocks = build_blocks(
+        {
+            "blocks": [
+                {"text": "Empresa: ACME LTDA", "page": 1, "bbox": None},
+                {"text": "CNPJ 11.222.333/0001-81", "page": 1, "bbox": None},
+                {"text": "CNPJ 11.444.777/0001-61", "page": 2, "bbox": None},
+            ]
+        }
+    )
+    assert cnpjs_near(blocks, blocks[0].id, window=2) == ["11222333000181"]
+
+
+def test_export_import_roundtrip(tmp_path: Path) -> None:
+    gz = Gazetteer()
+    gz.add("ACME LTDA", ["11222333000181"])
+    path = tmp_path / "gazetteer.json"
+    gz.save(path)
+
+    other = Gazetteer()
+    other.merge(Gazetteer.load(path))
+    assert other.lookup_cnpj("11222333000181") == "ACME LTDA"
+    assert other.lookup_name("acme ltda") == "ACME LTDA"
+
+
+def test_concurrent_adds_are_not_lost() -> None:
+    gz = Gazetteer()
+
+    def add_many() -> None:
+        for _ in range(500):
+            gz.add("ACME LTDA")
+
+    threads = [threading.Thread(target=add_many) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert gz.entries()[0]["hits"] == 2000
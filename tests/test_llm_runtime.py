@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+from config import PipelineConfig
+from pipeline import decision_llm
+from pipeline.llm_tune import apply_profile, fastest_profile, machine_id
+
+
+class _FakeVocab:
+    def __init__(self, n_tokens: int) -> None:
+        self.n_tokens = n_tokens
+
+    def tokenize(self, data: bytes, add_bos: bool = True, special: bool = False) -> list[int]:
+        return [0] * self.n_tokens
+
+
+def test_n_ctx_is_sized_from_prompt(monkeypatch) -> None:
+    cfg = PipelineConfig()
+    monkeypatch.setattr(decision_llm, "load_llama_vocab", lambda path: _FakeVocab(300))
+    # 300 prompt + 48 template + 256 max_tokens = 604 -> 768
+    assert decision_llm.size_n_ctx(Path("m.gguf"), "prompt", cfg) == 768
+
+    monkeypatch.setattr(decision_llm, "load_llama_vocab", lambda path: _FakeVocab(5000))
+    assert decision_llm.size_n_ctx(Path("m.gguf"), "prompt", cfg) == cfg.llama_n_ctx
+
+    assert decision_llm.size_n_ctx(Path("m.gguf"), "prompt", replace(cfg, llama_auto_n_ctx=False)) == 2048
+
+
+def test_n_ctx_falls_back_to_config_without_tokenizer(monkeypatch) -> None:
+    def boom(path: str):
+        raise ImportError("llama_cpp")
+
+    monkeypatch.setattr(decision_llm, "load_llama_vocab", boom)
+    assert decision_llm.size_n_ctx(Path("m.gguf"), "prompt", PipelineConfig()) == 2048
+
+
+def test_profile_picks_fastest_and_applies_on_same_machine() -> None:
+    trials = [
+        {"llama_n_threads": 4, "llama_n_batch": 256, "llama_use_mmap": True, "llama_use_mlock": False,
+         "load_seconds": 1.0, "infer_seconds": 0.9},
+        {"llama_n_threads": 8, "llama_n_batch": 512, "llama_use_mmap": True, "llama_use_mlock": False,
+         "load_seconds": 1.0, "infer_seconds": 0.5},
+        {"llama_n_threads": 8, "llama_n_batch": 512, "llama_use_mmap": True, "llama_use_mlock": True,
+         "error": "OSError"},
+    ]
+    profile = fastest_profile(Path("m.gguf"), trials)
+    assert profile is not None and profile["settings"]["llama_n_threads"] == 8
+
+    cfg = apply_profile(PipelineConfig(), profile)
+    assert (cfg.llama_n_threads, cfg.llama_n_batch) == (8, 512)
+
+    other = profile | {"machine": machine_id() + "-elsewhere"}
+    assert apply_profile(PipelineConfig(), other) == PipelineConfig()
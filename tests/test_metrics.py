@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+
+import main
+from config import PipelineConfig
+from pipeline.metrics import Metrics, MetricsWriter
+
+
+
+def test_run_records_stage_latency_and_outcomes(tmp_path: Path, fake_extract) -> None:
+    fake_extract(None, {"blocks": [], "extraction_quality": "weak"})
+    metrics = Metrics()
+    ctx = main.RunContext(metrics=metrics)
+    for _ in range(2):
+        main.run(tmp_path / "doc.pdf", tmp_path / "out.json", None, PipelineConfig(), debug=False, ctx=ctx)
+
+    snap = metrics.to_json()
+    assert snap["documents_total"] == {"ok": 1, "weak": 1, "error": 0}
+    assert snap["stage_seconds"]["extract"]["count"] == 2
+    assert snap["stage_seconds"]["total"]["count"] == 1
+    assert snap["fallback_decisions_total"] == 1 and snap["llm_used_total"] == 0
+    assert snap["candidates"]["empresa"]["count"] == 1
+
+
+def test_writer_formats(tmp_path: Path) -> None:
+    metrics = Metrics()
+    metrics.stage_seconds["decision"].observe(0.2)
+    metrics.indefinido["empresa"].inc()
+
+    MetricsWriter(metrics, tmp_path / "m.json").write()
+    assert json.loads((tmp_path / "m.json").read_text())["indefinido_total"]["empresa"] == 1
+
+    MetricsWriter(metrics, tmp_path / "m.prom").write()
+    text = (tmp_path / "m.prom").read_text()
+    assert 'pipeline_stage_seconds_bucket{stage="decision",le="0.25"} 1' in text
+    assert 'pipeline_stage_seconds_bucket{stage="decision",le="0.1"} 0' in text
+    assert 'pipeline_indefinido_total{field="empresa"} 1' in text
+    assert text.count("# TYPE pipeline_indefinido_total counter") == 1
+
+
+def test_updates_from_many_threads_are_not_lost(tmp_path: Path) -> None:
+    metrics = Metrics()
+    writer = MetricsWriter(metrics, tmp_path / "m.prom", interval_seconds=0.0)
+
+    def work() -> None:
+        for _ in range(2000):
+            metrics.llm_used.inc()
+            metrics.stage_seconds["total"].observe(0.01)
+        writer.maybe_write()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = metrics.to_json()
+    assert snap["llm_used_total"] == 16000
+    assert snap["stage_seconds"]["total"]["count"] == sum(snap["stage_seconds"]["total"]["counts"]) == 16000
+
+
+def test_failed_write_is_reported_not_raised(tmp_path: Path, capsys) -> None:
+    blocker = tmp_path / "file"
+    blocker.write_text("", encoding="utf-8")
+    writer = MetricsWriter(Metrics(), blocker / "m.prom")
+    writer.write()
+    writer.maybe_write()  # within the interval: no second attempt
+    assert capsys.readouterr().err.count("metrics: cannot write") == 1
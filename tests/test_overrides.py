@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+import main
+import pipeline.decision_llm as decision_llm
+from config import (
+    MODEL_FIELDS,
+    REQUEST_FIELDS,
+    PipelineConfig,
+    config_field_names,
+    layer_hash,
+    load_override_rules,
+    overrides_for,
+    widest_request,
+    with_overrides,
+)
+from pipeline.checkpoint import ArtifactStore
+from pipeline.models import _llama_settings
+
+
+
+def _changed(value):
+    if isinstance(value, bool):
+        return not value
+    return value + 1
+
+
+def test_every_field_belongs_to_exactly_one_layer() -> None:
+    assert not MODEL_FIELDS & REQUEST_FIELDS
+    assert set(config_field_names()) == MODEL_FIELDS | REQUEST_FIELDS
+
+
+def test_request_overrides_leave_the_model_layer_alone() -> None:
+    cfg = PipelineConfig()
+    other = with_overrides(cfg, {name: _changed(getattr(cfg, name)) for name in REQUEST_FIELDS})
+    assert _llama_settings(other) == _llama_settings(cfg)
+    assert other.spacy_model == cfg.spacy_model and other.llama_n_ctx == cfg.llama_n_ctx
+    assert layer_hash(other, "model") == layer_hash(cfg, "model")
+    assert layer_hash(other, "request") != layer_hash(cfg, "request")
+    assert with_overrides(cfg, {}) is cfg
+
+
+def test_model_fields_are_rejected() -> None:
+    with pytest.raises(ValueError, match="llama_n_ctx, spacy_model"):
+        with_overrides(PipelineConfig(), {"spacy_model": "x", "llama_n_ctx": 4096, "top_k_for_llm": 3})
+    with pytest.raises(ValueError, match="no_such_field"):
+        with_overrides(PipelineConfig(), {"no_such_field": 1})
+
+
+def test_values_of_the_wrong_type_are_rejected_at_load(tmp_path: Path) -> None:
+    path = tmp_path / "overrides.json"
+    path.write_text(json.dumps({"*": {"top_k_for_llm": "3", "ner_prefilter": 1}}), encoding="utf-8")
+    with pytest.raises(ValueError, match="ner_prefilter must be bool.*top_k_for_llm must be int"):
+        load_override_rules(path, PipelineConfig())
+    assert with_overrides(PipelineConfig(), {"weight_shape": 1}).weight_shape == 1.0
+
+
+def test_preload_config_covers_the_largest_override(tmp_path: Path, monkeypatch) -> None:
+    class Vocab:
+        def tokenize(self, text: bytes, add_bos: bool, special: bool) -> list[int]:
+            return [0] * (len(text) // 4)
+
+    monkeypatch.setattr(decision_llm, "load_llama_vocab", lambda path: Vocab())
+    cfg = PipelineConfig(llama_n_ctx=8192)
+    rules = [("a/*", {"top_k_for_llm": 30}), ("b/*", {"llama_max_tokens": 2048, "top_k_for_llm": 2})]
+    widest = widest_request(cfg, rules)
+    assert (widest.top_k_for_llm, widest.llama_max_tokens) == (30, 2048)
+    assert widest_request(cfg, []) == cfg
+    model = tmp_path / "model.gguf"
+    resident = decision_llm.typical_n_ctx(model, widest)
+    assert resident > decision_llm.typical_n_ctx(model, cfg)
+    for _, values in rules:
+        assert decision_llm.typical_n_ctx(model, with_overrides(cfg, values)) <= resident
+
+
+def test_rules_match_the_first_glob(tmp_path: Path) -> None:
+    path = tmp_path / "overrides.json"
+    path.write_text(json.dumps({"*/tenant-a/*": {"weight_shape": 2.0}, "*": {"top_k_for_llm": 3}}), encoding="utf-8")
+    rules = load_override_rules(path, PipelineConfig())
+    assert overrides_for(rules, "/in/tenant-a/x.pdf") == {"weight_shape": 2.0}
+    assert overrides_for(rules, "/in/tenant-b/x.pdf") == {"top_k_for_llm": 3}
+    assert overrides_for([], "x.pdf") == {}
+    path.write_text(json.dumps({"*": {"llama_chat_format": "chatml"}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_override_rules(path, PipelineConfig())
+
+
+def test_overridden_run_reuses_upstream_artifacts_and_records_the_layer(tmp_path: Path, fake_extract) -> None:
+    calls = fake_extract()
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+    cfg = PipelineConfig()
+    store = ArtifactStore(tmp_path / "cache")
+
+    plain = main.run(pdf, tmp_path / "o.json", None, cfg, debug=False, ctx=main.RunContext(store=store))
+    ctx = main.RunContext(store=store, override_rules=[("*/doc.pdf", {"weight_shape": 3.0})])
+    varied = main.run(pdf, tmp_path / "o.json", None, cfg, debug=False, ctx=ctx)
+    assert len(calls) == 1
+    assert "request_config" not in plain["debug"]
+    assert varied["debug"]["request_config"] == layer_hash(replace(cfg, weight_shape=3.0), "request")
+
+
+def test_tenants_sharing_a_pdf_are_not_deduplicated_across_rules(tmp_path: Path, monkeypatch, fake_extract) -> None:
+    calls = fake_extract()
+    monkeypatch.setattr(main.signal, "signal", lambda *a: None)
+    inbox = tmp_path / "in"
+    for rel in ("tenant-a/doc.pdf", "tenant-b/doc.pdf", "tenant-b/copy.pdf"):
+        (inbox / rel).parent.mkdir(parents=True, exist_ok=True)
+        (inbox / rel).write_bytes(b"%PDF-1.4 shared")
+    rules = tmp_path / "overrides.json"
+    rules.write_text(json.dumps({"*/tenant-a/*": {"weight_shape": 3.0}}), encoding="utf-8")
+    journal = tmp_path / "journal.jsonl"
+
+    assert main.main(["--batch", str(inbox), "--out", str(journal), "--overrides", str(rules)]) == 0
+    records = {
+        Path(rec["input"]).relative_to(inbox).as_posix(): rec["result"]
+        for rec in map(json.loads, journal.read_text(encoding="utf-8").splitlines())
+    }
+    # The two tenant-b copies still share one decision; tenant-a gets its own.
+    assert len(calls) == 2
+    assert "request_config" in records["tenant-a/doc.pdf"]["debug"]
+    reused = {rel: r["debug"]["duplicate"]["of"] for rel, r in records.items() if "duplicate" in r["debug"]}
+    assert len(reused) == 1
+    [(rel, of)] = reused.items()
+    assert rel.startswith("tenant-b/") and "/tenant-b/" in of
+    assert "request_config" not in records[rel]["debug"]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import main
+import pipeline.preload as preload
+from config import PipelineConfig
+
+
+
+def test_spacy_loads_during_conversion_and_is_joined_before_candidates(
+    tmp_path: Path, monkeypatch, fake_extract
+) -> None:
+    started, loaded = threading.Event(), threading.Event()
+
+    def slow_load(name: str) -> None:
+        started.set()
+        time.sleep(0.2)
+        loaded.set()
+
+    def converting() -> None:
+        assert started.wait(2.0)  # the model load overlaps the conversion
+
+    real_generate = main.generate_candidates
+
+    def generate(blocks, cfg, fields=None):
+        assert loaded.is_set()
+        return real_generate(blocks, cfg=cfg, fields=fields)
+
+    monkeypatch.setattr(preload, "load_spacy", slow_load)
+    fake_extract(before=converting)
+    monkeypatch.setattr(main, "generate_candidates", generate)
+    cfg = PipelineConfig()
+    ctx = main.RunContext(preloader=preload.ModelPreloader(cfg, None))
+    result = main.run(tmp_path / "a.pdf", tmp_path / "out.json", None, cfg, debug=False, ctx=ctx)
+    assert result["funcionario"] == "Sandra Regina Hortencio"
+
+
+def test_weak_extraction_does_not_wait_for_models(tmp_path: Path, monkeypatch, fake_extract) -> None:
+    release = threading.Event()
+    llm_loads: list[Path] = []
+    monkeypatch.setattr(preload, "load_spacy", lambda name: release.wait(5.0))
+    monkeypatch.setattr(preload, "_load_llama_for_typical_prompt", lambda path, cfg: llm_loads.append(path))
+    fake_extract({"blocks": [], "extraction_quality": "weak"})
+    model = tmp_path / "model.gguf"
+    model.write_bytes(b"")
+    cfg = PipelineConfig()
+    t0 = time.perf_counter()
+    preloader = preload.ModelPreloader(cfg, model)
+    ctx = main.RunContext(preloader=preloader)
+    result = main.run(tmp_path / "a.pdf", tmp_path / "out.json", None, cfg, debug=False, ctx=ctx)
+    release.set()
+    assert result["debug"] == {"extraction_quality": "weak"}
+    assert time.perf_counter() - t0 < 1.0
+    assert not llm_loads  # a weak document never maps the GGUF
+
+
+def test_llm_preload_starts_once_per_process(monkeypatch, tmp_path: Path) -> None:
+    llm_loads: list[Path] = []
+    monkeypatch.setattr(preload, "load_spacy", lambda name: None)
+    monkeypatch.setattr(preload, "_load_llama_for_typical_prompt", lambda path, cfg: llm_loads.append(path))
+    small, large = tmp_path / "small.gguf", tmp_path / "large.gguf"
+    small.write_bytes(b"")
+    large.write_bytes(b"")
+    preloader = preload.ModelPreloader(PipelineConfig(), large, (small,))
+    for _ in range(3):
+        preloader.start_llm()
+    deadline = time.monotonic() + 2.0
+    while len(llm_loads) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert sorted(llm_loads) == [large, small]
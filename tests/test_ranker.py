@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from config import PipelineConfig
+from pipeline.confidence import compute_confidence
+from pipeline.ranker import Ranker, decide_with_ranker, labelled_examples, load_ranker, main, train
+
+
+def _item(text: str, score: float, reasons: list[str]) -> dict:
+    return {"text": text, "score": score, "reasons": reasons}
+
+
+def _labelled(i: int) -> dict:
+    # The answer is the candidate next to an employee/employer label, wherever it ranks.
+    labelled_first = i % 3 != 0
+    right = _item(f"Pessoa Certa {i}", 2.4, ["keyword_same_block", "shape"])
+    wrong = _item(f"Pessoa Errada {i}", 2.4 if labelled_first else 2.9, ["frequency", "shape"])
+    company = _item(f"Empresa {i} LTDA", 4.1, ["label_value", "top_of_doc", "shape"])
+    other = _item(f"Outra {i}", 0.4, ["shape"])
+    return {
+        "funcionario": right["text"],
+        "empresa": company["text"],
+        "debug": {
+            "top_ranked": {
+                "funcionario": [right, wrong] if labelled_first else [wrong, right],
+                "empresa": [company, other],
+            }
+        },
+    }
+
+
+def test_train_save_load_and_decide(tmp_path: Path) -> None:
+    journal = tmp_path / "reviewed.jsonl"
+    journal.write_text("\n".join(json.dumps({"result": _labelled(i)}) for i in range(60)), encoding="utf-8")
+    model = tmp_path / "ranker.json"
+    assert main([str(journal), "--out", str(model)]) == 0
+    ranker = load_ranker(str(model))
+
+    top = _labelled(999)["debug"]["top_ranked"]  # the labelled candidate ranks second here
+    ranked = {"funcionario": top["funcionario"], "empresa": top["empresa"]}
+    decision = decide_with_ranker([], ranked, None, PipelineConfig(ranker_accept_probability=0.8), ranker)
+    assert decision["funcionario"] == "Pessoa Certa 999"
+    assert decision["empresa"] == "Empresa 999 LTDA"
+    assert decision["ranker_used"] and not decision["llm_used"]
+
+    conf = compute_confidence(ranked, decision, [], PipelineConfig())
+    assert conf["empresa"] == decision["probability"]["empresa"] > 0.8
+
+
+def test_uncertain_field_goes_to_llm_or_fallback() -> None:
+    rows = labelled_examples(_labelled(i) for i in range(30))
+    ranker = Ranker.from_dict(train(rows, epochs=200).to_dict())
+    ranked = {
+        "funcionario": [_item("Ana Souza", 1.0, ["shape"]), _item("Bia Lima", 1.0, ["shape"])],
+        "empresa": [_item("ACME LTDA", 4.1, ["label_value", "top_of_doc", "shape"])],
+    }
+    decision = decide_with_ranker([], ranked, None, PipelineConfig(ranker_accept_probability=0.8), ranker)
+    assert "funcionario" not in decision["probability"]
+    assert decision["funcionario"] == "INDEFINIDO"  # the fallback's margin rule, no model available
+    assert decision["empresa"] == "ACME LTDA"
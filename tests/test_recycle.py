@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import io
+import time
+from pathlib import Path
+
+import main
+from config import PipelineConfig
+from pipeline.budget import ConversionWorker
+from pipeline.memory import RECYCLE_EXIT_CODE, AllocationDiff, ProcessRecycler, rss_bytes
+
+
+def _convert(pdf_path: str, cfg: PipelineConfig) -> dict:
+    # Module-level so the spawned worker can import it.
+    return {"blocks": [{"text": pdf_path, "page": 1, "bbox": None}], "extraction_quality": "ok"}
+
+
+def test_worker_is_replaced_after_max_documents_without_a_cold_start() -> None:
+    with ConversionWorker(PipelineConfig(), timeout_seconds=0, target=_convert, max_documents=2, warm=None) as worker:
+        assert worker.convert("a.pdf")["blocks"][0]["text"] == "a.pdf"
+        first = worker.pid
+        worker.convert("b.pdf")  # limit reached: a standby starts warming
+        assert worker.documents == 2 and worker.rss_bytes > 0
+
+        deadline = time.monotonic() + 20.0
+        converted = 2
+        while worker.recycled == 0 and time.monotonic() < deadline:
+            # The old child keeps converting until the standby is ready.
+            assert worker.convert(f"{converted}.pdf")["extraction_quality"] == "ok"
+            converted += 1
+            time.sleep(0.05)
+        assert worker.recycled == 1
+        assert worker.pid != first and worker.documents == 1
+
+
+def test_rss_and_allocation_growth_report() -> None:
+    assert rss_bytes() > 0
+    out = io.StringIO()
+    diff = AllocationDiff(every=2, out=out)
+    keep = [bytearray(64) for _ in range(2000)]
+    diff.tick()
+    assert out.getvalue() == ""
+    diff.tick()
+    assert "tracemalloc: growth after 2 documents" in out.getvalue()
+    assert "test_recycle.py" in out.getvalue()
+    diff.close()
+    del keep
+
+
+def test_main_process_stops_taking_work_past_its_limits(tmp_path: Path, monkeypatch) -> None:
+    assert not ProcessRecycler().stop.is_set()
+    big = ProcessRecycler(max_rss_mb=1)
+    big.tick()
+    assert big.stop.is_set()
+
+    inbox = tmp_path / "in"
+    inbox.mkdir()
+    for i in range(3):
+        (inbox / f"doc{i}.pdf").write_bytes(f"%PDF-1.4 {i}".encode())
+    calls: list[str] = []
+    monkeypatch.setattr(main, "run", lambda **kw: calls.append(kw["pdf_path"].name) or {"debug": {}})
+    monkeypatch.setattr(main.signal, "signal", lambda *a: None)
+    journal = tmp_path / "journal.jsonl"
+    argv = ["--batch", str(inbox), "--out", str(journal), "--process-max-docs", "2"]
+
+    assert main.main(argv) == RECYCLE_EXIT_CODE
+    assert len(calls) == 2
+    assert main.main(argv) == 0  # the restarted process resumes from the journal
+    assert sorted(calls) == ["doc0.pdf", "doc1.pdf", "doc2.pdf"]
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 3
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from pipeline.rules import could_contain_person, looks_like_company, looks_like_person, scan_block
+
+
+def test_scan_block_emits_typed_matches_with_offsets() -> None:
+    text = "Nome: Sandra Regina Hortencio"
+    matches = scan_block(text)
+    kw = [m for m in matches if m.source == "keyword_line"]
+    assert kw and kw[0].kind == "funcionario"
+    assert kw[0].text == "Sandra Regina Hortencio"
+    assert text[kw[0].start : kw[0].end] == "Sandra Regina Hortencio"
+    assert {m.source for m in matches} >= {"keyword_line", "regex"}
+
+
+def test_scan_block_marks_bare_company_label() -> None:
+    assert [(m.kind, m.source) for m in scan_block("Razão Social")] == [("empresa_label", "label")]
+
+
+def test_company_hint_rejection_skips_caps_rule() -> None:
+    # Rejected by the stop phrases: neither company_hint nor caps may fire.
+    assert [m for m in scan_block("LAUDO SERVIÇOS") if m.kind == "empresa"] == []
+
+
+def test_validators() -> None:
+    assert looks_like_person("JOÃO DA SILVA")
+    assert not looks_like_person("CPF 123")
+    assert looks_like_company("CEI Erinice")
+    assert not looks_like_company("CNPJ 11222333000181")
+
+
+def test_could_contain_person_rejects_non_name_blocks() -> None:
+    assert could_contain_person("Nome: Sandra Regina")
+    assert could_contain_person("JOÃO DA SILVA")
+    assert not could_contain_person("123.456.789-00 12/03/2024")
+    assert not could_contain_person("CPF 123.456.789-00")
+    assert not could_contain_person("resultado dentro dos limites da normalidade")
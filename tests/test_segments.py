@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import main
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.segments import split_segments
+
+
+def _form(page: int, nome: str, empresa: str) -> list[dict]:
+    return [
+        {"text": "CLÍNICA VIDA OCUPACIONAL", "page": page, "bbox": [0, 5, 300, 20]},
+        {"text": f"ATESTADO DE SAÚDE OCUPACIONAL Nº {page}0{page}", "page": page, "bbox": [0, 25, 300, 40]},
+        {"text": f"Empresa: {empresa}", "page": page, "bbox": [0, 100, 300, 115]},
+        {"text": f"Nome: {nome}", "page": page, "bbox": [0, 130, 300, 145]},
+        {"text": "Assinatura do médico", "page": page, "bbox": [0, 380, 300, 395]},
+    ]
+
+
+_BUNDLE = {
+    "blocks": _form(1, "Sandra Regina Hortencio", "CEI Erinice Siqueira")
+    + [
+        {"text": "Resultados de exames complementares", "page": 2, "bbox": [0, 5, 300, 20]},
+        {"text": "Audiometria dentro da normalidade", "page": 2, "bbox": [0, 40, 300, 55]},
+        {"text": "Observações gerais", "page": 2, "bbox": [0, 380, 300, 395]},
+    ]
+    + _form(3, "Paulo Mendes", "Transportes Pereira ME"),
+    "extraction_quality": "ok",
+}
+
+
+def test_split_on_repeated_header_with_employee_label() -> None:
+    segments = split_segments(build_blocks(_BUNDLE), PipelineConfig())
+    assert [(s.start_page, s.end_page) for s in segments] == [(1, 2), (3, 3)]
+    assert [b.index for b in segments[1].blocks] == list(range(len(segments[1].blocks)))
+
+
+def test_run_returns_one_result_per_form(tmp_path: Path, fake_extract) -> None:
+    fake_extract(_BUNDLE)
+    cfg = PipelineConfig(segment_bundles=True)
+    result = main.run(tmp_path / "bundle.pdf", tmp_path / "out.json", None, cfg, debug=False)
+
+    assert result["debug"]["segments"] == 2
+    assert [(f["pages"], f["funcionario"], f["empresa"]) for f in result["forms"]] == [
+        ([1, 2], "Sandra Regina Hortencio", "CEI Erinice Siqueira"),
+        ([3, 3], "Paulo Mendes", "Transportes Pereira ME"),
+    ]
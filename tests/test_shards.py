@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.extract_json import merge_shards, page_ranges
+
+
+def test_page_ranges_cover_every_page_once() -> None:
+    assert page_ranges(10, 4) == [(0, 2), (2, 5), (5, 8), (8, 10)]
+    assert page_ranges(2, 4) == [(0, 1), (1, 2)]
+    for n, k in ((301, 4), (7, 3), (1, 1)):
+        ranges = page_ranges(n, k)
+        assert ranges[0][0] == 0 and ranges[-1][1] == n
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_merged_shards_match_a_whole_document_conversion() -> None:
+    def block(text: str, page: int) -> dict:
+        return {"text": text, "page": page, "bbox": [0, 10, 100, 20]}
+
+    whole = [block("Empresa: ACME LTDA", 1), block("Nome: Ana Souza", 2), block("Empresa: ACME LTDA", 3), block("Nome: Bia Lima", 4)]
+    # Shards finish in any order and number their pages from 1.
+    shards = [
+        (2, [block("Empresa: ACME LTDA", 1), block("Nome: Bia Lima", 2)]),
+        (0, [block("Empresa: ACME LTDA", 1), block("Nome: Ana Souza", 2)]),
+    ]
+    merged = merge_shards(shards)
+    assert merged == whole
+    quality = {"extraction_quality": "ok"}
+    assert build_blocks({"blocks": merged} | quality) == build_blocks({"blocks": whole} | quality)
+
+
+def test_items_without_a_page_keep_it() -> None:
+    fields = [{"label": "Nome", "value": "Ana Souza", "page": None, "via": "key_value"}]
+    assert merge_shards([(2, fields)]) == fields
+
+
+def test_sharding_is_off_by_default() -> None:
+    assert PipelineConfig().convert_shard_min_pages == 0
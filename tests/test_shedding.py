@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import main
+from config import PipelineConfig
+from pipeline.batch import run_batch
+from pipeline.journal import ResultJournal
+from pipeline.shedding import LoadShedder, shed_decision
+
+
+
+def _item(text: str, score: float) -> dict:
+    return {"text": text, "score": score, "reasons": ["shape"]}
+
+
+def test_shedding_starts_at_threshold_and_resumes_below_the_resume_fraction() -> None:
+    shedder = LoadShedder(PipelineConfig(shed_queue_depth=10, shed_resume_fraction=0.5))
+    states = []
+    for depth in (3, 10, 7, 5, 4, 9):
+        shedder.set_queue_depth(depth)
+        states.append(shedder.overloaded())
+    assert states == [False, True, True, True, False, False]
+
+
+def test_p95_latency_trigger() -> None:
+    shedder = LoadShedder(PipelineConfig(shed_p95_seconds=2.0, shed_window=20))
+    for _ in range(19):
+        shedder.observe(0.5)
+    assert not shedder.overloaded()
+    shedder.observe(3.0)
+    assert shedder.p95() == 0.5 and not shedder.overloaded()
+    shedder.observe(3.0)
+    assert shedder.p95() == 3.0 and shedder.overloaded()
+
+
+def test_only_clear_margins_are_shed() -> None:
+    cfg = PipelineConfig(shed_min_margin=1.0)
+    clear = {"funcionario": [_item("Ana Souza", 3.0), _item("Bia Lima", 1.0)], "empresa": [_item("ACME LTDA", 2.0)]}
+    assert shed_decision(clear, cfg) == {
+        "funcionario": "Ana Souza",
+        "empresa": "ACME LTDA",
+        "llm_used": False,
+        "shed": ["funcionario", "empresa"],
+    }
+    close = clear | {"funcionario": [_item("Ana Souza", 3.0), _item("Bia Lima", 2.5)]}
+    assert shed_decision(close, cfg) is None
+
+
+def test_overloaded_run_skips_the_llm_and_marks_the_result(tmp_path: Path, monkeypatch, fake_extract) -> None:
+    model = tmp_path / "model.gguf"
+    model.write_bytes(b"")
+    called = []
+    fake_extract()
+    monkeypatch.setattr(main, "decide_with_llm", lambda **kw: called.append(1) or {"llm_used": True})
+    cfg = PipelineConfig(shed_queue_depth=1, shed_min_margin=0.5)
+    shedder = LoadShedder(cfg)
+    shedder.set_queue_depth(5)
+
+    ctx = main.RunContext(shedder=shedder)
+    result = main.run(tmp_path / "a.pdf", tmp_path / "o.json", model, cfg, debug=False, ctx=ctx)
+    assert not called
+    assert result["funcionario"] == "Sandra Regina Hortencio"
+    assert result["debug"]["shed"] == ["funcionario", "empresa"]
+
+
+def test_batch_rerun_reprocesses_shed_results(tmp_path: Path) -> None:
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    results = iter([{"debug": {"shed": ["funcionario", "empresa"]}}, {"debug": {}}, {"debug": {}}])
+    for expected in (1, 1, 0):
+        with ResultJournal(tmp_path / "out.jsonl") as j:
+            assert run_batch([pdf], j, lambda p: next(results), config_hash="cfg").processed == expected
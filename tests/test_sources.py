@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import io
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from pipeline.batch import iter_batch_inputs, run_batch
+from pipeline.journal import ResultJournal
+from pipeline.sources import PdfMember, prefetch
+
+
+def _write_archives(root: Path) -> None:
+    root.mkdir()
+    with zipfile.ZipFile(root / "a.zip", "w") as zf:
+        zf.writestr("x/doc1.pdf", b"%PDF-1.4 one")
+        zf.writestr("notes.txt", b"skip me")
+        zf.writestr("doc2.PDF", b"%PDF-1.4 two")
+    with tarfile.open(root / "b.tar.gz", "w:gz") as tf:
+        data = b"%PDF-1.4 three"
+        info = tarfile.TarInfo("doc3.pdf")
+        info.size = len(data)
+        tf.addfile(info, io.BytesIO(data))
+    (root / "c.pdf").write_bytes(b"%PDF-1.4 four")
+    (root / "broken.zip").write_bytes(b"not a zip")
+
+
+def test_batch_reads_archive_members_in_memory(tmp_path: Path) -> None:
+    _write_archives(tmp_path / "in")
+    seen: list[tuple[str, bytes | None]] = []
+
+    def process(item: Path | PdfMember) -> dict:
+        if isinstance(item, PdfMember):
+            seen.append((Path(item.name.split("!")[1]).name, item.data))
+        else:
+            seen.append((item.name, None))
+        return {"funcionario": "X"}
+
+    with ResultJournal(tmp_path / "out.jsonl") as j:
+        summary = run_batch(iter_batch_inputs(tmp_path / "in"), j, process, config_hash="cfg")
+
+    assert seen == [
+        ("doc1.pdf", b"%PDF-1.4 one"),
+        ("doc2.PDF", b"%PDF-1.4 two"),
+        ("doc3.pdf", b"%PDF-1.4 three"),
+        ("c.pdf", None),
+    ]
+    assert (summary.processed, summary.unreadable) == (4, 1)
+
+    with ResultJournal(tmp_path / "out.jsonl") as j:
+        again = run_batch(iter_batch_inputs(tmp_path / "in"), j, process, config_hash="cfg")
+    assert again.skipped == 4
+
+
+def test_prefetch_reads_ahead_and_reraises() -> None:
+    produced: list[int] = []
+    ahead = threading.Event()
+
+    def items():
+        for i in range(5):
+            produced.append(i)
+            if i == 2:
+                ahead.set()
+            yield i
+        raise OSError("network share went away")
+
+    it = prefetch(items(), depth=2)
+    assert next(it) == 0
+    assert ahead.wait(2.0)  # items 1 and 2 were read while the consumer held item 0
+    with pytest.raises(OSError):
+        list(it)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.candidates import generate_candidates
+from pipeline.scoring import score_and_rank
+from pipeline.spatial import SpatialIndex
+
+
+def _form():
+    # Reading order is scrambled: the value sits right of its label but far away in the list.
+    return build_blocks(
+        {
+            "blocks": [
+                {"text": "Empresa", "page": 1, "bbox": [10, 100, 80, 115]},
+                {"text": "Nome", "page": 1, "bbox": [10, 140, 60, 155]},
+                {"text": "Atestado de saúde", "page": 1, "bbox": [10, 20, 300, 40]},
+                {"text": "rodapé da página", "page": 1, "bbox": [10, 800, 300, 815]},
+                {"text": "CEI Erinice Siqueira", "page": 1, "bbox": [90, 100, 300, 115]},
+                {"text": "Sandra Regina Hortencio", "page": 1, "bbox": [90, 140, 300, 155]},
+            ]
+        }
+    )
+
+
+def test_nearest_right_and_below() -> None:
+    blocks = _form()
+    idx = SpatialIndex(blocks)
+    assert idx.nearest(blocks[0], "right", 50).text == "CEI Erinice Siqueira"
+    assert idx.nearest(blocks[0], "below", 50).text == "Nome"
+    assert idx.nearest(blocks[0], "right", 5) is None
+    assert idx.nearest(blocks[4], "left", 50).text == "Empresa"
+
+
+def test_label_value_uses_layout_neighbour() -> None:
+    cfg = PipelineConfig()
+    blocks = _form()
+    cands = generate_candidates(blocks, cfg=cfg)
+    by_layout = [c for c in cands["_internal"]["empresas"] if c.source == "label_right_block"]
+    assert [c.text for c in by_layout] == ["CEI Erinice Siqueira"]
+
+    ranked = score_and_rank(blocks, cands, cfg=cfg)
+    assert ranked["empresa"][0]["text"] == "CEI Erinice Siqueira"
+    top_person = ranked["funcionario"][0]
+    assert top_person["text"] == "Sandra Regina Hortencio"
+    assert "keyword_nearby" in top_person["reasons"]
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import main
+from config import PipelineConfig
+from pipeline.blocks import build_blocks
+from pipeline.templates import TemplateCache, layout_fingerprint
+
+
+def _form(empresa: str, nome: str, dy: float = 0.0) -> dict:
+    return {
+        "blocks": [
+            {"text": "ATESTADO DE SAÚDE OCUPACIONAL", "page": 1, "bbox": [100, 20 + dy, 500, 40 + dy]},
+            {"text": f"Empresa: {empresa}", "page": 1, "bbox": [40, 80 + dy, 400, 95 + dy]},
+            {"text": "CNPJ: 12.345.678/0001-90", "page": 1, "bbox": [420, 80 + dy, 580, 95 + dy]},
+            {"text": f"Nome: {nome}", "page": 1, "bbox": [40, 120 + dy, 400, 135 + dy]},
+            {"text": "Função: Auxiliar", "page": 1, "bbox": [420, 120 + dy, 580, 135 + dy]},
+            {"text": "Assinatura do médico", "page": 1, "bbox": [40, 760, 300, 780]},
+        ],
+        "extraction_quality": "ok",
+    }
+
+
+def _learn(cache: TemplateCache, empresa: str, nome: str) -> None:
+    blocks = build_blocks(_form(empresa, nome))
+    cache.learn(blocks, {"empresa": (empresa, blocks[1].id), "funcionario": (nome, blocks[3].id)})
+
+
+def test_fingerprint_ignores_values_but_not_layout() -> None:
+    a = layout_fingerprint(build_blocks(_form("ACME LTDA", "Ana Souza")))
+    assert a is not None
+    assert a == layout_fingerprint(build_blocks(_form("Transportes Pereira ME", "Bia Lima")))
+    assert a != layout_fingerprint(build_blocks(_form("ACME LTDA", "Ana Souza", dy=200)))
+
+
+def test_confirmed_template_answers_from_regions(tmp_path: Path) -> None:
+    cache = TemplateCache(min_confirmations=2)
+    _learn(cache, "ACME LTDA", "Ana Souza")
+    assert cache.extract(build_blocks(_form("Padaria Sol LTDA", "Carla Dias"))) is None  # one confirmation
+    _learn(cache, "Transportes Pereira ME", "Bia Lima")
+    path = tmp_path / "templates.json"
+    cache.save(path)
+
+    hit = TemplateCache.load(path).extract(build_blocks(_form("Padaria Sol LTDA", "Carla Dias")))
+    assert hit is not None
+    assert (hit.empresa, hit.funcionario) == ("Padaria Sol LTDA", "Carla Dias")
+    # Consistency check: a region holding something else falls back to the full pipeline.
+    assert TemplateCache.load(path).extract(build_blocks(_form("Padaria Sol LTDA", "123456"))) is None
+
+
+def test_conflicting_regions_disable_the_template() -> None:
+    cache = TemplateCache(min_confirmations=1)
+    _learn(cache, "ACME LTDA", "Ana Souza")
+    blocks = build_blocks(_form("ACME LTDA", "Ana Souza"))
+    cache.learn(blocks, {"empresa": ("ACME LTDA", blocks[1].id), "funcionario": ("Auxiliar", blocks[4].id)})
+    assert cache.extract(blocks) is None
+
+
+def test_run_skips_candidates_on_a_template_hit(tmp_path: Path, monkeypatch, fake_extract) -> None:
+    cache = TemplateCache(min_confirmations=1)
+    _learn(cache, "ACME LTDA", "Ana Souza")
+    fake_extract(_form("Padaria Sol LTDA", "Carla Dias"))
+    monkeypatch.setattr(main, "generate_candidates", lambda *a, **kw: (_ for _ in ()).throw(AssertionError))
+    ctx = main.RunContext(templates=cache)
+    result = main.run(tmp_path / "a.pdf", tmp_path / "o.json", None, PipelineConfig(), debug=True, ctx=ctx)
+    assert (result["empresa"], result["funcionario"]) == ("Padaria Sol LTDA", "Carla Dias")
+    assert result["debug"]["template"] == layout_fingerprint(build_blocks(_form("ACME LTDA", "Ana Souza")))
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import main
+from config import PipelineConfig
+from pipeline.two_phase import RefinementQueue
+
+
+
+def test_provisional_result_first_then_the_refined_one(tmp_path: Path, monkeypatch, fake_extract) -> None:
+    model = tmp_path / "model.gguf"
+    model.write_bytes(b"")
+    release = threading.Event()
+
+    def slow_llm(**kw) -> dict:
+        assert release.wait(5)
+        return {"funcionario": "Sandra Regina Hortencio", "empresa": "CEI Erinice Siqueira LTDA", "llm_used": True}
+
+    fake_extract()
+    monkeypatch.setattr(main, "decide_with_llm", slow_llm)
+    published: list[dict] = []
+    refiner = RefinementQueue(publish=lambda key, result: published.append(result))
+    pdf = tmp_path / "a.pdf"
+
+    ctx = main.RunContext(refiner=refiner)
+    result = main.run(pdf, tmp_path / "o.json", model, PipelineConfig(), debug=True, ctx=ctx)
+    assert result["provisional"] is True
+    assert result["funcionario"] == "Sandra Regina Hortencio"
+    assert result["debug"]["llm_used"] is False
+    assert refiner.poll(str(pdf)) is result
+
+    release.set()
+    refiner.close()
+    assert [r.get("provisional") for r in published] == [True, None]
+    assert published[1]["debug"]["llm_used"] is True
+    assert refiner.poll(str(pdf)) is published[1]
+
+
+def test_failed_refinement_republishes_the_provisional_result() -> None:
+    published: list[dict] = []
+    refiner = RefinementQueue(publish=lambda key, result: published.append(result))
+
+    def boom() -> dict:
+        raise RuntimeError("llm crashed")
+
+    refiner.submit("doc", {"provisional": True}, boom)
+    refiner.close()
+    assert published == [{"provisional": True}, {"provisional": True, "refine_error": "RuntimeError"}]
+    assert refiner.pending() == 0
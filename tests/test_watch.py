@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import main
+from pipeline.watch import FolderWatcher, output_path
+
+
+def test_pdf_is_queued_only_after_size_and_mtime_settle(tmp_path: Path) -> None:
+    pdf = tmp_path / "in" / "a.pdf"
+    pdf.parent.mkdir()
+    pdf.write_bytes(b"%PDF-1.4 partial")
+    watcher = FolderWatcher([tmp_path / "in"], process=lambda p: {}, settle_seconds=5.0)
+
+    watcher.scan(now=0.0)
+    assert watcher.status().settling == 1 and watcher.status().queued == 0
+    pdf.write_bytes(b"%PDF-1.4 partial, still being copied")
+    watcher.scan(now=4.0)
+    watcher.scan(now=8.0)  # changed at t=4: not stable for 5 s yet
+    assert watcher.status().queued == 0
+    watcher.scan(now=9.5)
+    assert watcher.status().queued == 1 and watcher.status().backlog == 1
+    watcher.scan(now=20.0)  # queued once
+    assert watcher.status().queued == 1 and watcher.status().settling == 0
+
+
+def test_existing_result_newer_than_pdf_is_skipped(tmp_path: Path) -> None:
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    output_path(pdf, tmp_path, None).write_text("{}", encoding="utf-8")
+    watcher = FolderWatcher([tmp_path], process=lambda p: {}, settle_seconds=0.0)
+    watcher.scan(now=100.0)
+    assert watcher.status().backlog == 0
+
+
+def test_run_processes_with_bounded_concurrency_into_output_tree(tmp_path: Path) -> None:
+    inbox, out = tmp_path / "in", tmp_path / "out"
+    (inbox / "sub").mkdir(parents=True)
+    for i in range(5):
+        (inbox / "sub" / f"doc{i}.pdf").write_bytes(b"%PDF-1.4 " + bytes([i]))
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def process(pdf: Path) -> dict:
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {"input": pdf.name}
+
+    stop = threading.Event()
+
+    def on_status(status) -> None:
+        if status.done == 5:
+            stop.set()
+
+    watcher = FolderWatcher(
+        [inbox], process=process, out_dir=out, workers=2, poll_seconds=0.01, settle_seconds=0.0, on_status=on_status
+    )
+    thread = threading.Thread(target=watcher.run, args=(stop,))
+    thread.start()
+    thread.join(10.0)
+    assert not thread.is_alive()
+    assert peak[0] == 2
+    assert json.loads((out / "sub" / "doc3.json").read_text(encoding="utf-8")) == {"input": "doc3.pdf"}
+
+
+def test_sigterm_stop_saves_what_the_watcher_learned(tmp_path: Path, monkeypatch) -> None:
+    class StoppedWatcher:
+        def __init__(self, roots, process, **kw) -> None:
+            self.process = process
+
+        def run(self, stop) -> None:
+            self.process(tmp_path / "a.pdf")
+            raise SystemExit(143)  # what the SIGTERM handler does
+
+    def learn(**kw) -> dict:
+        kw["ctx"].gazetteer.add("ACME LTDA", ["11.222.333/0001-81"])
+        return {}
+
+    monkeypatch.setattr(main, "FolderWatcher", StoppedWatcher)
+    monkeypatch.setattr(main, "run", learn)
+    monkeypatch.setattr(main.signal, "signal", lambda *a: None)
+    gazetteer = tmp_path / "gazetteer.json"
+    with pytest.raises(SystemExit) as exc:
+        main.main(["--watch", str(tmp_path), "--gazetteer", str(gazetteer)])
+    assert exc.value.code == 143
+    assert [e["name"] for e in json.loads(gazetteer.read_text(encoding="utf-8"))["entries"]] == ["ACME LTDA"]
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import multiprocessing as mp
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+import main
+from pipeline.workqueue import QueueSummary, WorkQueue, item_name, result_path
+
+
+def _fake_process(pdf: Path, log: Path, node: str) -> dict:
+    time.sleep(0.02)
+    with open(log, "a", encoding="utf-8") as fh:
+        fh.write(f"{pdf.name}\n")
+    return {"pdf": pdf.name, "node": node}
+
+
+def _node(queue_dir: str, out_dir: str, log: str, node: str) -> None:
+    queue = WorkQueue(Path(queue_dir), lease_seconds=30.0)
+    queue.run(lambda pdf: _fake_process(pdf, Path(log), node), Path(out_dir), node=node, poll_seconds=0.05)
+
+
+def _pdfs(root: Path, n: int) -> list[Path]:
+    paths = []
+    for i in range(n):
+        p = root / f"sub{i % 3}" / f"doc{i:02d}.pdf"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"%PDF-1.4")
+        paths.append(p)
+    return paths
+
+
+def test_nodes_share_the_queue_and_process_each_pdf_once(tmp_path: Path) -> None:
+    pdfs = _pdfs(tmp_path / "in", 24)
+    queue = WorkQueue(tmp_path / "queue")
+    assert queue.enqueue(pdfs, tmp_path / "in") == 24
+    assert queue.enqueue(pdfs, tmp_path / "in") == 0
+
+    log = tmp_path / "calls.log"
+    ctx = mp.get_context("spawn")
+    nodes = [
+        ctx.Process(target=_node, args=(str(tmp_path / "queue"), str(tmp_path / "out"), str(log), f"node{i}"))
+        for i in range(3)
+    ]
+    for n in nodes:
+        n.start()
+    for n in nodes:
+        n.join(60)
+        assert n.exitcode == 0
+
+    assert sorted(log.read_text(encoding="utf-8").split()) == sorted(p.name for p in pdfs)
+    results = [json.loads(result_path(tmp_path / "out", f"sub{i % 3}/doc{i:02d}.pdf").read_text()) for i in range(24)]
+    assert [r["pdf"] for r in results] == [p.name for p in pdfs]
+    assert len(list(queue.done.iterdir())) == 24
+    assert not list(queue.pending.iterdir()) and not list(queue.leased.iterdir())
+
+
+def test_expired_lease_of_a_crashed_node_is_reclaimed(tmp_path: Path) -> None:
+    pdfs = _pdfs(tmp_path / "in", 2)
+    queue = WorkQueue(tmp_path / "queue", lease_seconds=10.0)
+    queue.enqueue(pdfs, tmp_path / "in")
+    lease = queue.claim("crashed")
+    assert lease is not None and lease.parent == queue.leased
+    assert queue.reclaim() == 0
+
+    old = time.time() - 60
+    os.utime(lease, (old, old))
+    summary = queue.run(lambda pdf: {"pdf": pdf.name}, tmp_path / "out", node="survivor", poll_seconds=0.01)
+    assert summary == QueueSummary(processed=2, reclaimed=1)
+    assert (queue.done / item_name("sub0/doc00.pdf")).exists()
+    assert not lease.exists()
+
+
+def test_item_that_keeps_killing_its_node_moves_to_failed(tmp_path: Path) -> None:
+    pdfs = _pdfs(tmp_path / "in", 1)
+    queue = WorkQueue(tmp_path / "queue", lease_seconds=10.0, max_attempts=2)
+    queue.enqueue(pdfs, tmp_path / "in")
+    old = time.time() - 60
+    for node in ("crashed-1", "crashed-2"):
+        lease = queue.claim(node)
+        assert lease is not None and queue.admit(lease) is not None
+        os.utime(lease, (old, old))  # the node died holding the lease
+        assert queue.reclaim() == 1
+
+    calls: list[Path] = []
+    summary = queue.run(lambda pdf: calls.append(pdf) or {}, tmp_path / "out", node="survivor", poll_seconds=0.01)
+    assert summary == QueueSummary(processed=0, reclaimed=0, failed=1)
+    assert not calls
+    failed = json.loads((queue.failed / item_name("sub0/doc00.pdf")).read_text(encoding="utf-8"))
+    assert failed["rel"] == "sub0/doc00.pdf"
+    assert queue.enqueue(pdfs, tmp_path / "in") == 0
+
+
+def test_admitting_a_reclaimed_lease_does_not_recreate_it(tmp_path: Path) -> None:
+    queue = WorkQueue(tmp_path / "queue", lease_seconds=10.0)
+    queue.enqueue(_pdfs(tmp_path / "in", 1), tmp_path / "in")
+    lease = queue.claim("slow")
+    assert lease is not None
+    old = time.time() - 60
+    os.utime(lease, (old, old))
+    assert queue.reclaim() == 1
+    with pytest.raises(OSError):
+        queue.admit(lease)
+    assert not lease.exists()
+    again = queue.claim("other")
+    assert again is not None and queue.admit(again)["attempt"] == 2
+
+
+def test_queue_nodes_cannot_share_learned_files(tmp_path: Path, capsys) -> None:
+    for flag in ("--gazetteer", "--templates"):
+        with pytest.raises(SystemExit):
+            main.main(["--queue", str(tmp_path / "queue"), "--out", str(tmp_path / "out"), flag, "x.json"])
+        assert "cannot be shared by --queue nodes" in capsys.readouterr().err